@@ -0,0 +1,114 @@
+import json
+from threading import Lock
+from typing import Dict, List
+
+import grpc
+
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
+from titus_isolate.allocate.remote.constants import REQ_MODE_METADATA_KEY, FULL_REQ_MODE, DELTA_REQ_MODE, \
+    PLACEMENT_VERSION_METADATA_KEY, REMOVED_TASKS_METADATA_KEY, WORKLOAD_ID_TO_THREAD_COUNT_METADATA_KEY
+from titus_isolate.config.constants import DEFAULT_SHARES_SCALE, DEFAULT_QUOTA_SCALE
+
+
+class ReferenceIsolationService(pb_grpc.IsolationServiceServicer):
+    """
+    A local reference implementation of the isolation service's full and delta protocols.
+
+    New tasks are placed first fit on free threads, preferring whole free cores, and placed tasks are never moved.
+    Placements are versioned per instance so that delta requests can be served.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__version = 0
+
+        # instance_id -> (placement version, threads per core, thread count, task id -> thread ids)
+        self.__placements = {}
+
+        self.full_request_count = 0
+        self.delta_request_count = 0
+
+    def forget_placements(self):
+        with self.__lock:
+            self.__placements = {}
+
+    def ComputeIsolation(self, request: pb.IsolationRequest, context) -> pb.IsolationResponse:
+        mode = request.metadata.get(REQ_MODE_METADATA_KEY, FULL_REQ_MODE)
+        thread_counts = json.loads(request.metadata.get(WORKLOAD_ID_TO_THREAD_COUNT_METADATA_KEY, "{}"))
+        instance_id = request.instance_context.instance_id
+
+        with self.__lock:
+            if mode == DELTA_REQ_MODE:
+                self.delta_request_count += 1
+                state = self.__placements.get(instance_id, None)
+                if state is None or state[0] != request.metadata.get(PLACEMENT_VERSION_METADATA_KEY, None):
+                    context.abort(grpc.StatusCode.FAILED_PRECONDITION, "unknown placement version")
+
+                _, threads_per_core, thread_count, placement = state
+                placement = dict(placement)
+                for task_id in json.loads(request.metadata.get(REMOVED_TASKS_METADATA_KEY, "[]")):
+                    placement.pop(task_id, None)
+            else:
+                self.full_request_count += 1
+                threads_per_core, thread_count, placement = self.__get_layout_placement(request)
+
+            added = [task_id for task_id in request.tasks_to_place if task_id not in placement]
+            for task_id in added:
+                placement[task_id] = self.__place(
+                    placement, threads_per_core, thread_count, int(thread_counts[task_id]), context)
+
+            self.__version += 1
+            version = str(self.__version)
+            self.__placements[instance_id] = (version, threads_per_core, thread_count, placement)
+
+        response = pb.IsolationResponse()
+        changed = added if mode == DELTA_REQ_MODE else request.tasks_to_place
+        for task_id in changed:
+            thread_ids = placement[task_id]
+            cpuset = response.cpusets[task_id]
+            cpuset.thread_ids.extend(thread_ids)
+            cpuset.cfs_tunables.shares = len(thread_ids) * DEFAULT_SHARES_SCALE
+            cpuset.cfs_tunables.quota_us = len(thread_ids) * DEFAULT_QUOTA_SCALE
+        response.metadata[REQ_MODE_METADATA_KEY] = mode
+        response.metadata[PLACEMENT_VERSION_METADATA_KEY] = version
+        return response
+
+    @staticmethod
+    def __get_layout_placement(request: pb.IsolationRequest):
+        layout = request.layout
+        threads_per_core = layout.threads_per_core
+        thread_count = sum(p.num_cores for p in layout.packages) * threads_per_core
+
+        tasks_to_place = set(request.tasks_to_place)
+        placement = {}
+        for p in layout.packages:
+            for c in p.cores:
+                for t in c.threads:
+                    for task_id in t.task_ids:
+                        if task_id in tasks_to_place:
+                            placement.setdefault(task_id, []).append(t.id)
+
+        return threads_per_core, thread_count, placement
+
+    @staticmethod
+    def __place(
+            placement: Dict[str, List[int]],
+            threads_per_core: int,
+            thread_count: int,
+            task_thread_count: int,
+            context) -> List[int]:
+        claimed = {t_id for thread_ids in placement.values() for t_id in thread_ids}
+        free = [t_id for t_id in range(thread_count) if t_id not in claimed]
+
+        # Natural thread ids are numbered core by core
+        def is_on_free_core(t_id):
+            first = t_id - t_id % threads_per_core
+            return all(first + i not in claimed for i in range(threads_per_core))
+
+        candidates = [t_id for t_id in free if is_on_free_core(t_id)] + \
+                     [t_id for t_id in free if not is_on_free_core(t_id)]
+        if len(candidates) < task_thread_count:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "not enough free threads")
+
+        return sorted(candidates[:task_thread_count])
@@ -6,13 +6,18 @@ import uuid
 
 from kubernetes.client import V1Pod
 
+from tests.test_event_log_manager import TestEventLogManager
 from tests.utils import config_logs, get_test_workload, get_allocate_request, TestWorkloadMonitorManager
 from titus_isolate import log
+from titus_isolate.allocate.constants import CPU_USAGE
 from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
 from titus_isolate.allocate.naive_cpu_allocator import NaiveCpuAllocator
+from titus_isolate.allocate.topology_cpu_allocator import TopologyCpuAllocator
 from titus_isolate.model.processor.config import get_cpu
 from titus_isolate.model.processor.utils import DEFAULT_TOTAL_THREAD_COUNT
-from titus_isolate.utils import set_workload_monitor_manager
+from titus_isolate.metrics.event_log import report_cpu_event
+from titus_isolate.monitor.resource_usage import GlobalResourceUsage
+from titus_isolate.utils import set_workload_monitor_manager, set_event_log_manager
 
 config_logs(logging.INFO)
 
@@ -28,8 +33,17 @@ class TestPodManager:
         return self.pod
 
 
-ALLOCATORS = [NaiveCpuAllocator(), GreedyCpuAllocator()]
-OVER_ALLOCATORS = [NaiveCpuAllocator()]
+class CountingWorkloadMonitorManager:
+    def __init__(self):
+        self.call_count = 0
+
+    def get_resource_usage(self, workload_ids) -> GlobalResourceUsage:
+        self.call_count += 1
+        return GlobalResourceUsage({})
+
+
+ALLOCATORS = [NaiveCpuAllocator(), GreedyCpuAllocator(), TopologyCpuAllocator()]
+OVER_ALLOCATORS = [NaiveCpuAllocator(), TopologyCpuAllocator()]
 
 set_workload_monitor_manager(TestWorkloadMonitorManager())
 
@@ -198,3 +212,41 @@ class TestAllocation(unittest.TestCase):
                         workload_ids_left.add(w_id)
 
             self.assertListEqual(sorted(list(workload_ids_left)), [123, 789])
+
+    def test_request_shares_structure_with_inputs(self):
+        for allocator in ALLOCATORS:
+            cpu = get_cpu()
+            w = get_test_workload(uuid.uuid4(), 2)
+
+            request = get_allocate_request(cpu, [w])
+            self.assertIs(w, request.get_workloads()[w.get_task_id()])
+            self.assertIs(cpu.get_topology(), request.get_cpu().get_topology())
+
+            # Allocating on the request's cpu must not modify the cpu it was built from
+            new_cpu = allocator.isolate(request).get_cpu()
+            self.assertEqual(2, len(new_cpu.get_claimed_threads()))
+            self.assertEqual(0, len(cpu.get_claimed_threads()))
+
+    def test_resource_usage_is_fetched_lazily(self):
+        wmm = CountingWorkloadMonitorManager()
+        event_log_manager = TestEventLogManager()
+        set_workload_monitor_manager(wmm)
+        set_event_log_manager(event_log_manager)
+        try:
+            w = get_test_workload(uuid.uuid4(), 2)
+            request = get_allocate_request(get_cpu(), [w])
+            response = NaiveCpuAllocator().isolate(request)
+            self.assertEqual(0, wmm.call_count)
+            self.assertFalse(request.has_resource_usage())
+
+            # The event is built, and usage fetched, on the event log's thread
+            report_cpu_event(request, response).result()
+            self.assertEqual(1, wmm.call_count)
+            self.assertEqual(1, len(event_log_manager.payloads))
+            self.assertEqual({}, event_log_manager.payloads[0]["request"][CPU_USAGE])
+
+            request.to_dict()
+            self.assertEqual(1, wmm.call_count)
+        finally:
+            set_workload_monitor_manager(TestWorkloadMonitorManager())
+            set_event_log_manager(None)
@@ -0,0 +1,106 @@
+import logging
+import unittest
+
+from spectator import Registry
+
+from tests.utils import config_logs, gauge_value_equals, counter_value_equals
+from titus_isolate.allocate.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from titus_isolate.metrics.constants import FALLBACK_BREAKER_STATE, FALLBACK_BREAKER_TRANSITION_COUNT
+
+config_logs(logging.DEBUG)
+
+
+class MockClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def get_time(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = MockClock()
+
+    def __get_breaker(self):
+        return CircuitBreaker(
+            window_size=10, min_calls=4, failure_ratio=0.5, slow_call_sec=1.0, open_duration_sec=30,
+            get_time=self.clock.get_time)
+
+    def test_opens_on_failures(self):
+        breaker = self.__get_breaker()
+        for _ in range(3):
+            breaker.record_failure(0.1)
+        self.assertEqual(CLOSED, breaker.get_state())
+        self.assertTrue(breaker.allow_request())
+
+        breaker.record_success(0.1)
+        self.assertEqual(OPEN, breaker.get_state())
+        self.assertFalse(breaker.allow_request())
+
+    def test_opens_on_slow_calls(self):
+        breaker = self.__get_breaker()
+        for _ in range(3):
+            breaker.record_success(0.1)
+        breaker.record_success(1.5)
+        self.assertEqual(OPEN, breaker.get_state())
+        self.assertEqual(1.5, breaker.get_latency_percentile())
+
+    def test_half_open_probe(self):
+        breaker = self.__get_breaker()
+        for _ in range(4):
+            breaker.record_failure(0.1)
+        self.assertEqual(OPEN, breaker.get_state())
+
+        # A failed probe opens the breaker again
+        self.clock.now += 30
+        probe = breaker.allow_request()
+        self.assertIsNotNone(probe)
+        self.assertEqual(HALF_OPEN, breaker.get_state())
+        self.assertIsNone(breaker.allow_request())
+        breaker.record_failure(0.1, probe)
+        self.assertEqual(OPEN, breaker.get_state())
+        self.assertIsNone(breaker.allow_request())
+
+        # A successful probe closes it with a fresh window
+        self.clock.now += 30
+        probe = breaker.allow_request()
+        self.assertIsNotNone(probe)
+        breaker.record_success(0.1, probe)
+        self.assertEqual(CLOSED, breaker.get_state())
+        self.assertEqual(0.0, breaker.get_failure_ratio())
+        self.assertTrue(breaker.allow_request())
+
+    def test_reports_transitions(self):
+        registry = Registry()
+        breaker = self.__get_breaker()
+        breaker.set_registry(registry, {})
+        for _ in range(4):
+            breaker.record_failure(0.1)
+        self.clock.now += 30
+        breaker.allow_request()
+
+        breaker.report_metrics({})
+        self.assertTrue(gauge_value_equals(registry, FALLBACK_BREAKER_STATE, 1))
+        self.assertTrue(counter_value_equals(registry, FALLBACK_BREAKER_TRANSITION_COUNT, 1, {"state": OPEN}))
+        self.assertTrue(counter_value_equals(registry, FALLBACK_BREAKER_TRANSITION_COUNT, 1, {"state": HALF_OPEN}))
+        self.assertTrue(counter_value_equals(registry, FALLBACK_BREAKER_TRANSITION_COUNT, 0, {"state": CLOSED}))
+
+    def test_half_open_ignores_other_calls(self):
+        breaker = self.__get_breaker()
+        late_token = breaker.allow_request()
+        for _ in range(4):
+            breaker.record_failure(0.1)
+        self.clock.now += 30
+        probe = breaker.allow_request()
+
+        # A call which started before the breaker opened neither closes nor reopens it
+        breaker.record_success(0.1, late_token)
+        breaker.record_failure(0.1)
+        self.assertEqual(HALF_OPEN, breaker.get_state())
+        self.assertIsNone(breaker.allow_request())
+
+        breaker.record_success(0.1, probe)
+        self.assertEqual(CLOSED, breaker.get_state())
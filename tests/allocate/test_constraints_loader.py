@@ -0,0 +1,57 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from tests.utils import config_logs
+from titus_isolate.allocate.remote.constraints_loader import ConstraintsLoader
+
+config_logs(logging.DEBUG)
+
+
+class TestConstraintsLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.__dir = tempfile.TemporaryDirectory()
+        self.__path = os.path.join(self.__dir.name, "constraints.json")
+        self.__mtime = 1000000000
+
+    def tearDown(self):
+        self.__dir.cleanup()
+
+    def __write(self, content):
+        with open(self.__path, 'w') as f:
+            f.write(content)
+        # Move the modification time forward explicitly, writes may land within the file system's time granularity
+        self.__mtime += 1
+        os.utime(self.__path, (self.__mtime, self.__mtime))
+
+    def test_parsed_constraints_are_cached(self):
+        loader = ConstraintsLoader(self.__path)
+        self.assertIsNone(loader.load())
+
+        self.__write('{"maxCoresToUsePerPackage": 4}')
+        constraints = loader.load()
+        self.assertEqual(4, constraints.max_cores_to_use_per_package)
+        self.assertIs(constraints, loader.load())
+        self.assertEqual(1, loader.get_parse_count())
+
+        self.__write('{"maxCoresToUsePerPackage": 8}')
+        self.assertEqual(8, loader.load().max_cores_to_use_per_package)
+        self.assertEqual(2, loader.get_parse_count())
+
+        os.remove(self.__path)
+        self.assertIsNone(loader.load())
+
+    def test_parse_errors_are_reported_once(self):
+        loader = ConstraintsLoader(self.__path)
+        self.__write('{"maxCoresToUsePerPackage": ')
+
+        self.assertIsNone(loader.load())
+        self.assertIsNone(loader.load())
+        self.assertEqual(1, loader.get_error_count())
+        self.assertEqual(1, loader.get_parse_count())
+
+        self.__write('{"maxCoresToUsePerPackage": 2}')
+        self.assertEqual(2, loader.load().max_cores_to_use_per_package)
+        self.assertEqual(1, loader.get_error_count())
@@ -1,16 +1,53 @@
+import time
 import unittest
 
 from tests.allocate.crashing_allocators import CrashingAllocator
-from tests.utils import get_test_workload, get_allocate_request
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import get_test_workload, get_allocate_request, wait_until
+from titus_isolate.allocate.allocate_request import AllocateRequest
+from titus_isolate.allocate.allocate_response import AllocateResponse
+from titus_isolate.allocate.constants import CPU_ALLOCATOR
+from titus_isolate.allocate.circuit_breaker import CircuitBreaker, OPEN
+from titus_isolate.allocate.cpu_allocator import CpuAllocator
 from titus_isolate.allocate.fall_back_cpu_allocator import FallbackCpuAllocator
 from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
 
 from titus_isolate.allocate.naive_cpu_allocator import NaiveCpuAllocator
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import FALLBACK_HEDGE_DELAY_MS
 from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_config_manager
+
+
+class MockSlowAllocator(CpuAllocator):
+
+    def __init__(self, delay_sec: float, fail: bool = False):
+        self.delay_sec = delay_sec
+        self.fail = fail
+        self.call_count = 0
+
+    def isolate(self, request: AllocateRequest) -> AllocateResponse:
+        self.call_count += 1
+        time.sleep(self.delay_sec)
+        if self.fail:
+            raise Exception("failing on purpose")
+        return GreedyCpuAllocator().isolate(request)
+
+    def get_name(self) -> str:
+        return self.__class__.__name__
+
+    def set_registry(self, registry, tags):
+        pass
+
+    def report_metrics(self, tags):
+        pass
 
 
 class TestFallbackCpuAllocator(unittest.TestCase):
 
+    def tearDown(self):
+        set_config_manager(ConfigManager(TestPropertyProvider({})))
+
     def test_naive_fallback(self):
 
         w_a = get_test_workload("a", 3)
@@ -52,3 +89,57 @@ class TestFallbackCpuAllocator(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             FallbackCpuAllocator(None, None)
+
+    def test_open_breaker_skips_primary(self):
+        primary = MockSlowAllocator(0, fail=True)
+        breaker = CircuitBreaker(window_size=10, min_calls=2, open_duration_sec=60)
+        allocator = FallbackCpuAllocator(primary, NaiveCpuAllocator(), breaker)
+
+        cpu = get_cpu()
+        for _ in range(5):
+            cpu = allocator.isolate(get_allocate_request(cpu, [get_test_workload("a", 2)])).get_cpu()
+
+        self.assertEqual(OPEN, breaker.get_state())
+        self.assertEqual(2, primary.call_count)
+        self.assertEqual(3, allocator.get_breaker_open_fallback_count())
+        self.assertEqual(5, allocator.get_fallback_allocator_calls_count())
+        self.assertEqual(2, len(cpu.get_claimed_threads()))
+
+    def test_hedge_is_used_when_primary_misses_delay(self):
+        set_config_manager(ConfigManager(TestPropertyProvider({FALLBACK_HEDGE_DELAY_MS: 50})))
+        primary = MockSlowAllocator(0.5)
+        allocator = FallbackCpuAllocator(primary, NaiveCpuAllocator())
+
+        start_time = time.time()
+        response = allocator.isolate(get_allocate_request(get_cpu(), [get_test_workload("a", 2)]))
+        self.assertLess(time.time() - start_time, 0.4)
+        self.assertEqual(NaiveCpuAllocator().get_name(), response.get_metadata()[CPU_ALLOCATOR])
+        self.assertEqual(1, allocator.get_hedge_fallback_count())
+
+        # The late primary call still completes in the background and is recorded by the breaker
+        wait_until(lambda: allocator.get_circuit_breaker().get_latency_percentile() is not None)
+        self.assertGreaterEqual(allocator.get_circuit_breaker().get_latency_percentile(), 0.5)
+
+        # A primary which answers within the delay is used
+        primary.delay_sec = 0
+        response = allocator.isolate(get_allocate_request(get_cpu(), [get_test_workload("a", 2)]))
+        self.assertEqual(GreedyCpuAllocator().get_name(), response.get_metadata()[CPU_ALLOCATOR])
+        self.assertEqual(1, allocator.get_hedge_fallback_count())
+        self.assertEqual(2, primary.call_count)
+
+    def test_primary_is_skipped_while_late_call_runs(self):
+        set_config_manager(ConfigManager(TestPropertyProvider({FALLBACK_HEDGE_DELAY_MS: 50})))
+        primary = MockSlowAllocator(0.5)
+        allocator = FallbackCpuAllocator(primary, NaiveCpuAllocator())
+
+        allocator.isolate(get_allocate_request(get_cpu(), [get_test_workload("a", 2)]))
+        start_time = time.time()
+        response = allocator.isolate(get_allocate_request(get_cpu(), [get_test_workload("a", 2)]))
+        self.assertLess(time.time() - start_time, 0.4)
+        self.assertEqual(NaiveCpuAllocator().get_name(), response.get_metadata()[CPU_ALLOCATOR])
+        self.assertEqual(2, allocator.get_hedge_fallback_count())
+        self.assertEqual(1, primary.call_count)
+
+        # The late call's latency is its own, not including time spent queued
+        wait_until(lambda: allocator.get_circuit_breaker().get_latency_percentile() is not None)
+        self.assertLess(allocator.get_circuit_breaker().get_latency_percentile(), 0.6)
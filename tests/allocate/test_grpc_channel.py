@@ -0,0 +1,115 @@
+import logging
+import unittest
+from concurrent import futures
+from unittest.mock import patch, MagicMock
+
+import grpc
+
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import config_logs, wait_until
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
+from titus_isolate.allocate.remote import channel
+from titus_isolate.allocate.remote.channel import get_channel, close_channels, get_compression, \
+    get_deadline_budget, get_channel_options, GZIP_MIN_REQUEST_BYTES
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import GRPC_REMOTE_ALLOC_ENDPOINT
+from titus_isolate.utils import get_grpc_cell_name
+
+config_logs(logging.DEBUG)
+
+
+class CellServicer(pb_grpc.IsolationServiceServicer):
+    def __init__(self):
+        self.call_count = 0
+
+    def GetCurrentCell(self, request, context):
+        self.call_count += 1
+        return pb.CurrentCellResponse(cell_id="cell-1")
+
+
+class TestGrpcChannel(unittest.TestCase):
+
+    def setUp(self):
+        self.servicer = CellServicer()
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        pb_grpc.add_IsolationServiceServicer_to_server(self.servicer, self.server)
+        port = self.server.add_insecure_port("localhost:0")
+        self.server.start()
+        self.endpoint = "localhost:{}".format(port)
+
+    def tearDown(self):
+        close_channels()
+        self.server.stop(None)
+
+    def test_cell_name_shares_channel(self):
+        config_manager = ConfigManager(TestPropertyProvider({GRPC_REMOTE_ALLOC_ENDPOINT: self.endpoint}))
+
+        self.assertEqual("cell-1", get_grpc_cell_name(config_manager))
+        self.assertEqual("cell-1", get_grpc_cell_name(config_manager))
+        self.assertEqual(2, self.servicer.call_count)
+        self.assertIs(get_channel(self.endpoint), get_channel(self.endpoint))
+
+    def test_compression(self):
+        small = pb.IsolationRequest()
+        small.tasks_to_place.append("a")
+        self.assertEqual(grpc.Compression.NoCompression, get_compression(small))
+
+        large = pb.IsolationRequest()
+        large.tasks_to_place.extend(["task_{}".format(i) for i in range(GZIP_MIN_REQUEST_BYTES // 8)])
+        self.assertEqual(grpc.Compression.Gzip, get_compression(large))
+
+    def test_deadline_budget(self):
+        self.assertEqual(3.0, get_deadline_budget(3.0, 0.5, 0))
+        self.assertEqual(1.0, get_deadline_budget(3.0, 0.5, 2))
+        self.assertEqual(0.5, get_deadline_budget(3.0, 0.5, 100))
+        self.assertEqual(0.2, get_deadline_budget(0.2, 0.5, 0))
+
+    def test_keepalive_is_off_by_default(self):
+        options = dict(get_channel_options(0))
+        self.assertNotIn('grpc.keepalive_time_ms', options)
+        self.assertNotIn('grpc.keepalive_permit_without_calls', options)
+
+        options = dict(get_channel_options(30000))
+        self.assertEqual(30000, options['grpc.keepalive_time_ms'])
+        self.assertNotIn('grpc.keepalive_permit_without_calls', options)
+
+    def __stop_server_until_idle(self, ch):
+        states = []
+        ch.subscribe(states.append)
+        pb_grpc.IsolationServiceStub(ch).GetCurrentCell(pb.CurrentCellRequest(), timeout=5.0)
+
+        del states[:]
+        self.server.stop(None)
+        wait_until(lambda: grpc.ChannelConnectivity.IDLE in states)
+
+    def test_idle_channel_reconnects(self):
+        ready_futures = []
+        create_ready_future = grpc.channel_ready_future
+
+        def channel_ready_future(ch):
+            ready_futures.append(create_ready_future(ch))
+            return ready_futures[-1]
+
+        with patch.object(channel.grpc, 'channel_ready_future', channel_ready_future):
+            ch = get_channel(self.endpoint)
+            self.__stop_server_until_idle(ch)
+
+            # Once when the channel was created, and again when it became idle
+            wait_until(lambda: len(ready_futures) == 2)
+            self.assertFalse(ready_futures[-1].done())
+
+            close_channels()
+            self.assertTrue(ready_futures[-1].cancelled())
+
+    def test_pending_reconnect_is_not_repeated(self):
+        pending = MagicMock()
+        pending.done.return_value = False
+
+        with patch.object(channel.grpc, 'channel_ready_future', return_value=pending) as channel_ready_future:
+            ch = get_channel(self.endpoint)
+            self.__stop_server_until_idle(ch)
+            self.assertEqual(1, channel_ready_future.call_count)
+
+            close_channels()
+            pending.cancel.assert_called_once_with()
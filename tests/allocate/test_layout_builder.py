@@ -0,0 +1,71 @@
+import copy
+import logging
+import random
+import unittest
+
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+
+from tests.utils import config_logs
+from titus_isolate.allocate.remote.layout_builder import LayoutBuilder
+from titus_isolate.model.processor.config import get_cpu
+
+config_logs(logging.DEBUG)
+
+
+def get_original2natural_indexing(cpu):
+    return {v: k for k, v in cpu.get_natural_indexing_2_original_indexing().items()}
+
+
+def build_layout(cpu, original2natural_indexing) -> pb.Layout:
+    layout = pb.Layout()
+    for p in cpu.get_packages():
+        pp = layout.packages.add(id=p.get_id(), num_cores=len(p.get_cores()))
+        for c in p.get_cores():
+            threads = [t for t in c.get_threads() if len(t.get_workload_ids()) > 0]
+            if len(threads) > 0:
+                pc = pp.cores.add(id=c.get_id())
+                for t in threads:
+                    pt = pc.threads.add(id=original2natural_indexing[t.get_id()])
+                    pt.task_ids.extend(t.get_workload_ids())
+            layout.threads_per_core = len(c.get_threads())
+    return layout
+
+
+class TestLayoutBuilder(unittest.TestCase):
+
+    def __assert_layout(self, builder, layout, cpu, original2natural_indexing):
+        builder.update(cpu)
+        self.assertEqual(build_layout(cpu, original2natural_indexing), layout)
+
+    def test_patched_layout_matches_rebuilt_layout(self):
+        random.seed(0)
+        cpu = get_cpu(2, 4, 2)
+        original2natural_indexing = get_original2natural_indexing(cpu)
+        layout = pb.Layout()
+        builder = LayoutBuilder(cpu, original2natural_indexing, layout)
+        self.__assert_layout(builder, layout, cpu, original2natural_indexing)
+
+        workload_ids = ["a", "b", "c"]
+        for _ in range(200):
+            cpu = copy.deepcopy(cpu)
+            threads = cpu.get_threads()
+            for _ in range(random.randint(1, 3)):
+                t = random.choice(threads)
+                w_id = random.choice(workload_ids)
+                if random.random() < 0.6:
+                    t.claim(w_id)
+                else:
+                    t.free(w_id)
+            self.__assert_layout(builder, layout, cpu, original2natural_indexing)
+
+    def test_topology_change_rebuilds_layout(self):
+        cpu = get_cpu(2, 4, 2)
+        original2natural_indexing = get_original2natural_indexing(cpu)
+        layout = pb.Layout()
+        builder = LayoutBuilder(cpu, original2natural_indexing, layout)
+        cpu.get_threads()[0].claim("a")
+        self.__assert_layout(builder, layout, cpu, original2natural_indexing)
+
+        other = get_cpu(1, 4, 2)
+        other.get_threads()[3].claim("b")
+        self.__assert_layout(builder, layout, other, original2natural_indexing)
@@ -0,0 +1,122 @@
+import logging
+import unittest
+from concurrent import futures
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import grpc
+
+import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
+from tests.allocate.reference_isolation_service import ReferenceIsolationService
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import config_logs, get_test_workload, get_allocate_request
+from titus_isolate.allocate.remote import allocator
+from titus_isolate.allocate.remote.allocator import GrpcRemoteIsolationAllocator
+from titus_isolate.allocate.remote.channel import close_channels
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import GRPC_REMOTE_ALLOC_ENDPOINT, GRPC_REMOTE_ALLOC_DELTA_MODE
+from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_config_manager
+
+config_logs(logging.DEBUG)
+
+
+class TestRemoteDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.service = ReferenceIsolationService()
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        pb_grpc.add_IsolationServiceServicer_to_server(self.service, self.server)
+        port = self.server.add_insecure_port("localhost:0")
+        self.server.start()
+        self.endpoint = "localhost:{}".format(port)
+
+        # Each allocator is a distinct instance to the service
+        self.node_count = 0
+        self.patches = [
+            patch.object(allocator, 'get_node', self.__get_node),
+            patch.object(allocator, 'get_cpu_from_env', lambda: get_cpu(2, 4, 2))]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        close_channels()
+        self.server.stop(None)
+        set_config_manager(ConfigManager(TestPropertyProvider({})))
+
+    def __get_node(self):
+        self.node_count += 1
+        return SimpleNamespace(metadata=SimpleNamespace(name="i-{}".format(self.node_count), annotations={}))
+
+    def __get_allocator(self, delta_mode: bool) -> GrpcRemoteIsolationAllocator:
+        set_config_manager(ConfigManager(TestPropertyProvider({
+            GRPC_REMOTE_ALLOC_ENDPOINT: self.endpoint,
+            GRPC_REMOTE_ALLOC_DELTA_MODE: delta_mode})))
+        return GrpcRemoteIsolationAllocator()
+
+    @staticmethod
+    def __isolate(cpu_allocator, cpu, workloads):
+        return cpu_allocator.isolate(get_allocate_request(cpu, workloads))
+
+    def test_delta_requests_match_full_requests(self):
+        full_allocator = self.__get_allocator(False)
+        delta_allocator = self.__get_allocator(True)
+
+        workloads = []
+        full_cpu = get_cpu(2, 4, 2)
+        delta_cpu = get_cpu(2, 4, 2)
+        steps = [("add", "a", 2), ("add", "b", 3), ("add", "c", 1), ("remove", "a", 0), ("add", "d", 4)]
+        for op, task_id, thread_count in steps:
+            if op == "add":
+                workloads.append(get_test_workload(task_id, thread_count))
+            else:
+                workloads = [w for w in workloads if w.get_task_id() != task_id]
+
+            full_response = self.__isolate(full_allocator, full_cpu, workloads)
+            delta_response = self.__isolate(delta_allocator, delta_cpu, workloads)
+            full_cpu = full_response.get_cpu()
+            delta_cpu = delta_response.get_cpu()
+
+            self.assertEqual(full_cpu, delta_cpu)
+            self.assertEqual(
+                {w.get_workload_id(): sorted(w.get_thread_ids()) for w in full_response.get_workload_allocations()},
+                {w.get_workload_id(): sorted(w.get_thread_ids()) for w in delta_response.get_workload_allocations()})
+
+        self.assertEqual(0, full_allocator.get_delta_count())
+        self.assertEqual(len(steps) - 1, delta_allocator.get_delta_count())
+        self.assertEqual(0, delta_allocator.get_delta_rejected_count())
+
+    def test_unchanged_allocations_are_reused(self):
+        delta_allocator = self.__get_allocator(True)
+        workloads = [get_test_workload("a", 2)]
+        first = self.__isolate(delta_allocator, get_cpu(2, 4, 2), workloads)
+
+        workloads.append(get_test_workload("b", 2))
+        second = self.__isolate(delta_allocator, first.get_cpu(), workloads)
+
+        first_a = first.get_workload_allocations()[0]
+        second_a = [w for w in second.get_workload_allocations() if w.get_workload_id() == "a"][0]
+        self.assertIs(first_a, second_a)
+
+    def test_falls_back_to_full_requests(self):
+        delta_allocator = self.__get_allocator(True)
+        workloads = [get_test_workload("a", 2)]
+        response = self.__isolate(delta_allocator, get_cpu(2, 4, 2), workloads)
+
+        # The service no longer knows the placement version
+        self.service.forget_placements()
+        workloads.append(get_test_workload("b", 2))
+        response = self.__isolate(delta_allocator, response.get_cpu(), workloads)
+        self.assertEqual(1, delta_allocator.get_delta_rejected_count())
+        self.assertEqual(2, len(response.get_workload_allocations()))
+
+        # The CPU was changed by another allocator
+        cpu = response.get_cpu()
+        cpu.get_threads()[-1].claim("b")
+        self.__isolate(delta_allocator, cpu, workloads)
+
+        self.assertEqual(0, delta_allocator.get_delta_count())
+        self.assertEqual(3, self.service.full_request_count)
+        self.assertEqual(1, self.service.delta_request_count)
@@ -0,0 +1,92 @@
+import logging
+import unittest
+
+from tests.utils import config_logs, get_test_workload, get_allocate_request, get_threads_with_workload, \
+    TestWorkloadMonitorManager
+from titus_isolate.allocate.topology_cpu_allocator import TopologyCpuAllocator
+from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_workload_monitor_manager
+
+config_logs(logging.DEBUG)
+set_workload_monitor_manager(TestWorkloadMonitorManager())
+
+
+def get_thread_ids(cpu, workload_id):
+    return sorted(t.get_id() for t in get_threads_with_workload(cpu, workload_id))
+
+
+class TestTopologyCpuAllocator(unittest.TestCase):
+
+    def test_existing_placements_are_kept(self):
+        allocator = TopologyCpuAllocator()
+        w_a = get_test_workload("a", 3)
+        w_b = get_test_workload("b", 5)
+
+        cpu = allocator.isolate(get_allocate_request(get_cpu(), [w_a])).get_cpu()
+        a_thread_ids = get_thread_ids(cpu, "a")
+
+        cpu = allocator.isolate(get_allocate_request(cpu, [w_a, w_b])).get_cpu()
+        self.assertEqual(a_thread_ids, get_thread_ids(cpu, "a"))
+        self.assertEqual(5, len(get_thread_ids(cpu, "b")))
+        self.assertEqual(0, len(set(a_thread_ids) & set(get_thread_ids(cpu, "b"))))
+
+    def test_whole_cores_on_one_package(self):
+        allocator = TopologyCpuAllocator()
+        cpu = get_cpu(2, 4, 2)
+        workloads = []
+        for i in range(4):
+            workloads.append(get_test_workload(str(i), 2))
+            cpu = allocator.isolate(get_allocate_request(cpu, workloads)).get_cpu()
+
+        violations = cpu.get_violation_index()
+        self.assertEqual(0, violations.get_shared_core_violation_count())
+        self.assertEqual(0, violations.get_cross_package_violation_count())
+        self.assertEqual(8, len(cpu.get_claimed_threads()))
+
+    def test_remainder_on_free_core(self):
+        allocator = TopologyCpuAllocator()
+        cpu = get_cpu(1, 4, 2)
+        w_a = get_test_workload("a", 3)
+        w_b = get_test_workload("b", 2)
+
+        cpu = allocator.isolate(get_allocate_request(cpu, [w_a, w_b])).get_cpu()
+        self.assertEqual(0, cpu.get_violation_index().get_shared_core_violation_count())
+        self.assertEqual(3, len(cpu.get_empty_threads()))
+
+    def test_split_across_packages_only_when_needed(self):
+        allocator = TopologyCpuAllocator()
+        cpu = get_cpu(2, 2, 2)
+        w_a = get_test_workload("a", 4)
+        cpu = allocator.isolate(get_allocate_request(cpu, [w_a])).get_cpu()
+        self.assertEqual(0, cpu.get_violation_index().get_cross_package_violation_count())
+
+        w_b = get_test_workload("b", 6)
+        cpu = allocator.isolate(get_allocate_request(get_cpu(2, 2, 2), [w_b])).get_cpu()
+        self.assertEqual(1, cpu.get_violation_index().get_cross_package_violation_count())
+        self.assertEqual(6, len(get_thread_ids(cpu, "b")))
+
+    def test_removed_and_resized_workloads_are_freed(self):
+        allocator = TopologyCpuAllocator()
+        w_a = get_test_workload("a", 4)
+        w_b = get_test_workload("b", 2)
+
+        cpu = allocator.isolate(get_allocate_request(get_cpu(), [w_a, w_b])).get_cpu()
+        self.assertEqual(6, len(cpu.get_claimed_threads()))
+
+        cpu = allocator.isolate(get_allocate_request(cpu, [w_b])).get_cpu()
+        self.assertEqual(0, len(get_thread_ids(cpu, "a")))
+        self.assertEqual(2, len(cpu.get_claimed_threads()))
+
+        w_b = get_test_workload("b", 3)
+        cpu = allocator.isolate(get_allocate_request(cpu, [w_b])).get_cpu()
+        self.assertEqual(3, len(get_thread_ids(cpu, "b")))
+
+    def test_oversubscribe_when_full(self):
+        allocator = TopologyCpuAllocator()
+        cpu = get_cpu(1, 2, 2)
+        w_a = get_test_workload("a", 4)
+        w_b = get_test_workload("b", 2)
+
+        response = allocator.isolate(get_allocate_request(cpu, [w_a, w_b]))
+        self.assertEqual(2, len(get_thread_ids(response.get_cpu(), "b")))
+        self.assertEqual(2, len(response.get_workload_allocations()))
@@ -0,0 +1,286 @@
+"""
+Drives the cpu allocators through the same seeded sequence of workload adds, removes and rebalances on hosts from
+1 package, 4 cores, 2 threads per core up to 4 packages, 48 cores, 2 threads per core, and reports per allocator and
+host shape:
+
+  - p50 and p99 isolate latency
+  - peak bytes allocated per isolate, measured in a separate traced pass so tracing does not skew the latencies
+  - mean and max cross package and shared core violations of each response, as detected by isolate/detect.py
+  - thread churn: the threads which workloads present in consecutive responses moved onto
+
+The remote allocator runs against the local reference isolation service.  Results are written as JSON with --output,
+and compared with a previous run's results with --baseline, in which case the exit status is 1 on any regression.
+
+    python -m tests.benchmark.allocators
+    python -m tests.benchmark.allocators --output results.json
+    python -m tests.benchmark.allocators --baseline results.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from concurrent import futures
+from types import SimpleNamespace
+from typing import Dict, List
+from unittest.mock import patch
+
+import grpc
+
+import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
+from tests.allocate.reference_isolation_service import ReferenceIsolationService
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import config_logs, get_test_workload, get_allocate_request, TestWorkloadMonitorManager
+from titus_isolate.allocate.allocate_response import AllocateResponse
+from titus_isolate.allocate.cpu_allocator import CpuAllocator
+from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
+from titus_isolate.allocate.naive_cpu_allocator import NaiveCpuAllocator
+from titus_isolate.allocate.noop_allocator import NoopCpuAllocator
+from titus_isolate.allocate.remote import allocator
+from titus_isolate.allocate.remote.allocator import GrpcRemoteIsolationAllocator
+from titus_isolate.allocate.remote.channel import close_channels
+from titus_isolate.allocate.topology_cpu_allocator import TopologyCpuAllocator
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import GRPC_REMOTE_ALLOC_ENDPOINT
+from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
+from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_config_manager, set_workload_monitor_manager
+
+SHAPES = [(1, 4, 2), (2, 16, 2), (2, 48, 2), (4, 48, 2)]
+ALLOCATORS = ["naive", "greedy", "topology", "noop", "remote"]
+DEFAULT_STEP_COUNT = 200
+DEFAULT_TRACED_STEP_COUNT = 50
+DEFAULT_SEED = 7
+
+# Workload sizes are drawn from these thread counts, and the host is filled up to this fraction of its threads
+THREAD_COUNTS = [1, 2, 2, 4, 4, 8, 16]
+MAX_LOAD = 0.85
+MIN_LOAD = 0.3
+
+# Numbers the remote allocator's instances
+__remote_instance_ids = itertools.count()
+
+ADD = "add"
+REMOVE = "remove"
+REBALANCE = "rebalance"
+
+# Latencies are noisy, so they only regress beyond this fraction of the baseline.  Placement quality is reproducible
+# for a given seed and regresses on any increase.
+DEFAULT_LATENCY_TOLERANCE = 0.5
+LATENCY_METRICS = ["p50_ms", "p99_ms", "peak_bytes"]
+QUALITY_METRICS = ["cross_package_mean", "cross_package_max", "shared_core_mean", "shared_core_max",
+                   "churn_threads"]
+
+
+def get_shape_name(shape) -> str:
+    return "x".join(str(s) for s in shape)
+
+
+def get_steps(shape, step_count: int, seed: int) -> List[tuple]:
+    """
+    :return: a (step type, workloads) tuple per step, the same for every allocator given a shape and seed
+    """
+    rand = random.Random("{}-{}".format(seed, get_shape_name(shape)))
+    package_count, cores_per_package, threads_per_core = shape
+    capacity = package_count * cores_per_package * threads_per_core
+
+    workloads = []
+    steps = []
+    for i in range(step_count):
+        claimed = sum(w.get_thread_count() for w in workloads)
+        free = int(capacity * MAX_LOAD) - claimed
+        sizes = [c for c in THREAD_COUNTS if c <= free]
+
+        roll = rand.random()
+        if len(sizes) > 0 and (claimed < capacity * MIN_LOAD or roll < 0.45 or len(workloads) == 0):
+            workloads = workloads + [get_test_workload("w{}".format(i), rand.choice(sizes))]
+            steps.append((ADD, workloads))
+        elif roll < 0.8 and len(workloads) > 0:
+            workloads = list(workloads)
+            workloads.pop(rand.randrange(len(workloads)))
+            steps.append((REMOVE, workloads))
+        else:
+            steps.append((REBALANCE, workloads))
+
+    return steps
+
+
+def get_thread_ids(response: AllocateResponse) -> Dict[str, set]:
+    return {a.get_workload_id(): set(a.get_thread_ids()) for a in response.get_workload_allocations()}
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))]
+
+
+def run_steps(cpu_allocator: CpuAllocator, shape, steps: List[tuple]) -> dict:
+    cpu = get_cpu(*shape)
+    latencies = []
+    cross_package = []
+    shared_core = []
+    churn = 0
+    last_thread_ids = {}
+
+    for _, workloads in steps:
+        request = get_allocate_request(cpu, workloads)
+        start = time.perf_counter()
+        response = cpu_allocator.isolate(request)
+        latencies.append(time.perf_counter() - start)
+
+        cpu = response.get_cpu()
+        cross_package.append(len(get_cross_package_violations(cpu)))
+        shared_core.append(len(get_shared_core_violations(cpu)))
+
+        thread_ids = get_thread_ids(response)
+        for w_id, w_thread_ids in thread_ids.items():
+            if w_id in last_thread_ids:
+                churn += len(w_thread_ids - last_thread_ids[w_id])
+        last_thread_ids = thread_ids
+
+    return {
+        "p50_ms": get_percentile(latencies, 50) * 1e3,
+        "p99_ms": get_percentile(latencies, 99) * 1e3,
+        "cross_package_mean": sum(cross_package) / len(cross_package),
+        "cross_package_max": max(cross_package),
+        "shared_core_mean": sum(shared_core) / len(shared_core),
+        "shared_core_max": max(shared_core),
+        "churn_threads": churn,
+    }
+
+
+def get_peak_bytes(cpu_allocator: CpuAllocator, shape, steps: List[tuple]) -> int:
+    cpu = get_cpu(*shape)
+    peaks = []
+
+    tracemalloc.start()
+    for _, workloads in steps:
+        request = get_allocate_request(cpu, workloads)
+        # Clearing the traces also resets the peak, and is available before python 3.9's reset_peak()
+        tracemalloc.clear_traces()
+        cpu = cpu_allocator.isolate(request).get_cpu()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak)
+    tracemalloc.stop()
+
+    return int(sum(peaks) / len(peaks))
+
+
+def get_allocator(name: str, shape, endpoint: str) -> CpuAllocator:
+    if name == "naive":
+        return NaiveCpuAllocator()
+    if name == "greedy":
+        return GreedyCpuAllocator()
+    if name == "topology":
+        return TopologyCpuAllocator()
+    if name == "noop":
+        return NoopCpuAllocator()
+    if name == "remote":
+        # Every run is a distinct instance, so the reference service keeps a separate placement for each
+        node = SimpleNamespace(metadata=SimpleNamespace(
+            name="i-{}-{}".format(get_shape_name(shape), next(__remote_instance_ids)), annotations={}))
+        set_config_manager(ConfigManager(TestPropertyProvider({GRPC_REMOTE_ALLOC_ENDPOINT: endpoint})))
+        with patch.object(allocator, 'get_node', lambda: node), \
+                patch.object(allocator, 'get_cpu_from_env', lambda: get_cpu(*shape)):
+            return GrpcRemoteIsolationAllocator()
+    raise ValueError("Unknown allocator: {}".format(name))
+
+
+def run(allocator_names: List[str], shapes: List[tuple], step_count: int, traced_step_count: int, seed: int) \
+        -> List[dict]:
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    pb_grpc.add_IsolationServiceServicer_to_server(ReferenceIsolationService(), server)
+    endpoint = "localhost:{}".format(server.add_insecure_port("localhost:0"))
+    server.start()
+
+    results = []
+    try:
+        for shape in shapes:
+            steps = get_steps(shape, step_count, seed)
+            for name in allocator_names:
+                # The naive allocator picks threads with the global random generator
+                random.seed(seed)
+                result = {"allocator": name, "shape": get_shape_name(shape), "steps": len(steps)}
+                result.update(run_steps(get_allocator(name, shape, endpoint), shape, steps))
+                result["peak_bytes"] = get_peak_bytes(
+                    get_allocator(name, shape, endpoint), shape, steps[:traced_step_count])
+                results.append(result)
+    finally:
+        close_channels()
+        server.stop(None)
+
+    return results
+
+
+def get_regressions(results: List[dict], baseline: List[dict], latency_tolerance: float) -> List[str]:
+    baseline = {(r["allocator"], r["shape"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = baseline.get((result["allocator"], result["shape"]), None)
+        if base is None:
+            continue
+
+        for metric in LATENCY_METRICS:
+            if result[metric] > base[metric] * (1 + latency_tolerance):
+                regressions.append("{} {} {}: {:.3f} > baseline {:.3f}".format(
+                    result["allocator"], result["shape"], metric, result[metric], base[metric]))
+        for metric in QUALITY_METRICS:
+            if result[metric] > base[metric] + 1e-9:
+                regressions.append("{} {} {}: {:.3f} > baseline {:.3f}".format(
+                    result["allocator"], result["shape"], metric, result[metric], base[metric]))
+    return regressions
+
+
+def print_results(results: List[dict]):
+    print("{:9s} {:8s} {:>8s} {:>8s} {:>10s} {:>8s} {:>6s} {:>8s} {:>6s} {:>7s}".format(
+        "allocator", "shape", "p50 ms", "p99 ms", "peak B", "x-pkg", "max", "shared", "max", "churn"))
+    for r in results:
+        print("{:9s} {:8s} {:8.3f} {:8.3f} {:10d} {:8.2f} {:6d} {:8.2f} {:6d} {:7d}".format(
+            r["allocator"], r["shape"], r["p50_ms"], r["p99_ms"], r["peak_bytes"],
+            r["cross_package_mean"], r["cross_package_max"], r["shared_core_mean"], r["shared_core_max"],
+            r["churn_threads"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks cpu allocator latency and placement quality.")
+    parser.add_argument("--allocators", nargs="+", choices=ALLOCATORS, default=ALLOCATORS)
+    parser.add_argument("--shapes", nargs="+", default=[get_shape_name(s) for s in SHAPES],
+                        help="host shapes as <packages>x<cores per package>x<threads per core>")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEP_COUNT)
+    parser.add_argument("--traced-steps", type=int, default=DEFAULT_TRACED_STEP_COUNT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", help="writes the results as JSON to this file")
+    parser.add_argument("--baseline", help="compares the results with those of a previous --output")
+    parser.add_argument("--latency-tolerance", type=float, default=DEFAULT_LATENCY_TOLERANCE)
+    args = parser.parse_args()
+
+    config_logs(logging.ERROR)
+    set_workload_monitor_manager(TestWorkloadMonitorManager())
+    shapes = [tuple(int(s) for s in shape.split("x")) for shape in args.shapes]
+
+    results = run(args.allocators, shapes, args.steps, args.traced_steps, args.seed)
+    print_results(results)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2, sort_keys=True)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["seed"] != args.seed:
+            print("baseline was run with seed {}, not {}".format(baseline["seed"], args.seed))
+            sys.exit(2)
+
+        regressions = get_regressions(results, baseline["results"], args.latency_tolerance)
+        for regression in regressions:
+            print("REGRESSION: {}".format(regression))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
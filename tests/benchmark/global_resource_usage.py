@@ -0,0 +1,76 @@
+"""
+Measures building, reading and serializing the GlobalResourceUsage of 200 workloads, 5 resources and 60 samples, as
+is done for every allocation's event log record and every usage prediction.
+
+    python -m tests.benchmark.global_resource_usage
+"""
+import random
+import time
+import tracemalloc
+
+from titus_isolate.allocate.constants import RESOURCE_USAGE_NAMES
+from titus_isolate.monitor.resource_usage import ResourceUsage, GlobalResourceUsage
+from titus_isolate.monitor.utils import resource_usages_to_dict
+
+WORKLOAD_COUNT = 200
+SAMPLE_COUNT = 60
+ITERATIONS = 20
+
+
+def get_usages():
+    usages = []
+    for i in range(WORKLOAD_COUNT):
+        for resource_name in RESOURCE_USAGE_NAMES:
+            # Some series are short, so they need padding
+            sample_count = SAMPLE_COUNT if i % 4 != 0 else SAMPLE_COUNT // 2
+            values = [random.random() * 1e9 for _ in range(sample_count)]
+            usages.append(ResourceUsage("workload_{}".format(i), resource_name, 0, 60, values))
+    return usages
+
+
+def build(usages):
+    return GlobalResourceUsage(resource_usages_to_dict(usages))
+
+
+def read(usage: GlobalResourceUsage):
+    for i in range(WORKLOAD_COUNT):
+        for values in usage.get_all_usage_for_workload("workload_{}".format(i)).values():
+            [float(v) for v in values]
+
+
+def build_and_serialize(usages):
+    build(usages).serialize()
+
+
+def measure(func, arg):
+    tracemalloc.start()
+    for _ in range(ITERATIONS):
+        result = func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Timing without tracing
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(arg)
+    untraced_duration = time.perf_counter() - start
+
+    return result, untraced_duration / ITERATIONS * 1e3, peak
+
+
+def main():
+    random.seed(0)
+    usages = get_usages()
+
+    print("usage: {} workloads x {} resources x {} samples".format(
+        WORKLOAD_COUNT, len(RESOURCE_USAGE_NAMES), SAMPLE_COUNT))
+    usage, build_ms, build_peak = measure(build, usages)
+    print("build:               {:8.2f} ms, peak {:10d} bytes".format(build_ms, build_peak))
+    _, read_ms, read_peak = measure(read, usage)
+    print("read:                {:8.2f} ms, peak {:10d} bytes".format(read_ms, read_peak))
+    _, serialize_ms, serialize_peak = measure(build_and_serialize, usages)
+    print("build and serialize: {:8.2f} ms, peak {:10d} bytes".format(serialize_ms, serialize_peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares parsing a Prometheus range query response by decoding it into Python objects with parsing it directly into
+numeric arrays, for one resource of 200 workloads with 62 samples each.
+
+    python -m tests.benchmark.prom_parser
+"""
+import json
+import logging
+import random
+import time
+import tracemalloc
+
+from tests.utils import config_logs
+from titus_isolate.allocate.constants import CPU_USAGE
+from titus_isolate.monitor.prom_resource_usage_provider import PrometheusResourceUsageProvider
+
+WORKLOAD_COUNT = 200
+SAMPLE_COUNT = 62
+ITERATIONS = 20
+
+
+def get_response_text() -> str:
+    results = []
+    for i in range(WORKLOAD_COUNT):
+        results.append({
+            "metric": {
+                "instance": "i-abc123",
+                "job": "agent-otel-ml-pipeline",
+                "v3_job_titus_netflix_com_task_id": "workload_{}".format(i)
+            },
+            "values": [[1604698494.296 + 60 * j, str(random.random() * 1e9)] for j in range(SAMPLE_COUNT)]
+        })
+
+    return json.dumps({"status": "success", "data": {"resultType": "matrix", "result": results}},
+                      separators=(',', ':'))
+
+
+def parse_decoded(text: str):
+    return PrometheusResourceUsageProvider._parse_prom_response(
+        PrometheusResourceUsageProvider(), CPU_USAGE, json.loads(text), 0.000000001)
+
+
+def parse_text(text: str):
+    return PrometheusResourceUsageProvider._parse_prom_response_text(CPU_USAGE, text, 0.000000001)
+
+
+def measure(func, text):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(text)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return duration / ITERATIONS * 1e3, peak
+
+
+def main():
+    config_logs(logging.WARNING)
+    random.seed(0)
+    text = get_response_text()
+
+    print("response: {} workloads x {} samples, {} bytes".format(WORKLOAD_COUNT, SAMPLE_COUNT, len(text)))
+    for name, func in [("decoded", parse_decoded), ("text", parse_text)]:
+        duration_ms, peak = measure(func, text)
+        print("{:8s} {:8.2f} ms, peak {:10d} bytes".format(name, duration_ms, peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares full and delta remote isolation requests against the local reference isolation service on a 2 package, 48
+core, 2 thread per core host, adding one workload at a time until half of the threads are claimed and then removing
+them again.  Request sizes are the serialized IsolationRequest sizes.
+
+    python -m tests.benchmark.remote_delta
+"""
+import logging
+import time
+from concurrent import futures
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import grpc
+
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
+from tests.allocate.reference_isolation_service import ReferenceIsolationService
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import config_logs, get_test_workload, get_allocate_request
+from titus_isolate.allocate.remote import allocator
+from titus_isolate.allocate.remote.allocator import GrpcRemoteIsolationAllocator
+from titus_isolate.allocate.remote.channel import close_channels
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import GRPC_REMOTE_ALLOC_ENDPOINT, GRPC_REMOTE_ALLOC_DELTA_MODE
+from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_config_manager
+
+PACKAGE_COUNT = 2
+CORES_PER_PACKAGE = 48
+THREADS_PER_CORE = 2
+WORKLOAD_COUNT = 48
+THREADS_PER_WORKLOAD = 2
+
+
+class RequestSizeInterceptor(grpc.ServerInterceptor):
+
+    def __init__(self):
+        self.sizes = []
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+
+        def unary_unary(request, context):
+            if isinstance(request, pb.IsolationRequest):
+                self.sizes.append(request.ByteSize())
+            return handler.unary_unary(request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            unary_unary,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+
+
+def run(endpoint: str, delta_mode: bool, instance_id: str):
+    node = SimpleNamespace(metadata=SimpleNamespace(name=instance_id, annotations={}))
+    set_config_manager(ConfigManager(TestPropertyProvider({
+        GRPC_REMOTE_ALLOC_ENDPOINT: endpoint,
+        GRPC_REMOTE_ALLOC_DELTA_MODE: delta_mode})))
+    with patch.object(allocator, 'get_node', lambda: node):
+        cpu_allocator = GrpcRemoteIsolationAllocator()
+
+    cpu = get_cpu(PACKAGE_COUNT, CORES_PER_PACKAGE, THREADS_PER_CORE)
+    all_workloads = [get_test_workload("w{}".format(i), THREADS_PER_WORKLOAD) for i in range(WORKLOAD_COUNT)]
+    steps = [all_workloads[:i] for i in range(1, WORKLOAD_COUNT + 1)] + \
+            [all_workloads[i:] for i in range(1, WORKLOAD_COUNT + 1)]
+
+    start = time.perf_counter()
+    for workloads in steps:
+        cpu = cpu_allocator.isolate(get_allocate_request(cpu, workloads)).get_cpu()
+    duration = time.perf_counter() - start
+
+    return duration / len(steps) * 1e3, cpu_allocator.get_delta_count()
+
+
+def main():
+    config_logs(logging.WARNING)
+    interceptor = RequestSizeInterceptor()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2), interceptors=[interceptor])
+    pb_grpc.add_IsolationServiceServicer_to_server(ReferenceIsolationService(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    endpoint = "localhost:{}".format(port)
+
+    with patch.object(allocator, 'get_cpu_from_env',
+                      lambda: get_cpu(PACKAGE_COUNT, CORES_PER_PACKAGE, THREADS_PER_CORE)):
+        print("host: {}x{}x{}, {} workloads of {} threads added then removed".format(
+            PACKAGE_COUNT, CORES_PER_PACKAGE, THREADS_PER_CORE, WORKLOAD_COUNT, THREADS_PER_WORKLOAD))
+        for name, delta_mode in [("full", False), ("delta", True)]:
+            interceptor.sizes = []
+            duration_ms, delta_count = run(endpoint, delta_mode, "i-{}".format(name))
+            print("{:6s} {:8.2f} ms per isolate, {:4d} deltas, {:8.1f} mean request bytes".format(
+                name, duration_ms, delta_count, sum(interceptor.sizes) / len(interceptor.sizes)))
+
+    close_channels()
+    server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures the memory allocated by the thread ownership reads performed around a single isolate on a fully packed
+2 package, 24 core, 2 thread CPU.
+
+    python -m tests.benchmark.thread_ownership
+"""
+import copy
+import logging
+import time
+import tracemalloc
+
+from tests.utils import config_logs, get_test_workload
+from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
+from titus_isolate.isolate.metrics_utils import get_allocated_size, get_oversubscribed_thread_count
+from titus_isolate.model.processor.config import get_cpu
+
+PACKAGE_COUNT = 2
+CORES_PER_PACKAGE = 24
+THREADS_PER_CORE = 2
+ITERATIONS = 100
+
+
+def get_packed_cpu():
+    cpu = get_cpu(PACKAGE_COUNT, CORES_PER_PACKAGE, THREADS_PER_CORE)
+    threads = cpu.get_threads()
+    for i in range(0, len(threads), THREADS_PER_CORE):
+        workload = get_test_workload("workload_{}".format(i), THREADS_PER_CORE)
+        for t in threads[i:i + THREADS_PER_CORE]:
+            t.claim(workload.get_task_id())
+    return cpu
+
+
+def isolate_reads(cpu):
+    # The ownership reads a WorkloadManager performs around one isolate: copy the CPU, compare the result with the
+    # current placement, then scan it for violations and metrics.
+    new_cpu = copy.deepcopy(cpu)
+    assert cpu == new_cpu
+    get_cross_package_violations(new_cpu)
+    get_shared_core_violations(new_cpu)
+    get_allocated_size(new_cpu)
+    get_oversubscribed_thread_count(new_cpu)
+
+
+def count_ownership_copies(cpu):
+    # A read which returns a new object on every call allocated a copy of the thread's ownership.
+    copies = 0
+    for t in cpu.get_threads():
+        if t.get_workload_ids() is not t.get_workload_ids():
+            copies += 1
+    return copies
+
+
+def main():
+    config_logs(logging.WARNING)
+    cpu = get_packed_cpu()
+    isolate_reads(cpu)
+
+    tracemalloc.start()
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        # Clearing the traces also resets the peak, and is available before python 3.9's reset_peak()
+        tracemalloc.clear_traces()
+        isolate_reads(cpu)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak)
+    duration = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print("cpu: {}x{}x{}, {} claimed threads".format(
+        PACKAGE_COUNT, CORES_PER_PACKAGE, THREADS_PER_CORE, len(cpu.get_claimed_threads())))
+    print("ownership copies per thread scan: {}".format(count_ownership_copies(cpu)))
+    print("peak bytes allocated per isolate: {}".format(int(sum(peaks) / len(peaks))))
+    print("mean time per isolate (traced): {:.1f} us".format(duration / ITERATIONS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import logging
+import unittest
+from threading import Event, Lock
+
+from spectator import Registry
+
+from tests.utils import config_logs, wait_until, gauge_value_equals
+from titus_isolate.cgroup.cgroup_writer import CgroupWriter
+from titus_isolate.metrics.constants import CGROUP_WRITE_QUEUE_DEPTH_KEY, CGROUP_WRITE_COALESCED_KEY
+
+config_logs(logging.DEBUG)
+
+
+class TestCgroupWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = Lock()
+        self.writes = []
+
+    def __record(self, container_name, knob, value):
+        def write():
+            with self.lock:
+                self.writes.append((container_name, knob, value))
+        return write
+
+    def __block(self, container_name, knob, started: Event, release: Event):
+        def write():
+            started.set()
+            release.wait()
+            with self.lock:
+                self.writes.append((container_name, knob, None))
+        return write
+
+    def test_writes_are_applied_in_order_per_container(self):
+        writer = CgroupWriter(thread_count=4)
+        for i in range(20):
+            container_name = "c{}".format(i % 3)
+            writer.write(container_name, "k{}".format(i), self.__record(container_name, "k{}".format(i), i))
+
+        wait_until(lambda: not writer.has_pending_work())
+        self.assertEqual(20, len(self.writes))
+        for container_name in ["c0", "c1", "c2"]:
+            values = [v for c, _, v in self.writes if c == container_name]
+            self.assertEqual(sorted(values), values)
+
+    def test_pending_writes_are_coalesced(self):
+        writer = CgroupWriter(thread_count=1)
+        started = Event()
+        release = Event()
+
+        # Hold the only worker so later writes queue up behind it
+        writer.write("a", "cpuset", self.__block("a", "cpuset", started, release))
+        started.wait()
+
+        writer.write("a", "cpuset", self.__record("a", "cpuset", 1))
+        writer.write("a", "quota", self.__record("a", "quota", 1))
+        writer.write("a", "cpuset", self.__record("a", "cpuset", 2))
+        self.assertEqual(2, writer.get_queue_depth())
+        self.assertEqual(1, writer.get_coalesced_count())
+        self.assertTrue(writer.has_pending_work())
+
+        registry = Registry()
+        writer.set_registry(registry, {})
+        writer.report_metrics({})
+        self.assertTrue(gauge_value_equals(registry, CGROUP_WRITE_QUEUE_DEPTH_KEY, 2))
+        self.assertTrue(gauge_value_equals(registry, CGROUP_WRITE_COALESCED_KEY, 1))
+
+        release.set()
+        wait_until(lambda: not writer.has_pending_work())
+        self.assertEqual(
+            [("a", "cpuset", None), ("a", "cpuset", 2), ("a", "quota", 1)],
+            self.writes)
+
+    def test_failed_write_does_not_stop_the_queue(self):
+        writer = CgroupWriter(thread_count=1)
+
+        def fail():
+            raise IOError("no such file")
+
+        writer.write("a", "cpuset", fail)
+        writer.write("a", "quota", self.__record("a", "quota", 1))
+
+        wait_until(lambda: not writer.has_pending_work())
+        self.assertEqual([("a", "quota", 1)], self.writes)
+
+    def test_release_drops_pending_writes(self):
+        writer = CgroupWriter(thread_count=1)
+        started = Event()
+        release = Event()
+        released = Event()
+
+        writer.write("a", "cpuset", self.__block("a", "cpuset", started, release))
+        started.wait()
+        writer.write("a", "quota", self.__record("a", "quota", 1))
+        writer.write("b", "quota", self.__record("b", "quota", 1))
+
+        # The write in progress completes before the release is done
+        writer.release("a", released.set)
+        self.assertEqual(1, writer.get_queue_depth())
+        self.assertFalse(released.is_set())
+
+        release.set()
+        wait_until(lambda: not writer.has_pending_work())
+        self.assertTrue(released.is_set())
+        self.assertEqual([("a", "cpuset", None), ("b", "quota", 1)], self.writes)
+
+        # Containers without writes in progress are released right away
+        released.clear()
+        writer.release("b", released.set)
+        self.assertTrue(released.is_set())
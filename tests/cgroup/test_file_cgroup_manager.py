@@ -0,0 +1,102 @@
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from spectator import Registry
+
+from tests.utils import config_logs, wait_until, gauge_value_equals
+from titus_isolate.cgroup import utils
+from titus_isolate.cgroup.file_cgroup_manager import FileCgroupManager
+from titus_isolate.metrics.constants import CGROUP_WRITE_PERFORMED_KEY, CGROUP_WRITE_SKIPPED_KEY
+
+config_logs(logging.DEBUG)
+
+CONTAINER_NAME = "test_container"
+CGROUP_PATH = "/containers.slice/test_container"
+
+
+class TestFileCgroupManager(unittest.TestCase):
+
+    def setUp(self):
+        self.__root = tempfile.TemporaryDirectory()
+        root = self.__root.name
+        self.__patches = [
+            patch.object(utils, 'ROOT_CGROUP_PATH', root),
+            patch.object(utils, 'TITUS_INITS_PATH', os.path.join(root, "inits"))]
+        for p in self.__patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.__patches:
+            p.stop()
+        utils.invalidate_cgroup_paths(CONTAINER_NAME)
+        self.__root.cleanup()
+
+    def __create_container(self):
+        root = self.__root.name
+        os.makedirs(os.path.join(root, "inits", CONTAINER_NAME))
+        with open(os.path.join(root, "inits", CONTAINER_NAME, "cgroup"), 'w') as f:
+            f.write("9:cpu,cpuacct:{}\n4:cpuset:{}\n".format(CGROUP_PATH, CGROUP_PATH))
+        os.makedirs(os.path.join(root, "cpuset" + CGROUP_PATH))
+        os.makedirs(os.path.join(root, "cpu,cpuacct" + CGROUP_PATH))
+
+    def test_unchanged_writes_are_skipped(self):
+        self.__create_container()
+        manager = FileCgroupManager()
+
+        manager.set_cpuset(CONTAINER_NAME, [1, 2])
+        manager.set_quota(CONTAINER_NAME, 200000)
+        manager.set_memory_migrate(CONTAINER_NAME, True)
+        wait_until(lambda: not manager.has_pending_work())
+        self.assertEqual(3, manager.get_performed_write_count())
+        self.assertEqual(0, manager.get_skipped_write_count())
+
+        # Only the cpuset changed
+        manager.set_cpuset(CONTAINER_NAME, [3])
+        manager.set_quota(CONTAINER_NAME, 200000)
+        manager.set_memory_migrate(CONTAINER_NAME, True)
+        wait_until(lambda: not manager.has_pending_work())
+        self.assertEqual(4, manager.get_performed_write_count())
+        self.assertEqual(2, manager.get_skipped_write_count())
+        self.assertEqual([3], manager.get_cpuset(CONTAINER_NAME))
+        self.assertEqual(200000, manager.get_quota(CONTAINER_NAME))
+        self.assertTrue(manager.get_memory_migrate(CONTAINER_NAME))
+
+        registry = Registry()
+        manager.set_registry(registry, {})
+        manager.report_metrics({})
+        self.assertTrue(gauge_value_equals(registry, CGROUP_WRITE_PERFORMED_KEY, 4))
+        self.assertTrue(gauge_value_equals(registry, CGROUP_WRITE_SKIPPED_KEY, 2))
+
+        # Released containers forget their values
+        manager.release_container(CONTAINER_NAME)
+        manager.set_quota(CONTAINER_NAME, 200000)
+        wait_until(lambda: not manager.has_pending_work())
+        self.assertEqual(5, manager.get_performed_write_count())
+
+    def test_failed_writes_are_retried(self):
+        manager = FileCgroupManager()
+
+        manager.set_shares(CONTAINER_NAME, 100)
+        wait_until(lambda: not manager.has_pending_work())
+
+        self.__create_container()
+        manager.set_shares(CONTAINER_NAME, 100)
+        wait_until(lambda: not manager.has_pending_work())
+        self.assertEqual(2, manager.get_performed_write_count())
+        self.assertEqual(0, manager.get_skipped_write_count())
+        self.assertEqual(100, manager.get_shares(CONTAINER_NAME))
+
+    def test_released_containers_do_not_keep_cached_paths(self):
+        self.__create_container()
+        manager = FileCgroupManager()
+
+        manager.set_cpuset(CONTAINER_NAME, [1, 2])
+        manager.set_quota(CONTAINER_NAME, 200000)
+        manager.release_container(CONTAINER_NAME)
+        wait_until(lambda: not manager.has_pending_work())
+
+        self.assertFalse(utils.has_cached_cgroup_paths(CONTAINER_NAME))
+        self.assertEqual(set(), manager.get_isolated_workload_ids())
@@ -2,11 +2,15 @@ import unittest
 from unittest.mock import MagicMock
 
 from tests.cgroup.mock_cgroup_manager import MockCgroupManager
+from tests.config.test_property_provider import TestPropertyProvider
 from tests.test_exit_handler import TestExitHandler
 from titus_isolate.cgroup.cgroup_manager import CgroupManager
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS
 from titus_isolate.constants import RECONCILIATION_FAILURE_EXIT
 from titus_isolate.isolate.reconciler import Reconciler
 from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.utils import set_config_manager
 
 EXIT_HANDLER = TestExitHandler()
 
@@ -16,6 +20,7 @@ class TestUtils(unittest.TestCase):
     def setUp(self):
         global EXIT_HANDLER
         EXIT_HANDLER = TestExitHandler()
+        set_config_manager(ConfigManager(TestPropertyProvider({})))
 
     def test_get_workloads(self):
         reconciler = Reconciler(MockCgroupManager(), None)
@@ -74,15 +79,12 @@ class TestUtils(unittest.TestCase):
 
         cgroup_manager = CgroupManager()
         cgroup_manager.get_cpuset = MagicMock(return_value=[])
+        cgroup_manager.set_cpuset = MagicMock()
 
         reconciler = Reconciler(cgroup_manager, EXIT_HANDLER)
-        reconciler.reconcile(cpu)
-        self.__validate_state(
-            reconciler,
-            EXIT_HANDLER,
-            exit_code=RECONCILIATION_FAILURE_EXIT,
-            expected_success_count=1,  # The mock exit handler doesn't actually kill anything, so we get a false success
-            expected_skip_count=0)
+        self.__reconcile_until_exit(reconciler, cpu)
+        self.assertEqual(DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS, cgroup_manager.set_cpuset.call_count)
+        cgroup_manager.set_cpuset.assert_called_with(workload_id, [0])
 
     def test_reconcile_cpuset_mismatch(self):
         cpu = get_cpu()
@@ -92,14 +94,56 @@ class TestUtils(unittest.TestCase):
         cgroup_manager = CgroupManager()
         cgroup_manager.get_isolated_workload_ids = MagicMock(return_value=[workload_id])
         cgroup_manager.get_cpuset = MagicMock(return_value=[42])
+        cgroup_manager.set_cpuset = MagicMock()
 
         reconciler = Reconciler(cgroup_manager, EXIT_HANDLER)
+        self.__reconcile_until_exit(reconciler, cpu)
+        self.assertEqual(DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS, reconciler.get_drift_count())
+        self.assertEqual(DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS, reconciler.get_repair_failure_count())
+
+    def test_reconcile_repairs_drift(self):
+        cpu = get_cpu()
+        cpu.get_threads()[0].claim("a")
+        cpu.get_threads()[1].claim("b")
+
+        cgroup_manager = MockCgroupManager()
+        cgroup_manager.set_cpuset("a", [42])
+        cgroup_manager.set_cpuset("b", [cpu.get_threads()[1].get_id()])
+
+        reconciler = Reconciler(cgroup_manager, EXIT_HANDLER)
+        for _ in range(DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS):
+            reconciler.reconcile(cpu)
+
+        # Only the drifted workload is re-applied
+        self.assertEqual([0], cgroup_manager.get_cpuset("a"))
+        self.assertEqual(2, cgroup_manager.container_update_counts["a"])
+        self.assertEqual(1, cgroup_manager.container_update_counts["b"])
+        self.assertEqual(1, reconciler.get_drift_count())
+        self.assertEqual(0, reconciler.get_repair_failure_count())
+        self.__validate_state(
+            reconciler,
+            EXIT_HANDLER,
+            exit_code=None,
+            expected_success_count=DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS,
+            expected_skip_count=0)
+
+    def __reconcile_until_exit(self, reconciler, cpu):
+        # Failed repairs only cause an exit once they have failed on consecutive reconciliations
+        for i in range(DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS - 1):
+            reconciler.reconcile(cpu)
+            self.__validate_state(
+                reconciler,
+                EXIT_HANDLER,
+                exit_code=None,
+                expected_success_count=i + 1,
+                expected_skip_count=0)
+
         reconciler.reconcile(cpu)
         self.__validate_state(
             reconciler,
             EXIT_HANDLER,
             exit_code=RECONCILIATION_FAILURE_EXIT,
-            expected_success_count=1,  # The mock exit handler doesn't actually kill anything, so we get a false success
+            expected_success_count=DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS,  # The mock exit handler doesn't actually kill anything, so we get a false success
             expected_skip_count=0)
 
     def test_reconcile_cpuset_match(self):
@@ -0,0 +1,99 @@
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tests.utils import config_logs, wait_until
+from titus_isolate.cgroup import utils
+from titus_isolate.cgroup.file_cgroup_manager import FileCgroupManager
+from titus_isolate.cgroup.unified_cgroup_manager import UnifiedCgroupManager
+from titus_isolate.cgroup.utils import shares_to_weight, weight_to_shares, cpu_max_to_quota, quota_to_cpu_max
+from titus_isolate.isolate.utils import get_cgroup_manager
+
+config_logs(logging.DEBUG)
+
+CONTAINER_NAME = "test_container"
+CGROUP_PATH = "/containers.slice/test_container"
+
+
+class TestUnifiedCgroupManager(unittest.TestCase):
+
+    def setUp(self):
+        self.__root = tempfile.TemporaryDirectory()
+        root = self.__root.name
+        self.__patches = [
+            patch.object(utils, 'ROOT_CGROUP_PATH', root),
+            patch.object(utils, 'TITUS_INITS_PATH', os.path.join(root, "inits"))]
+        for p in self.__patches:
+            p.start()
+
+        # A fake unified hierarchy with a single container
+        with open(os.path.join(root, "cgroup.controllers"), 'w') as f:
+            f.write("cpuset cpu io memory pids\n")
+        os.makedirs(os.path.join(root, "inits", CONTAINER_NAME))
+        with open(os.path.join(root, "inits", CONTAINER_NAME, "cgroup"), 'w') as f:
+            f.write("0::{}\n".format(CGROUP_PATH))
+        self.__cgroup_dir = root + CGROUP_PATH
+        os.makedirs(self.__cgroup_dir)
+
+    def tearDown(self):
+        for p in self.__patches:
+            p.stop()
+        utils.invalidate_cgroup_paths(CONTAINER_NAME)
+        self.__root.cleanup()
+
+    def __read_file(self, file_name):
+        with open(os.path.join(self.__cgroup_dir, file_name), 'r') as f:
+            return f.read()
+
+    def test_selected_for_unified_hierarchy(self):
+        self.assertTrue(isinstance(get_cgroup_manager(), UnifiedCgroupManager))
+
+        os.remove(os.path.join(self.__root.name, "cgroup.controllers"))
+        cgroup_manager = get_cgroup_manager()
+        self.assertTrue(isinstance(cgroup_manager, FileCgroupManager))
+        self.assertFalse(isinstance(cgroup_manager, UnifiedCgroupManager))
+
+    def test_write_and_read_knobs(self):
+        manager = UnifiedCgroupManager()
+        manager.set_cpuset(CONTAINER_NAME, [1, 2, 3, 8])
+        manager.set_quota(CONTAINER_NAME, 400000)
+        manager.set_shares(CONTAINER_NAME, 1024)
+        wait_until(lambda: not manager.has_pending_work())
+
+        self.assertEqual("1,2,3,8", self.__read_file("cpuset.cpus"))
+        self.assertEqual("400000 100000", self.__read_file("cpu.max"))
+        self.assertEqual("39", self.__read_file("cpu.weight"))
+
+        self.assertEqual([1, 2, 3, 8], manager.get_cpuset(CONTAINER_NAME))
+        self.assertEqual(400000, manager.get_quota(CONTAINER_NAME))
+        self.assertEqual(weight_to_shares(39), manager.get_shares(CONTAINER_NAME))
+        self.assertEqual([CONTAINER_NAME], list(manager.get_isolated_workload_ids()))
+
+        manager.set_quota(CONTAINER_NAME, -1)
+        wait_until(lambda: not manager.has_pending_work())
+        self.assertEqual("max 100000", self.__read_file("cpu.max"))
+        self.assertEqual(-1, manager.get_quota(CONTAINER_NAME))
+
+    def test_memory_flags_are_not_written(self):
+        manager = UnifiedCgroupManager()
+        manager.set_memory_migrate(CONTAINER_NAME, True)
+        manager.set_memory_spread_page(CONTAINER_NAME, True)
+        manager.set_memory_spread_slab(CONTAINER_NAME, True)
+
+        self.assertFalse(manager.has_pending_work())
+        self.assertEqual(0, manager.get_performed_write_count())
+        self.assertFalse(manager.get_memory_migrate(CONTAINER_NAME))
+        self.assertEqual([], os.listdir(self.__cgroup_dir))
+
+    def test_conversions(self):
+        self.assertEqual(1, shares_to_weight(2))
+        self.assertEqual(10000, shares_to_weight(262144))
+        self.assertEqual(1, shares_to_weight(0))
+        self.assertEqual(2, weight_to_shares(1))
+        self.assertEqual(262144, weight_to_shares(10000))
+
+        self.assertEqual("200000 100000", quota_to_cpu_max(200000))
+        self.assertEqual(200000, cpu_max_to_quota("100000 50000"))
+        self.assertEqual(-1, cpu_max_to_quota("max 100000"))
@@ -1,11 +1,15 @@
 import copy
 import logging
 import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from tests.config.test_property_provider import TestPropertyProvider
 from tests.utils import config_logs
-from titus_isolate.cgroup.utils import _get_cgroup_path_from_list, CPUSET, get_cgroup_path_from_file, parse_cpuset
+from titus_isolate.cgroup import utils
+from titus_isolate.cgroup.utils import _get_cgroup_path_from_list, CPUSET, get_cgroup_path_from_file, parse_cpuset, \
+    set_cpuset, get_cpuset, invalidate_cgroup_paths, has_cached_cgroup_paths
 from titus_isolate.config.config_manager import ConfigManager
 from titus_isolate.utils import set_config_manager
 
@@ -65,4 +69,35 @@ class TestUtils(unittest.TestCase):
         threads = sorted(parse_cpuset(s))
         self.assertEqual([2, 5, 7, 8, 9, 12], threads)
 
-
+    def test_cgroup_paths_are_cached_and_re_resolved(self):
+        container_name = "test_container"
+        with tempfile.TemporaryDirectory() as root, \
+                patch.object(utils, 'ROOT_CGROUP_PATH', root), \
+                patch.object(utils, 'TITUS_INITS_PATH', os.path.join(root, "inits")), \
+                patch.object(utils, 'get_cgroup_path_from_file', wraps=get_cgroup_path_from_file) as resolve:
+
+            def move_cgroup(cgroup_path):
+                os.makedirs(os.path.join(root, "cpuset" + cgroup_path))
+                os.makedirs(os.path.join(root, "inits", container_name), exist_ok=True)
+                with open(os.path.join(root, "inits", container_name, "cgroup"), 'w') as f:
+                    f.write("4:cpuset:{}\n".format(cgroup_path))
+
+            move_cgroup("/a")
+            invalidate_cgroup_paths(container_name)
+
+            set_cpuset(container_name, "1,2")
+            self.assertEqual("1,2", get_cpuset(container_name))
+            self.assertEqual(1, resolve.call_count)
+            self.assertTrue(has_cached_cgroup_paths(container_name))
+
+            # A stale cached path is re-resolved when the write fails
+            move_cgroup("/b")
+            os.rename(os.path.join(root, "cpuset/a"), os.path.join(root, "cpuset/old"))
+            set_cpuset(container_name, "3")
+            self.assertEqual("3", get_cpuset(container_name))
+            self.assertEqual(2, resolve.call_count)
+
+            invalidate_cgroup_paths(container_name)
+            self.assertFalse(has_cached_cgroup_paths(container_name))
+            self.assertEqual("3", get_cpuset(container_name))
+            self.assertEqual(3, resolve.call_count)
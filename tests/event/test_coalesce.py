@@ -0,0 +1,76 @@
+import json
+import logging
+import unittest
+import uuid
+
+from tests.event.mock_docker import get_container_create_event, get_container_die_event
+from tests.utils import config_logs
+from titus_isolate.event.constants import ACTION, REBALANCE, RECONCILE, REBALANCE_EVENT, RECONCILE_EVENT
+from titus_isolate.event.utils import coalesce_events, get_container_name
+
+config_logs(logging.DEBUG)
+
+
+def start(name):
+    return json.loads(get_container_create_event(1, name, name).decode("utf-8"))
+
+
+def die(name):
+    return json.loads(get_container_die_event(name, name).decode("utf-8"))
+
+
+def internal(event):
+    return json.loads(event.decode("utf-8"))
+
+
+class TestCoalesce(unittest.TestCase):
+
+    def test_start_and_die_cancel(self):
+        a = str(uuid.uuid4())
+        b = str(uuid.uuid4())
+        container_events, internal_events, coalesced_count = coalesce_events([start(a), start(b), die(a)])
+
+        self.assertEqual([b], [get_container_name(e) for e in container_events])
+        self.assertEqual([], internal_events)
+        self.assertEqual(2, coalesced_count)
+
+    def test_die_before_start_is_kept(self):
+        a = str(uuid.uuid4())
+        container_events, _, coalesced_count = coalesce_events([die(a), start(a)])
+
+        self.assertEqual(2, len(container_events))
+        self.assertEqual(0, coalesced_count)
+
+    def test_duplicate_starts_collapse(self):
+        a = str(uuid.uuid4())
+        container_events, _, coalesced_count = coalesce_events([start(a), start(a)])
+
+        self.assertEqual(1, len(container_events))
+        self.assertEqual(1, coalesced_count)
+
+    def test_duplicate_internal_events_collapse(self):
+        events = [internal(RECONCILE_EVENT), internal(REBALANCE_EVENT), internal(RECONCILE_EVENT),
+                  internal(REBALANCE_EVENT)]
+        container_events, internal_events, coalesced_count = coalesce_events(events)
+
+        self.assertEqual([], container_events)
+        self.assertEqual([RECONCILE, REBALANCE], [e[ACTION] for e in internal_events])
+        self.assertEqual(2, coalesced_count)
+
+    def test_rebalance_dropped_when_batch_isolates(self):
+        a = str(uuid.uuid4())
+        events = [internal(REBALANCE_EVENT), start(a), internal(RECONCILE_EVENT)]
+        container_events, internal_events, coalesced_count = coalesce_events(events)
+
+        self.assertEqual(1, len(container_events))
+        self.assertEqual([RECONCILE], [e[ACTION] for e in internal_events])
+        self.assertEqual(1, coalesced_count)
+
+    def test_rebalance_kept_when_container_events_cancel(self):
+        a = str(uuid.uuid4())
+        events = [start(a), internal(REBALANCE_EVENT), die(a)]
+        container_events, internal_events, coalesced_count = coalesce_events(events)
+
+        self.assertEqual([], container_events)
+        self.assertEqual([REBALANCE], [e[ACTION] for e in internal_events])
+        self.assertEqual(2, coalesced_count)
@@ -10,9 +10,11 @@ from tests.event.mock_docker import get_container_create_event, MockEventProvide
 from tests.utils import config_logs, wait_until, TestContext, gauge_value_equals, counter_value_equals, \
     get_simple_test_pod
 from titus_isolate.config.config_manager import ConfigManager
-from titus_isolate.event.constants import CONTAINER, REBALANCE_EVENT, START
+from titus_isolate.event.constants import CONTAINER, REBALANCE_EVENT, START, ACTION
 from titus_isolate.event.event_manager import EventManager
-from titus_isolate.metrics.constants import QUEUE_DEPTH_KEY, EVENT_SUCCEEDED_KEY, EVENT_FAILED_KEY, EVENT_PROCESSED_KEY
+from titus_isolate.event.utils import may_handle_raw_event
+from titus_isolate.metrics.constants import QUEUE_DEPTH_KEY, EVENT_SUCCEEDED_KEY, EVENT_FAILED_KEY, \
+    EVENT_PROCESSED_KEY, EVENT_RECEIVED_KEY, EVENT_DROPPED_KEY, EVENT_DROP_RATIO_KEY
 from titus_isolate.model.processor.utils import DEFAULT_TOTAL_THREAD_COUNT
 from titus_isolate.utils import set_config_manager, set_workload_monitor_manager, set_pod_manager, get_pod_manager
 
@@ -152,3 +154,46 @@ class TestEvents(unittest.TestCase):
         self.assertTrue(counter_value_equals(registry, EVENT_SUCCEEDED_KEY, event_count * len(test_context.get_event_handlers())))
         self.assertTrue(counter_value_equals(registry, EVENT_FAILED_KEY, 0))
         self.assertTrue(counter_value_equals(registry, EVENT_PROCESSED_KEY, event_count))
+
+    def test_may_handle_raw_event(self):
+        self.assertTrue(may_handle_raw_event(get_event(CONTAINER, START, "id", {})))
+        self.assertTrue(may_handle_raw_event(REBALANCE_EVENT))
+        self.assertTrue(may_handle_raw_event(b'{"Type":"container","Action":"die","id":"abc"}'))
+        self.assertFalse(may_handle_raw_event(get_event(CONTAINER, "exec_create: sh", "id", {})))
+        self.assertFalse(may_handle_raw_event(b'{"Type":"network","Action":"connect"}'))
+
+        # Events which cannot be checked without decoding them are kept
+        self.assertTrue(may_handle_raw_event(b'{"status":"start"}'))
+
+        # A label named like the action field does not hide the event's action
+        self.assertTrue(may_handle_raw_event(get_event(CONTAINER, START, "id", {ACTION: "exec_create"})))
+
+    def test_irrelevant_events_are_dropped(self):
+        registry = Registry()
+        events = [
+            get_event(CONTAINER, "exec_create: sh", "id", {}),
+            get_event("network", "connect", "id", {}),
+            get_event(CONTAINER, "health_status: healthy", "id", {}),
+            REBALANCE_EVENT]
+        event_iterable = MockEventProvider(events)
+
+        test_context = TestContext()
+        manager = EventManager(event_iterable, test_context.get_event_handlers(), DEFAULT_TEST_EVENT_TIMEOUT_SECS)
+        manager.set_registry(registry, {})
+        manager.start_processing_events()
+
+        wait_until(lambda: 1 == manager.get_processed_count())
+        self.assertEqual(4, manager.get_received_count())
+        self.assertEqual(3, manager.get_dropped_count())
+        self.assertEqual(1, test_context.get_rebalance_event_handler().get_handled_event_count())
+
+        manager.stop_processing_events()
+
+        manager.report_metrics({})
+        self.assertTrue(counter_value_equals(registry, EVENT_RECEIVED_KEY, 4))
+        self.assertTrue(counter_value_equals(registry, EVENT_DROPPED_KEY, 3))
+        self.assertTrue(gauge_value_equals(registry, EVENT_DROP_RATIO_KEY, 0.75))
+
+        # No events were received since the last report
+        manager.report_metrics({})
+        self.assertTrue(gauge_value_equals(registry, EVENT_DROP_RATIO_KEY, 0))
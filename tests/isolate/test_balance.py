@@ -2,7 +2,7 @@ import unittest
 import uuid
 
 from tests.utils import get_test_workload, get_allocate_request
-from titus_isolate.isolate.balance import has_better_isolation
+from titus_isolate.isolate.balance import has_better_isolation, get_minimal_moves, apply_moves
 from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
 from titus_isolate.model.processor.config import get_cpu
 
@@ -136,3 +136,71 @@ class TestBalance(unittest.TestCase):
         new_cpu.get_packages()[0].get_cores()[1].get_threads()[1].claim(workload_id_1)
 
         self.assertFalse(has_better_isolation(cur_cpu, new_cpu))
+
+
+def claim(cpu, placements):
+    threads = cpu.get_threads()
+    for w_id, thread_indices in placements.items():
+        for i in thread_indices:
+            threads[i].claim(w_id)
+    return cpu
+
+
+class TestMinimalMoves(unittest.TestCase):
+
+    def setUp(self):
+        # Core 0 holds threads 0 and 1, core 1 holds threads 2 and 3.  Both cores are shared by w0 and w1.
+        self.cur_cpu = claim(get_cpu(1, 2, 2), {"w0": [0, 2], "w1": [1, 3]})
+        self.new_cpu = claim(get_cpu(1, 2, 2), {"w0": [0, 1], "w1": [2, 3]})
+
+    def test_no_moves_without_improvement(self):
+        self.assertEqual([], get_minimal_moves(self.cur_cpu, self.cur_cpu, 16))
+        self.assertEqual([], get_minimal_moves(self.new_cpu, self.cur_cpu, 16))
+
+    def test_moves_reach_new_placement(self):
+        moves = get_minimal_moves(self.cur_cpu, self.new_cpu, 16)
+        self.assertEqual(["w0", "w1"], moves)
+
+        moved_cpu = apply_moves(self.cur_cpu, self.new_cpu, moves)
+        self.assertEqual(self.new_cpu, moved_cpu)
+        self.assertEqual(2, self.cur_cpu.get_violation_index().get_shared_core_violation_count())
+
+    def test_moves_within_budget(self):
+        self.assertEqual([], get_minimal_moves(self.cur_cpu, self.new_cpu, 0))
+
+        # w0 displaces w1, so they move together at a cost of 2 threads
+        self.assertEqual([], get_minimal_moves(self.cur_cpu, self.new_cpu, 1))
+        self.assertEqual(["w0", "w1"], get_minimal_moves(self.cur_cpu, self.new_cpu, 2))
+
+    def test_displaced_workloads_move(self):
+        # w0 moves onto w1's thread 1, w1 onto w2's threads 4 and 5, and w2 onto w0's and w1's threads 2 and 3
+        cur_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 2], "w1": [1, 3], "w2": [4, 5]})
+        new_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 1], "w1": [4, 5], "w2": [2, 3]})
+
+        moves = get_minimal_moves(cur_cpu, new_cpu, 16)
+        self.assertEqual(["w0", "w1", "w2"], moves)
+
+        moved_cpu = apply_moves(cur_cpu, new_cpu, moves)
+        self.assertEqual(new_cpu, moved_cpu)
+        for t in moved_cpu.get_threads():
+            self.assertLessEqual(len(t.get_workload_ids()), 1)
+
+        # Moving w0 alone would share thread 1 with w1
+        with self.assertRaises(ValueError):
+            apply_moves(cur_cpu, new_cpu, ["w0"])
+
+    def test_only_needed_workloads_move(self):
+        # w2 is placed differently, but equally well, by the new placement
+        cur_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 2], "w1": [1, 3], "w2": [4, 5]})
+        new_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 1], "w1": [2, 3], "w2": [6, 7]})
+
+        self.assertEqual(["w0", "w1"], get_minimal_moves(cur_cpu, new_cpu, 16))
+
+    def test_swap_through_worse_placement(self):
+        # w0 and w1 must swap packages, which shares cores until both have moved
+        cur_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 1, 4, 5], "w1": [2, 3, 6, 7]})
+        new_cpu = claim(get_cpu(2, 2, 2), {"w0": [0, 1, 2, 3], "w1": [4, 5, 6, 7]})
+
+        moves = get_minimal_moves(cur_cpu, new_cpu, 16)
+        self.assertEqual(2, len(moves))
+        self.assertEqual(new_cpu, apply_moves(cur_cpu, new_cpu, moves))
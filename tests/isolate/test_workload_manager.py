@@ -1,24 +1,30 @@
 import logging
+import tracemalloc
 import unittest
 import uuid
 
 from spectator import Registry
 
+from tests.allocate.crashing_allocators import CrashingAllocator
 from tests.allocate.test_allocate import TestWorkloadMonitorManager
 from tests.cgroup.mock_cgroup_manager import MockCgroupManager
 from tests.config.test_property_provider import TestPropertyProvider
 from tests.utils import config_logs, TestContext, gauge_value_equals, get_threads_with_workload, \
     get_test_workload, counter_value_equals
+from titus_isolate.allocate.allocate_request import AllocateRequest
+from titus_isolate.allocate.allocate_response import AllocateResponse, get_workload_allocations
+from titus_isolate.allocate.cpu_allocator import CpuAllocator
 from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
 from titus_isolate.allocate.naive_cpu_allocator import NaiveCpuAllocator
 from titus_isolate.allocate.noop_allocator import NoopCpuAllocator
 from titus_isolate.config.config_manager import ConfigManager
 from titus_isolate.config.constants import TITUS_ISOLATE_MEMORY_MIGRATE, \
-    TITUS_ISOLATE_MEMORY_SPREAD_PAGE, TITUS_ISOLATE_MEMORY_SPREAD_SLAB
+    TITUS_ISOLATE_MEMORY_SPREAD_PAGE, TITUS_ISOLATE_MEMORY_SPREAD_SLAB, TRACE_ISOLATE_ALLOCATIONS, \
+    REBALANCE_MINIMAL_MOVEMENT, REBALANCE_MAX_MOVED_THREADS
 from titus_isolate.isolate.workload_manager import WorkloadManager
 from titus_isolate.metrics.constants import RUNNING, ADDED_KEY, REMOVED_KEY, SUCCEEDED_KEY, FAILED_KEY, \
     WORKLOAD_COUNT_KEY, PACKAGE_VIOLATIONS_KEY, CORE_VIOLATIONS_KEY, OVERSUBSCRIBED_THREADS_KEY,  ALLOCATED_SIZE_KEY, \
-    UNALLOCATED_SIZE_KEY
+    UNALLOCATED_SIZE_KEY, REBALANCE_MOVED_THREAD_COUNT
 from titus_isolate.model.processor.config import get_cpu
 from titus_isolate.model.processor.utils import DEFAULT_TOTAL_THREAD_COUNT, is_cpu_full
 from titus_isolate.utils import set_config_manager, set_workload_monitor_manager
@@ -32,8 +38,55 @@ OVERSUBSCRIBING_ALLOCATORS = [NaiveCpuAllocator()]
 ALLOCATORS = LEGACY_ALLOCATORS + OVERSUBSCRIBING_ALLOCATORS
 
 
+class ScriptedCpuAllocator(CpuAllocator):
+    """
+    Places workloads on fixed thread indices, and on other fixed thread indices when rebalancing.
+    """
+
+    # Workloads w0 and w1 share cores 0 and 1
+    PLACEMENT = {"w0": [0, 2], "w1": [1, 3], "w2": [8, 9], "w3": [10, 11]}
+    REBALANCED_PLACEMENT = {"w0": [0, 1], "w1": [2, 3], "w2": [4, 5], "w3": [6, 7]}
+
+    def isolate(self, request: AllocateRequest) -> AllocateResponse:
+        placement = self.PLACEMENT
+        if request.get_metadata()["type"] == "rebalance":
+            placement = self.REBALANCED_PLACEMENT
+
+        cpu = request.get_cpu()
+        cpu.clear()
+        threads = cpu.get_threads()
+        for w_id in request.get_workloads().keys():
+            for i in placement[w_id]:
+                threads[i].claim(w_id)
+
+        workloads = list(request.get_workloads().values())
+        return AllocateResponse(cpu, get_workload_allocations(cpu, workloads), self.get_name())
+
+    def get_name(self) -> str:
+        return self.__class__.__name__
+
+    def set_registry(self, registry, tags):
+        pass
+
+    def report_metrics(self, tags):
+        pass
+
+
+def get_rebalanced_workload_manager(properties: dict, cgroup_manager=None) -> WorkloadManager:
+    set_config_manager(ConfigManager(TestPropertyProvider(properties)))
+    if cgroup_manager is None:
+        cgroup_manager = MockCgroupManager()
+    workload_manager = WorkloadManager(get_cpu(), cgroup_manager, ScriptedCpuAllocator())
+    for w_id in sorted(ScriptedCpuAllocator.PLACEMENT.keys()):
+        workload_manager.isolate(adds=[get_test_workload(w_id, 2)], removes=[])
+    return workload_manager
+
+
 class TestWorkloadManager(unittest.TestCase):
 
+    def tearDown(self):
+        set_config_manager(ConfigManager(TestPropertyProvider({})))
+
     def test_single_static_workload_lifecycle(self):
         for allocator in ALLOCATORS:
             thread_count = 2
@@ -209,3 +262,98 @@ class TestWorkloadManager(unittest.TestCase):
             self.assertTrue(cgroup_manager.get_memory_spread_page(workload.get_task_id()))
             self.assertTrue(cgroup_manager.get_memory_spread_slab(workload.get_task_id()))
             workload_manager.isolate(adds=[], removes=[workload.get_task_id()])
+
+    def test_isolate_allocation_tracing(self):
+        workload = get_test_workload(uuid.uuid4(), 2)
+        workload_manager = WorkloadManager(get_cpu(), MockCgroupManager(), GreedyCpuAllocator())
+
+        workload_manager.isolate(adds=[workload], removes=[])
+        self.assertIsNone(workload_manager.get_isolate_allocated_bytes())
+
+        set_config_manager(ConfigManager(TestPropertyProvider({TRACE_ISOLATE_ALLOCATIONS: True})))
+        try:
+            workload_manager.isolate(adds=[], removes=[workload.get_task_id()])
+            self.assertGreater(workload_manager.get_isolate_allocated_bytes(), 0)
+            self.assertFalse(tracemalloc.is_tracing())
+
+            # Tracing started elsewhere is left running, along with its traces
+            tracemalloc.start()
+            held = bytearray(1 << 20)
+            workload_manager.isolate(adds=[workload], removes=[])
+            self.assertTrue(tracemalloc.is_tracing())
+            self.assertGreaterEqual(tracemalloc.get_traced_memory()[0], len(held))
+            self.assertGreater(workload_manager.get_isolate_allocated_bytes(), 0)
+            self.assertLess(workload_manager.get_isolate_allocated_bytes(), len(held))
+        finally:
+            set_config_manager(ConfigManager(TestPropertyProvider({})))
+            tracemalloc.stop()
+
+    def test_isolate_allocation_tracing_stops_on_failure(self):
+        set_config_manager(ConfigManager(TestPropertyProvider({TRACE_ISOLATE_ALLOCATIONS: True})))
+        try:
+            workload_manager = WorkloadManager(get_cpu(), MockCgroupManager(), CrashingAllocator())
+            self.assertFalse(workload_manager.isolate(adds=[get_test_workload(uuid.uuid4(), 2)], removes=[]))
+            self.assertFalse(tracemalloc.is_tracing())
+        finally:
+            set_config_manager(ConfigManager(TestPropertyProvider({})))
+
+    def test_workloads_are_not_copied(self):
+        workload = get_test_workload(uuid.uuid4(), 2)
+        workload_manager = WorkloadManager(get_cpu(), MockCgroupManager(), GreedyCpuAllocator())
+        workload_manager.isolate(adds=[workload], removes=[])
+
+        self.assertIs(workload, workload_manager.get_workload_map_copy()[workload.get_task_id()])
+        self.assertIs(workload, workload_manager.get_workloads()[0])
+
+    def test_rebalance_reports_moved_threads(self):
+        workload_manager = get_rebalanced_workload_manager({})
+        registry = Registry()
+        workload_manager.set_registry(registry, {})
+        self.assertIsNone(workload_manager.get_rebalance_moved_thread_count())
+
+        cpu = workload_manager.get_cpu()
+        workload_manager.isolate(adds=[], removes=[])
+        self.assertNotEqual(cpu, workload_manager.get_cpu())
+        self.assertGreater(workload_manager.get_rebalance_moved_thread_count(), 0)
+        self.assertEqual(1, registry.distribution_summary(REBALANCE_MOVED_THREAD_COUNT, {}).count())
+
+    def test_minimal_movement_rebalance(self):
+        full_manager = get_rebalanced_workload_manager({})
+        full_manager.isolate(adds=[], removes=[])
+        self.assertEqual(6, full_manager.get_rebalance_moved_thread_count())
+
+        cgroup_manager = MockCgroupManager()
+        workload_manager = get_rebalanced_workload_manager({REBALANCE_MINIMAL_MOVEMENT: True}, cgroup_manager)
+        self.assertEqual(2, workload_manager.get_cpu().get_violation_index().get_shared_core_violation_count())
+
+        update_counts = dict(cgroup_manager.container_update_counts)
+        workload_manager.isolate(adds=[], removes=[])
+        self.assertEqual(0, workload_manager.get_cpu().get_violation_index().get_shared_core_violation_count())
+        self.assertEqual(2, workload_manager.get_rebalance_moved_thread_count())
+
+        # Only the moved workloads' cgroups are updated
+        self.assertEqual(update_counts["w0"] + 1, cgroup_manager.container_update_counts["w0"])
+        self.assertEqual(update_counts["w1"] + 1, cgroup_manager.container_update_counts["w1"])
+        self.assertEqual(update_counts["w2"], cgroup_manager.container_update_counts["w2"])
+        self.assertEqual(update_counts["w3"], cgroup_manager.container_update_counts["w3"])
+
+        # An already balanced placement is kept
+        cpu = workload_manager.get_cpu()
+        workload_manager.isolate(adds=[], removes=[])
+        self.assertIs(cpu, workload_manager.get_cpu())
+        self.assertEqual(0, workload_manager.get_rebalance_moved_thread_count())
+
+    def test_minimal_movement_rebalance_budget(self):
+        workload_manager = get_rebalanced_workload_manager({REBALANCE_MINIMAL_MOVEMENT: True,
+                                                            REBALANCE_MAX_MOVED_THREADS: 2})
+        workload_manager.isolate(adds=[], removes=[])
+        self.assertEqual(0, workload_manager.get_cpu().get_violation_index().get_shared_core_violation_count())
+        self.assertEqual(2, workload_manager.get_rebalance_moved_thread_count())
+
+        # w0 and w1 must swap threads, which moves 2 threads
+        workload_manager = get_rebalanced_workload_manager({REBALANCE_MINIMAL_MOVEMENT: True,
+                                                            REBALANCE_MAX_MOVED_THREADS: 1})
+        cpu = workload_manager.get_cpu()
+        workload_manager.isolate(adds=[], removes=[])
+        self.assertIs(cpu, workload_manager.get_cpu())
+        self.assertEqual(0, workload_manager.get_rebalance_moved_thread_count())
@@ -1,3 +1,4 @@
+import copy
 import logging
 import unittest
 import uuid
@@ -93,6 +94,23 @@ class TestCpu(unittest.TestCase):
         t_1_0.claim("b")
         self.assertEqual(cpu_x, cpu_y)
 
+    def test_copy_is_independent_snapshot(self):
+        cpu = get_cpu()
+        cpu.get_threads()[0].claim("a")
+
+        cpu_copy = copy.deepcopy(cpu)
+        self.assertEqual(cpu, cpu_copy)
+        self.assertIs(cpu.get_topology(), cpu_copy.get_topology())
+
+        cpu_copy.get_threads()[1].claim("b")
+        cpu_copy.get_threads()[0].free("a")
+        self.assertEqual(("a",), cpu.get_threads()[0].get_workload_ids())
+        self.assertFalse(cpu.get_threads()[1].is_claimed())
+        self.assertNotEqual(cpu, cpu_copy)
+
+        cpu.clear()
+        self.assertEqual(("b",), cpu_copy.get_threads()[1].get_workload_ids())
+
     def test_to_array(self):
         cpu = get_cpu()
         self.__assert_array_structure(cpu, 0)
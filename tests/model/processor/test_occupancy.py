@@ -0,0 +1,77 @@
+import logging
+import unittest
+
+from tests.utils import config_logs
+from titus_isolate.model.processor.occupancy import Occupancy
+
+config_logs(logging.DEBUG)
+
+
+class TestOccupancy(unittest.TestCase):
+
+    def test_claim_and_free(self):
+        occupancy = Occupancy(4)
+        occupancy.claim(0, "a")
+        occupancy.claim(0, "a")
+        occupancy.claim(1, "a")
+        occupancy.claim(1, "b")
+
+        self.assertEqual(("a",), occupancy.get_workload_ids(0))
+        self.assertEqual(("a", "b"), occupancy.get_workload_ids(1))
+        self.assertEqual([0, 1], occupancy.get_claimed_slots())
+        self.assertEqual([2, 3], occupancy.get_empty_slots())
+        self.assertEqual([0, 1], occupancy.get_slots_with_workload("a"))
+        self.assertEqual({"a": [0, 1], "b": [1]}, occupancy.get_workload_ids_to_slots())
+
+        occupancy.free(1, "a")
+        occupancy.free(1, "unknown")
+        self.assertEqual(("b",), occupancy.get_workload_ids(1))
+
+        occupancy.clear_slot(0)
+        self.assertFalse(occupancy.is_claimed(0))
+        self.assertEqual([], occupancy.get_slots_with_workload("a"))
+
+    def test_released_indices_are_reused(self):
+        occupancy = Occupancy(2)
+        occupancy.claim(0, "a")
+        occupancy.free(0, "a")
+        occupancy.claim(1, "b")
+
+        self.assertFalse(occupancy.has_workload(1, "a"))
+        self.assertTrue(occupancy.has_workload(1, "b"))
+        self.assertEqual({"b": [1]}, occupancy.get_workload_ids_to_slots())
+
+    def test_snapshot_is_copy_on_write(self):
+        original = Occupancy(2)
+        original.claim(0, "a")
+
+        snapshot = original.snapshot()
+        self.assertEqual(("a",), snapshot.get_workload_ids(0))
+        self.assertIs(original.get_workload_ids(0), snapshot.get_all_workload_ids()[0])
+
+        snapshot.claim(1, "b")
+        snapshot.free(0, "a")
+        self.assertEqual(("a",), original.get_workload_ids(0))
+        self.assertFalse(original.is_claimed(1))
+
+        original.clear()
+        self.assertEqual(("b",), snapshot.get_workload_ids(1))
+        self.assertFalse(original.is_claimed(0))
+
+    def test_same_workloads_ignores_claim_order(self):
+        x = Occupancy(2)
+        x.claim(0, "a")
+        x.claim(0, "b")
+
+        y = Occupancy(2)
+        y.claim(1, "b")
+        y.claim(1, "a")
+
+        self.assertTrue(x.has_same_workloads(0, y, 1))
+        self.assertEqual(x.get_workloads_hash(0), y.get_workloads_hash(1))
+        self.assertFalse(x.has_same_workloads(0, y, 0))
+        self.assertTrue(x.has_same_workloads(1, y, 0))
+
+        y.free(1, "a")
+        y.claim(1, "c")
+        self.assertFalse(x.has_same_workloads(0, y, 1))
@@ -104,3 +104,18 @@ class TestThread(unittest.TestCase):
         t_y.claim("b")
         self.assertEqual(t_x, t_y)
 
+        t_x.free("a")
+        t_x.claim("a")
+        self.assertEqual(t_x, t_y)
+        self.assertEqual(hash(t_x), hash(t_y))
+
+    def test_workload_ids_are_not_copied(self):
+        t = Thread(42)
+        t.claim("a")
+
+        workload_ids = t.get_workload_ids()
+        self.assertIs(workload_ids, t.get_workload_ids())
+
+        t.claim("b")
+        self.assertEqual(("a",), workload_ids)
+        self.assertEqual(("a", "b"), t.get_workload_ids())
@@ -0,0 +1,43 @@
+import logging
+import unittest
+
+from tests.utils import config_logs
+from titus_isolate.model.processor.config import get_cpu
+from titus_isolate.model.processor.topology import Topology
+
+config_logs(logging.DEBUG)
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_construction(self):
+        topology = Topology([
+            (0, [(0, [0, 4]), (1, [1, 5])]),
+            (1, [(0, [2, 6]), (1, [3, 7])])])
+
+        self.assertEqual(2, topology.get_package_count())
+        self.assertEqual(4, topology.get_core_count())
+        self.assertEqual(8, topology.get_slot_count())
+        self.assertEqual((0, 4, 1, 5, 2, 6, 3, 7), topology.get_thread_ids())
+
+        self.assertEqual((0, 1, 2, 3), topology.get_package_slots(0))
+        self.assertEqual((4, 5, 6, 7), topology.get_package_slots(1))
+        self.assertEqual((2, 3), topology.get_package_cores(1))
+        self.assertEqual((6, 7), topology.get_core_slots(3))
+        self.assertEqual(1, topology.get_core_package(3))
+
+        self.assertEqual(6, topology.get_slot(3))
+        self.assertEqual(1, topology.get_slot_package(6))
+        self.assertEqual(3, topology.get_slot_core(6))
+
+    def test_matches_cpu_natural_indexing(self):
+        cpu = get_cpu(2, 3, 2)
+        topology = cpu.get_topology()
+
+        self.assertEqual([t.get_id() for t in cpu.get_threads()], list(topology.get_thread_ids()))
+        for slot, thread in enumerate(cpu.get_threads()):
+            self.assertEqual(slot, topology.get_slot(thread.get_id()))
+
+    def test_equality(self):
+        self.assertEqual(get_cpu(2, 4, 2).get_topology(), get_cpu(2, 4, 2).get_topology())
+        self.assertNotEqual(get_cpu(2, 4, 2).get_topology(), get_cpu(1, 8, 2).get_topology())
@@ -0,0 +1,63 @@
+import copy
+import logging
+import random
+import unittest
+
+from tests.utils import config_logs
+from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
+from titus_isolate.model.processor.config import get_cpu
+
+config_logs(logging.DEBUG)
+
+WORKLOAD_IDS = ["a", "b", "c", "d", "e", "f"]
+
+
+class TestViolationIndex(unittest.TestCase):
+
+    def __assert_matches_detect(self, cpu):
+        index = cpu.get_violation_index()
+
+        cross_package = get_cross_package_violations(cpu)
+        self.assertEqual(len(cross_package), index.get_cross_package_violation_count())
+        self.assertEqual(cross_package, index.get_cross_package_violations())
+
+        shared_core = get_shared_core_violations(cpu)
+        self.assertEqual(len(shared_core), index.get_shared_core_violation_count())
+        self.assertEqual(
+            {k: set(v) for k, v in shared_core.items()},
+            {k: set(v) for k, v in index.get_shared_core_violations().items()})
+
+    def test_empty_cpu(self):
+        cpu = get_cpu()
+        self.assertEqual(0, cpu.get_violation_index().get_cross_package_violation_count())
+        self.assertEqual(0, cpu.get_violation_index().get_shared_core_violation_count())
+        self.__assert_matches_detect(cpu)
+
+    def test_matches_detect_under_random_claims_and_frees(self):
+        for seed in range(20):
+            rand = random.Random(seed)
+            cpu = get_cpu(rand.randint(1, 3), rand.randint(1, 6), rand.randint(1, 2))
+            threads = cpu.get_threads()
+            snapshots = []
+
+            for _ in range(200):
+                t = rand.choice(threads)
+                op = rand.random()
+                if op < 0.55:
+                    t.claim(rand.choice(WORKLOAD_IDS))
+                elif op < 0.9:
+                    t.free(rand.choice(WORKLOAD_IDS))
+                elif op < 0.97:
+                    t.clear()
+                else:
+                    cpu.clear()
+
+                if rand.random() < 0.05:
+                    snapshots.append((copy.deepcopy(cpu), cpu.to_array()))
+
+                self.__assert_matches_detect(cpu)
+
+            # Snapshots are unaffected by later changes to the cpu they were taken from
+            for snapshot, array in snapshots:
+                self.assertEqual(array, snapshot.to_array())
+                self.__assert_matches_detect(snapshot)
@@ -0,0 +1,146 @@
+import logging
+import math
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tests.config.test_property_provider import TestPropertyProvider
+from tests.utils import config_logs
+from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE
+from titus_isolate.cgroup import utils
+from titus_isolate.config.config_manager import ConfigManager
+from titus_isolate.config.constants import RESOURCE_USAGE_PROVIDER, CGROUP
+from titus_isolate.isolate.utils import get_resource_usage_provider
+from titus_isolate.monitor.cgroup_resource_usage_provider import CgroupResourceUsageProvider
+
+config_logs(logging.DEBUG)
+
+CONTAINER_NAME = "test_container"
+CGROUP_PATH = "/containers.slice/test_container"
+START = 1604698440
+
+
+class TestCgroupResourceUsageProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.__root = tempfile.TemporaryDirectory()
+        root = self.__root.name
+        self.__patches = [
+            patch.object(utils, 'ROOT_CGROUP_PATH', root),
+            patch.object(utils, 'TITUS_INITS_PATH', os.path.join(root, "inits"))]
+        for p in self.__patches:
+            p.start()
+
+        os.makedirs(os.path.join(root, "inits", CONTAINER_NAME))
+
+    def tearDown(self):
+        for p in self.__patches:
+            p.stop()
+        utils.invalidate_cgroup_paths(CONTAINER_NAME)
+        self.__root.cleanup()
+
+    def __write(self, path, content):
+        path = os.path.join(self.__root.name, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def __write_v1_usage(self, user_ns, system_ns, mem_bytes):
+        self.__write("cpu,cpuacct" + CGROUP_PATH + "/cpuacct.usage_all",
+                     "cpu user system\n0 {} {}\n1 {} {}\n".format(user_ns, system_ns, user_ns, system_ns))
+        self.__write("memory" + CGROUP_PATH + "/memory.usage_in_bytes", "{}\n".format(mem_bytes))
+
+    def test_sample_v1(self):
+        self.__write("inits/{}/cgroup".format(CONTAINER_NAME),
+                     "9:cpu,cpuacct:{}\n6:memory:{}\n".format(CGROUP_PATH, CGROUP_PATH))
+        provider = CgroupResourceUsageProvider(
+            get_workload_ids=lambda: [CONTAINER_NAME, "missing"], unified=False, start=False)
+
+        self.__write_v1_usage(0, 0, 100)
+        provider.sample(START)
+        self.__write_v1_usage(15000000000, 15000000000, 200)
+        provider.sample(START + 60)
+        self.__write_v1_usage(30000000000, 30000000000, 300)
+        provider.sample(START + 120)
+        self.assertEqual(3, provider.get_sample_failure_count())
+
+        usages = {u.resource_name: u for u in provider.get_resource_usages([CONTAINER_NAME])}
+        self.assertEqual([1.0, 1.0], usages[CPU_USAGE].values)
+        self.assertEqual(START + 60, usages[CPU_USAGE].start_time_epoch_sec)
+        self.assertEqual([100.0, 200.0, 300.0], usages[MEM_USAGE].values)
+        self.assertEqual(START, usages[MEM_USAGE].start_time_epoch_sec)
+
+        # Only newer samples are returned, the rate uses the preceding sample
+        usages = {u.resource_name: u for u in provider.get_resource_usages([CONTAINER_NAME], START + 60)}
+        self.assertEqual([1.0], usages[CPU_USAGE].values)
+        self.assertEqual([300.0], usages[MEM_USAGE].values)
+
+        # A counter reset does not produce a negative rate
+        self.__write_v1_usage(0, 0, 300)
+        provider.sample(START + 180)
+        values = provider.get_resource_usages([CONTAINER_NAME], START + 120)[1].values
+        self.assertTrue(math.isnan(values[0]))
+
+    def test_sample_v2(self):
+        self.__write("inits/{}/cgroup".format(CONTAINER_NAME), "0::{}\n".format(CGROUP_PATH))
+        provider = CgroupResourceUsageProvider(get_workload_ids=lambda: [CONTAINER_NAME], unified=True, start=False)
+
+        self.__write(CGROUP_PATH[1:] + "/cpu.stat", "usage_usec 0\nuser_usec 0\nsystem_usec 0\n")
+        self.__write(CGROUP_PATH[1:] + "/memory.current", "100\n")
+        provider.sample(START)
+        self.__write(CGROUP_PATH[1:] + "/cpu.stat", "usage_usec 30000000\nuser_usec 0\nsystem_usec 0\n")
+        provider.sample(START + 60)
+
+        usages = {u.resource_name: u for u in provider.get_resource_usages([CONTAINER_NAME])}
+        self.assertEqual([0.5], usages[CPU_USAGE].values)
+        self.assertEqual([100.0, 100.0], usages[MEM_USAGE].values)
+
+    def test_missed_samples_are_filled(self):
+        self.__write("inits/{}/cgroup".format(CONTAINER_NAME), "0::{}\n".format(CGROUP_PATH))
+        provider = CgroupResourceUsageProvider(
+            get_workload_ids=lambda: [CONTAINER_NAME], unified=True, start=False, sample_interval=30)
+        self.assertEqual(30, provider.get_interval_sec())
+
+        self.__write(CGROUP_PATH[1:] + "/cpu.stat", "usage_usec 0\n")
+        self.__write(CGROUP_PATH[1:] + "/memory.current", "100\n")
+        provider.sample(START)
+        provider.sample(START + 30)
+
+        # The samples at START + 60 and START + 90 are missed
+        self.__write(CGROUP_PATH[1:] + "/cpu.stat", "usage_usec 60000000\n")
+        self.__write(CGROUP_PATH[1:] + "/memory.current", "200\n")
+        provider.sample(START + 120)
+
+        usages = {u.resource_name: u for u in provider.get_resource_usages([CONTAINER_NAME])}
+        mem_values = usages[MEM_USAGE].values
+        self.assertEqual(5, len(mem_values))
+        self.assertEqual([100.0, 100.0], mem_values[:2])
+        self.assertTrue(all(math.isnan(v) for v in mem_values[2:4]))
+        self.assertEqual(200.0, mem_values[4])
+
+        cpu_values = usages[CPU_USAGE].values
+        self.assertEqual(START + 30, usages[CPU_USAGE].start_time_epoch_sec)
+        self.assertEqual(4, len(cpu_values))
+        self.assertEqual(0.0, cpu_values[0])
+        self.assertTrue(all(math.isnan(v) for v in cpu_values[1:3]))
+        self.assertAlmostEqual(60 / 90, cpu_values[3])
+
+    def test_removed_workloads_are_dropped(self):
+        self.__write("inits/{}/cgroup".format(CONTAINER_NAME), "0::{}\n".format(CGROUP_PATH))
+        self.__write(CGROUP_PATH[1:] + "/cpu.stat", "usage_usec 0\n")
+        self.__write(CGROUP_PATH[1:] + "/memory.current", "100\n")
+        workload_ids = [CONTAINER_NAME]
+        provider = CgroupResourceUsageProvider(get_workload_ids=lambda: workload_ids, unified=True, start=False)
+
+        provider.sample(START)
+        self.assertEqual(1, len(provider.get_resource_usages([CONTAINER_NAME])))
+
+        workload_ids.clear()
+        provider.sample(START + 60)
+        self.assertEqual([], provider.get_resource_usages([CONTAINER_NAME]))
+
+    def test_selected_by_config(self):
+        config_manager = ConfigManager(TestPropertyProvider({RESOURCE_USAGE_PROVIDER: CGROUP}))
+        provider = get_resource_usage_provider(config_manager)
+        self.assertTrue(isinstance(provider, CgroupResourceUsageProvider))
@@ -0,0 +1,114 @@
+import json
+import logging
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+from spectator import Registry
+
+from tests.utils import config_logs, gauge_value_equals
+from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE, NET_RECV_USAGE, NET_TRANS_USAGE, DISK_USAGE
+from titus_isolate.metrics.constants import PROMETHEUS_QUERY_LATENCY, PROMETHEUS_QUERY_FAILURE_COUNT
+from titus_isolate.monitor import prom_resource_usage_provider
+from titus_isolate.monitor.partial_resource_usage_exception import PartialResourceUsageException
+from titus_isolate.monitor.prom_resource_usage_provider import PrometheusResourceUsageProvider, query_format
+
+config_logs(logging.DEBUG)
+
+TASK_ID = "3d5fba95-f03a-4444-ab30-42d18db971bd"
+
+
+class MockResponse:
+    def __init__(self, value: str, status_code: int = 200):
+        self.status_code = status_code
+        self.text = ""
+        self.__value = value
+        self.content = json.dumps(self.json()).encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("{} Server Error".format(self.status_code))
+
+    def json(self):
+        return {
+            "status": "success",
+            "data": {
+                "resultType": "matrix",
+                "result": [{
+                    "metric": {"v3_job_titus_netflix_com_task_id": TASK_ID},
+                    "values": [[1604698494.296, self.__value], [1604698554.296, self.__value]]
+                }]
+            }
+        }
+
+
+class MockSession:
+    """
+    Answers each resource's query once all of them have arrived, so the test only passes if they are concurrent.
+    """
+
+    def __init__(self, failing_query: str = None, error_query: str = None):
+        self.__barrier = threading.Barrier(len(query_format), timeout=5)
+        self.__failing_query = failing_query
+        self.__error_query = error_query
+
+    def get(self, url, timeout, params):
+        self.__barrier.wait()
+        if params['query'] == self.__failing_query:
+            raise IOError("timed out")
+        if params['query'] == self.__error_query:
+            return MockResponse("", status_code=503)
+        return MockResponse("2000000000")
+
+
+class TestPrometheusResourceUsageProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.__patch = patch.object(prom_resource_usage_provider, 'get_prom_url', return_value="http://prom")
+        self.__patch.start()
+
+    def tearDown(self):
+        self.__patch.stop()
+
+    def test_queries_are_concurrent(self):
+        provider = PrometheusResourceUsageProvider(session=MockSession())
+        registry = Registry()
+        provider.set_registry(registry, {})
+
+        usages = provider.get_resource_usages([TASK_ID])
+        by_resource = {u.resource_name: u for u in usages}
+        self.assertEqual(set(query_format.keys()), set(by_resource.keys()))
+        self.assertEqual([2.0, 2.0], list(by_resource[CPU_USAGE].values))
+        self.assertEqual([2000000000.0, 2000000000.0], list(by_resource[MEM_USAGE].values))
+
+        for resource in query_format.keys():
+            summary = registry.distribution_summary(PROMETHEUS_QUERY_LATENCY, {"resource": resource})
+            self.assertEqual(1, summary.count())
+
+    def test_failed_query_raises_partial_results(self):
+        failing_query = query_format[DISK_USAGE].format(None, TASK_ID)
+        provider = PrometheusResourceUsageProvider(session=MockSession(failing_query))
+
+        with self.assertRaises(PartialResourceUsageException) as context:
+            provider.get_resource_usages([TASK_ID])
+        self.assertEqual(
+            {CPU_USAGE, MEM_USAGE, NET_RECV_USAGE, NET_TRANS_USAGE},
+            set(u.resource_name for u in context.exception.usages))
+        self.assertEqual([DISK_USAGE], context.exception.failed_resources)
+        self.assertEqual(1, provider.get_failure_count())
+
+        registry = Registry()
+        provider.set_registry(registry, {})
+        provider.report_metrics({})
+        self.assertTrue(gauge_value_equals(registry, PROMETHEUS_QUERY_FAILURE_COUNT, 1))
+
+    def test_error_status_is_a_failed_query(self):
+        error_query = query_format[MEM_USAGE].format(None, TASK_ID)
+        provider = PrometheusResourceUsageProvider(session=MockSession(error_query=error_query))
+
+        with self.assertRaises(PartialResourceUsageException) as context:
+            provider.get_resource_usages([TASK_ID])
+        self.assertEqual([MEM_USAGE], context.exception.failed_resources)
+        self.assertEqual(4, len(context.exception.usages))
+        self.assertEqual(1, provider.get_failure_count())
@@ -0,0 +1,71 @@
+import json
+import logging
+import unittest
+
+from tests.utils import config_logs
+from titus_isolate.allocate.constants import CPU_USAGE
+from titus_isolate.monitor.prom_resource_usage_provider import PrometheusResourceUsageProvider
+from titus_isolate.monitor.prom_response_parser import parse_prom_matrix
+
+config_logs(logging.DEBUG)
+
+
+def get_response(results):
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": results
+        }
+    }
+
+
+RESULTS = [
+    {
+        "metric": {"instance": "i-abc123", "v3_job_titus_netflix_com_task_id": "a"},
+        "values": [[1604698494.296, "999971618.6610168"], [1604698554.296, "NaN"], [1604698614.296, "1e3"]]
+    },
+    {
+        "metric": {"instance": "i-abc123"},
+        "values": [[1604698494.296, "1"]]
+    },
+    {
+        "values": [],
+        "metric": {"instance": "i-abc123", "v3_job_titus_netflix_com_task_id": "b"}
+    },
+    {
+        "values": [[1604698494.296, "3"]],
+        "metric": {"instance": "i-abc123", "job": "[x]", "v3_job_titus_netflix_com_task_id": "c"}
+    }
+]
+
+
+class TestPromResponseParser(unittest.TestCase):
+
+    def __assert_same_as_decoded(self, text):
+        expected = PrometheusResourceUsageProvider._parse_prom_response(
+            PrometheusResourceUsageProvider(), CPU_USAGE, json.loads(text), 0.5)
+        actual = PrometheusResourceUsageProvider._parse_prom_response_text(CPU_USAGE, text, 0.5)
+
+        self.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            self.assertEqual(e.workload_id, a.workload_id)
+            self.assertEqual(e.start_time_epoch_sec, a.start_time_epoch_sec)
+            self.assertEqual(e.interval_sec, a.interval_sec)
+            self.assertEqual(str(e.values), str(a.values.tolist()))
+
+    def test_same_as_decoded_response(self):
+        self.__assert_same_as_decoded(json.dumps(get_response(RESULTS)))
+        self.__assert_same_as_decoded(json.dumps(get_response(RESULTS), indent=2))
+        self.__assert_same_as_decoded(json.dumps(get_response(RESULTS), separators=(',', ':')))
+
+    def test_parse(self):
+        series = parse_prom_matrix(json.dumps(get_response(RESULTS)))
+        self.assertEqual(["a", "c"], [task_id for task_id, _, _ in series])
+        self.assertEqual(1604698494.296, series[0][1])
+        self.assertEqual(3, len(series[0][2]))
+        self.assertEqual(1000.0, series[0][2][2])
+
+    def test_empty_result(self):
+        self.assertEqual([], parse_prom_matrix(json.dumps(get_response([]))))
+        self.assertEqual([], parse_prom_matrix(json.dumps({"status": "error"})))
@@ -90,6 +90,20 @@ class TestResourceUsage(unittest.TestCase):
         ru = deserialize_global_resource_usage(serial_du)
         __assert_empty()
 
+    def test_usage_shares_one_matrix_per_resource(self):
+        ru = GlobalResourceUsage({CPU_USAGE: {"a": [1.0, 2.0, 3.0, 4.0], "b": [5.0]}}, 3)
+
+        index, matrix = ru.get_matrix(CPU_USAGE)
+        self.assertEqual((2, 3), matrix.shape)
+        self.__assert_list_equal_with_nans([2.0, 3.0, 4.0], matrix[index["a"]])
+        self.__assert_list_equal_with_nans([float('nan'), float('nan'), 5.0], matrix[index["b"]])
+
+        # Workload usages are views of the matrix, and serialization is done once
+        self.assertIs(matrix, ru.get_all_usage_for_workload("a")[CPU_USAGE].base)
+        self.assertIs(matrix, ru.get_cpu_usage()["b"].base)
+        self.assertIs(ru.serialize(), ru.serialize())
+        self.assertEqual({CPU_USAGE: {"a": ['2.0', '3.0', '4.0'], "b": ['nan', 'nan', '5.0']}}, ru.serialize())
+
     def __assert_list_equal_with_nans(self, l0, l1):
         self.assertEqual(len(l0), len(l1))
         for i in range(len(l0)):
@@ -0,0 +1,134 @@
+import math
+import unittest
+
+from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE
+from titus_isolate.monitor.partial_resource_usage_exception import PartialResourceUsageException
+from titus_isolate.monitor.resource_usage import ResourceUsage
+from titus_isolate.monitor.resource_usage_cache import ResourceUsageCache
+from titus_isolate.monitor.resource_usage_provider import ResourceUsageProvider
+from titus_isolate.monitor.workload_monitor_manager import WorkloadMonitorManager
+
+START = 1604698440
+
+
+class RecordingResourceUsageProvider(ResourceUsageProvider):
+    def __init__(self, interval_sec=60, sync_overlap_sec=0):
+        self.calls = []
+        self.usages = []
+        self.failed_resources = []
+        self.__interval_sec = interval_sec
+        self.__sync_overlap_sec = sync_overlap_sec
+
+    def get_resource_usages(self, workload_ids, since_epoch_sec=None):
+        self.calls.append((list(workload_ids), since_epoch_sec))
+        if len(self.failed_resources) > 0:
+            raise PartialResourceUsageException(self.usages, self.failed_resources)
+        return self.usages
+
+    def get_interval_sec(self):
+        return self.__interval_sec
+
+    def get_sync_overlap_sec(self):
+        return self.__sync_overlap_sec
+
+
+class TestResourceUsageCache(unittest.TestCase):
+
+    def test_samples_are_appended_once(self):
+        cache = ResourceUsageCache(capacity=4)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START, 60, [1.0, 2.0, 3.0])], START)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START + 60, 60, [2.0, 3.0, 4.0, 5.0])], START + 240)
+
+        usages = cache.get_resource_usages(["a"])
+        self.assertEqual(1, len(usages))
+        self.assertEqual([2.0, 3.0, 4.0, 5.0], usages[0].values)
+        self.assertEqual(START + 60, usages[0].start_time_epoch_sec)
+
+    def test_gaps_are_filled(self):
+        cache = ResourceUsageCache(capacity=4)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START, 60, [1.0])], START)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START + 180, 60, [4.0])], START + 180)
+
+        values = cache.get_resource_usages(["a"])[0].values
+        self.assertEqual(1.0, values[0])
+        self.assertTrue(math.isnan(values[1]))
+        self.assertTrue(math.isnan(values[2]))
+        self.assertEqual(4.0, values[3])
+
+    def test_synced_until(self):
+        cache = ResourceUsageCache()
+        self.assertIsNone(cache.get_synced_until(["a"]))
+
+        cache.add(["a", "b"], [
+            ResourceUsage("a", CPU_USAGE, START, 60, [1.0, 2.0]),
+            ResourceUsage("a", MEM_USAGE, START, 60, [1.0])], START + 120)
+
+        # "b" has no samples, so it is known up to the fetch time, while "a" lags on its memory series
+        self.assertEqual(START + 120, cache.get_synced_until(["b"]))
+        self.assertEqual(START, cache.get_synced_until(["a", "b"]))
+        self.assertIsNone(cache.get_synced_until(["a", "c"]))
+
+    def test_evict(self):
+        cache = ResourceUsageCache()
+        cache.add(["a", "b"], [
+            ResourceUsage("a", CPU_USAGE, START, 60, [1.0]),
+            ResourceUsage("b", CPU_USAGE, START, 60, [1.0])], START)
+        self.assertEqual(2, cache.get_series_count())
+
+        cache.evict(["a"])
+        self.assertEqual(1, cache.get_series_count())
+        self.assertEqual(["b"], cache.get_workload_ids())
+        self.assertEqual([], cache.get_resource_usages(["a"]))
+
+    def test_workload_monitor_manager_fetches_incrementally(self):
+        provider = RecordingResourceUsageProvider()
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START, 60, [1.0, 2.0])]
+        wmm = WorkloadMonitorManager(provider)
+
+        wmm.get_resource_usage(["a"])
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START + 120, 60, [3.0])]
+        usage = wmm.get_resource_usage(["a"])
+
+        self.assertEqual([(["a"], None), (["a"], START + 60)], provider.calls)
+        self.assertEqual([1.0, 2.0, 3.0], list(usage.get_cpu_usage()["a"][-3:]))
+
+        wmm.remove_workloads(["a"])
+        wmm.get_resource_usage(["a"])
+        self.assertEqual((["a"], None), provider.calls[-1])
+
+    def test_overlapping_samples_are_replaced(self):
+        cache = ResourceUsageCache(capacity=4)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START, 60, [1.0, 2.0, float('nan')])], START + 120)
+        cache.add(["a"], [ResourceUsage("a", CPU_USAGE, START + 60, 60, [float('nan'), 3.0, 4.0])], START + 180)
+
+        # A late sample replaces a missing one, but a missing sample does not replace one already cached
+        self.assertEqual([1.0, 2.0, 3.0, 4.0], cache.get_resource_usages(["a"])[0].values)
+
+    def test_partial_fetch_does_not_advance_sync(self):
+        provider = RecordingResourceUsageProvider()
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START, 60, [1.0, 2.0])]
+        wmm = WorkloadMonitorManager(provider)
+        wmm.get_resource_usage(["a"])
+
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START + 120, 60, [3.0])]
+        provider.failed_resources = [MEM_USAGE]
+        usage = wmm.get_resource_usage(["a"])
+        self.assertEqual([1.0, 2.0, 3.0], list(usage.get_cpu_usage()["a"][-3:]))
+
+        # The failed fetch is retried from where the last complete one ended
+        provider.failed_resources = []
+        wmm.get_resource_usage(["a"])
+        self.assertEqual([(["a"], None), (["a"], START + 60), (["a"], START + 60)], provider.calls)
+
+    def test_workload_monitor_manager_uses_provider_interval_and_overlap(self):
+        provider = RecordingResourceUsageProvider(interval_sec=30, sync_overlap_sec=60)
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START, 30, [1.0, 2.0, 3.0])]
+        wmm = WorkloadMonitorManager(provider)
+
+        wmm.get_resource_usage(["a"])
+        provider.usages = [ResourceUsage("a", CPU_USAGE, START + 30, 30, [5.0, 6.0, 4.0])]
+        wmm.get_resource_usage(["a"])
+
+        self.assertEqual((["a"], START), provider.calls[-1])
+        values = wmm.get_resource_usage(["a"]).get_cpu_usage()["a"]
+        self.assertEqual([1.0, 5.0, 6.0, 4.0], list(values[-4:]))
@@ -264,3 +264,6 @@ class TestPredictor(object):
 class TestWorkloadMonitorManager:
     def get_resource_usage(self, workload_ids: List[str]) -> GlobalResourceUsage:
         return GlobalResourceUsage({})
+
+    def remove_workloads(self, workload_ids: List[str]):
+        pass
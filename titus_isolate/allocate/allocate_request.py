@@ -1,9 +1,10 @@
-import copy
+from threading import Lock
 from typing import Dict, List
 
 from titus_isolate.allocate.constants import CPU, CPU_ARRAY, CPU_USAGE, MEM_USAGE, NET_RECV_USAGE, NET_TRANS_USAGE, \
     DISK_USAGE, WORKLOADS, RESOURCE_USAGE, METADATA
 from titus_isolate.model.processor.cpu import Cpu
+from titus_isolate.monitor.resource_usage import GlobalResourceUsage
 from titus_isolate.model.workload_interface import Workload
 from titus_isolate.utils import get_workload_monitor_manager
 
@@ -14,20 +15,20 @@ class AllocateRequest:
                  cpu: Cpu,
                  workloads: Dict[str, Workload],
                  metadata: dict):
-        self.__cpu = copy.deepcopy(cpu)
-        self.__workloads = copy.deepcopy(workloads)
-        self.__metadata = copy.deepcopy(metadata)
+        """
+        The request shares structure with its inputs rather than copying them.  The cpu is a copy-on-write snapshot,
+        so an allocator may claim and free threads on it freely.  Workloads are immutable and only the maps holding
+        them are copied.
 
-        # We need to keep populating this data into the titus-isolate event stream
-        # TODO: Stop populating this usage data when consumers of this usage data complete deprecation
-        wmm = get_workload_monitor_manager()
-        resource_usage = wmm.get_resource_usage(workloads.keys())
-        self.__resource_usage = resource_usage
-        self.__cpu_usage = self.__get_optional_default(resource_usage.get_cpu_usage, {})
-        self.__mem_usage = self.__get_optional_default(resource_usage.get_mem_usage, {})
-        self.__net_recv_usage = self.__get_optional_default(resource_usage.get_net_recv_usage, {})
-        self.__net_trans_usage = self.__get_optional_default(resource_usage.get_net_trans_usage, {})
-        self.__disk_usage = self.__get_optional_default(resource_usage.get_disk_usage, {})
+        Resource usage is only needed for the event log, so it is fetched lazily on first use rather than on the
+        allocation path.
+        """
+        self.__cpu = cpu.snapshot()
+        self.__workloads = dict(workloads)
+        self.__metadata = dict(metadata)
+
+        self.__resource_usage_lock = Lock()
+        self.__resource_usage = None
 
     def get_cpu(self):
         return self.__cpu
@@ -38,17 +39,31 @@ class AllocateRequest:
     def get_metadata(self):
         return self.__metadata
 
+    def has_resource_usage(self) -> bool:
+        return self.__resource_usage is not None
+
+    def get_resource_usage(self) -> GlobalResourceUsage:
+        with self.__resource_usage_lock:
+            if self.__resource_usage is None:
+                # We need to keep populating this data into the titus-isolate event stream
+                # TODO: Stop populating this usage data when consumers of this usage data complete deprecation
+                wmm = get_workload_monitor_manager()
+                self.__resource_usage = wmm.get_resource_usage(list(self.__workloads.keys()))
+            return self.__resource_usage
+
     def to_dict(self) -> dict:
+        # The per resource usages are the same serialized lists as in the full resource usage
+        resource_usage = self.get_resource_usage().serialize()
         return {
             CPU: self.get_cpu().to_dict(),
             CPU_ARRAY: self.get_cpu().to_array(),
-            CPU_USAGE: self.__get_serializable_usage(self.__cpu_usage),
-            MEM_USAGE: self.__get_serializable_usage(self.__mem_usage),
-            NET_RECV_USAGE: self.__get_serializable_usage(self.__net_recv_usage),
-            NET_TRANS_USAGE: self.__get_serializable_usage(self.__net_trans_usage),
-            DISK_USAGE: self.__get_serializable_usage(self.__disk_usage),
+            CPU_USAGE: resource_usage.get(CPU_USAGE, {}),
+            MEM_USAGE: resource_usage.get(MEM_USAGE, {}),
+            NET_RECV_USAGE: resource_usage.get(NET_RECV_USAGE, {}),
+            NET_TRANS_USAGE: resource_usage.get(NET_TRANS_USAGE, {}),
+            DISK_USAGE: resource_usage.get(DISK_USAGE, {}),
             WORKLOADS: self.__get_serializable_workloads(list(self.get_workloads().values())),
-            RESOURCE_USAGE: self.__resource_usage.serialize(),
+            RESOURCE_USAGE: resource_usage,
             METADATA: self.get_metadata()
         }
 
@@ -59,17 +74,3 @@ class AllocateRequest:
             serializable_workloads[w.get_task_id()] = w.to_dict()
 
         return serializable_workloads
-
-    @staticmethod
-    def __get_serializable_usage(cpu_usage: dict):
-        serializable_usage = {}
-        for w_id, usage in cpu_usage.items():
-            serializable_usage[w_id] = [str(u) for u in usage]
-        return serializable_usage
-
-    @staticmethod
-    def __get_optional_default(func, default):
-        opt = func()
-        if opt is None:
-            return default
-        return opt
@@ -0,0 +1,159 @@
+import itertools
+import math
+import time
+from collections import deque
+from threading import Lock
+from typing import Callable, Optional
+
+from titus_isolate import log
+from titus_isolate.metrics.constants import FALLBACK_BREAKER_STATE, FALLBACK_BREAKER_TRANSITION_COUNT
+from titus_isolate.metrics.metrics_reporter import MetricsReporter
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATES = [CLOSED, HALF_OPEN, OPEN]
+
+# Reported as the breaker state gauge's value
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+SLOW_CALL_PERCENTILE = 90
+
+DEFAULT_WINDOW_SIZE = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_FAILURE_RATIO = 0.5
+DEFAULT_SLOW_CALL_SEC = 2.0
+DEFAULT_OPEN_DURATION_SEC = 30
+
+
+class CircuitBreaker(MetricsReporter):
+    """
+    Remembers the outcome and latency of the most recent calls to a dependency and stops calls to it while it is
+    failing or slow.
+
+    The breaker opens once enough calls have been recorded and either the ratio of failed calls or the latency
+    percentile of the window reaches its threshold.  After the open duration a single probe call is allowed (half
+    open): the breaker closes with a fresh window if it succeeds and opens again otherwise.  Each allowed call is given
+    a token, so that while half open only the probe's outcome is taken into account, and not that of calls which
+    started earlier.
+    """
+
+    def __init__(self,
+                 window_size: int = DEFAULT_WINDOW_SIZE,
+                 min_calls: int = DEFAULT_MIN_CALLS,
+                 failure_ratio: float = DEFAULT_FAILURE_RATIO,
+                 slow_call_sec: float = DEFAULT_SLOW_CALL_SEC,
+                 open_duration_sec: float = DEFAULT_OPEN_DURATION_SEC,
+                 get_time: Callable[[], float] = time.time):
+        self.__min_calls = min_calls
+        self.__failure_ratio = failure_ratio
+        self.__slow_call_sec = slow_call_sec
+        self.__open_duration_sec = open_duration_sec
+        self.__get_time = get_time
+
+        self.__lock = Lock()
+        self.__state = CLOSED
+        self.__opened_at = None
+        self.__tokens = itertools.count(1)
+        self.__probe = None
+
+        # (succeeded, latency in seconds) of the most recent calls
+        self.__calls = deque(maxlen=window_size)
+
+        self.__reg = None
+        self.__transition_counts = {state: 0 for state in STATES}
+
+    def get_state(self) -> str:
+        with self.__lock:
+            return self.__state
+
+    def allow_request(self) -> Optional[int]:
+        """
+        :return: the token of the call, to be passed when recording its outcome, or None if the call is not allowed
+        """
+        with self.__lock:
+            if self.__state == CLOSED:
+                return next(self.__tokens)
+
+            if self.__state == OPEN:
+                if self.__get_time() - self.__opened_at < self.__open_duration_sec:
+                    return None
+                self.__transition(HALF_OPEN)
+
+            # Half open: only the probe call is let through
+            if self.__probe is not None:
+                return None
+            self.__probe = next(self.__tokens)
+            return self.__probe
+
+    def record_success(self, latency_sec: float, token: Optional[int] = None):
+        self.__record(True, latency_sec, token)
+
+    def record_failure(self, latency_sec: float, token: Optional[int] = None):
+        self.__record(False, latency_sec, token)
+
+    def get_failure_ratio(self) -> Optional[float]:
+        with self.__lock:
+            return self.__get_failure_ratio()
+
+    def get_latency_percentile(self) -> Optional[float]:
+        with self.__lock:
+            return self.__get_latency_percentile()
+
+    def __record(self, succeeded: bool, latency_sec: float, token: Optional[int]):
+        with self.__lock:
+            if self.__state == HALF_OPEN:
+                if token is None or token != self.__probe:
+                    log.debug("Ignoring the outcome of a call which is not the half open probe")
+                    return
+
+                self.__probe = None
+                if succeeded:
+                    self.__calls.clear()
+                    self.__calls.append((succeeded, latency_sec))
+                    self.__transition(CLOSED)
+                else:
+                    self.__open()
+                return
+
+            self.__calls.append((succeeded, latency_sec))
+            if self.__state == CLOSED and len(self.__calls) >= self.__min_calls:
+                failure_ratio = self.__get_failure_ratio()
+                latency = self.__get_latency_percentile()
+                if failure_ratio >= self.__failure_ratio or latency >= self.__slow_call_sec:
+                    log.warning("Opening circuit breaker, failure ratio: %.2f, p%d latency: %.3f seconds",
+                                failure_ratio, SLOW_CALL_PERCENTILE, latency)
+                    self.__open()
+
+    def __open(self):
+        self.__opened_at = self.__get_time()
+        self.__transition(OPEN)
+
+    def __transition(self, state: str):
+        log.info("Circuit breaker transition: %s -> %s", self.__state, state)
+        self.__state = state
+        self.__transition_counts[state] += 1
+
+    def __get_failure_ratio(self) -> Optional[float]:
+        if len(self.__calls) == 0:
+            return None
+        return len([c for c in self.__calls if not c[0]]) / len(self.__calls)
+
+    def __get_latency_percentile(self) -> Optional[float]:
+        if len(self.__calls) == 0:
+            return None
+        latencies = sorted(c[1] for c in self.__calls)
+        return latencies[max(math.ceil(len(latencies) * SLOW_CALL_PERCENTILE / 100) - 1, 0)]
+
+    def set_registry(self, registry, tags):
+        self.__reg = registry
+
+    def report_metrics(self, tags):
+        with self.__lock:
+            state = self.__state
+            transition_counts = self.__transition_counts
+            self.__transition_counts = {s: 0 for s in STATES}
+
+        self.__reg.gauge(FALLBACK_BREAKER_STATE, tags).set(STATE_VALUES[state])
+        for s, count in transition_counts.items():
+            self.__reg.counter(FALLBACK_BREAKER_TRANSITION_COUNT, dict(tags, state=s)).increment(count)
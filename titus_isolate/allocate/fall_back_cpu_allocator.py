@@ -1,17 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import Event
+
 from titus_isolate import log
 from titus_isolate.allocate.allocate_request import AllocateRequest
 from titus_isolate.allocate.allocate_response import AllocateResponse
+from titus_isolate.allocate.circuit_breaker import CircuitBreaker
 from titus_isolate.allocate.cpu_allocator import CpuAllocator
-from titus_isolate.config.constants import FALLBACK_QUEUE_DEPTH, DEFAULT_FALLBACK_QUEUE_DEPTH
+from titus_isolate.config.constants import FALLBACK_QUEUE_DEPTH, DEFAULT_FALLBACK_QUEUE_DEPTH, \
+    FALLBACK_BREAKER_WINDOW_SIZE, DEFAULT_FALLBACK_BREAKER_WINDOW_SIZE, FALLBACK_BREAKER_MIN_CALLS, \
+    DEFAULT_FALLBACK_BREAKER_MIN_CALLS, FALLBACK_BREAKER_FAILURE_RATIO, DEFAULT_FALLBACK_BREAKER_FAILURE_RATIO, \
+    FALLBACK_BREAKER_SLOW_CALL_MS, DEFAULT_FALLBACK_BREAKER_SLOW_CALL_MS, FALLBACK_BREAKER_OPEN_DURATION_SEC, \
+    DEFAULT_FALLBACK_BREAKER_OPEN_DURATION_SEC, FALLBACK_HEDGE_DELAY_MS, DEFAULT_FALLBACK_HEDGE_DELAY_MS
 from titus_isolate.metrics.constants import FALLBACK_ASSIGN_COUNT, FALLBACK_FREE_COUNT, \
     FALLBACK_REBALANCE_COUNT, PRIMARY_ASSIGN_COUNT, PRIMARY_FREE_COUNT, PRIMARY_REBALANCE_COUNT, \
-    FALLBACK_QUEUE_DEPTH_COUNT
+    FALLBACK_QUEUE_DEPTH_COUNT, FALLBACK_BREAKER_OPEN_COUNT, FALLBACK_HEDGE_COUNT
 from titus_isolate.utils import get_event_manager, get_config_manager
 
 
-class FallbackCpuAllocator(CpuAllocator):
+def get_circuit_breaker(config_manager) -> CircuitBreaker:
+    return CircuitBreaker(
+        window_size=config_manager.get_cached_int(FALLBACK_BREAKER_WINDOW_SIZE, DEFAULT_FALLBACK_BREAKER_WINDOW_SIZE),
+        min_calls=config_manager.get_cached_int(FALLBACK_BREAKER_MIN_CALLS, DEFAULT_FALLBACK_BREAKER_MIN_CALLS),
+        failure_ratio=config_manager.get_cached_float(
+            FALLBACK_BREAKER_FAILURE_RATIO, DEFAULT_FALLBACK_BREAKER_FAILURE_RATIO),
+        slow_call_sec=config_manager.get_cached_int(
+            FALLBACK_BREAKER_SLOW_CALL_MS, DEFAULT_FALLBACK_BREAKER_SLOW_CALL_MS) / 1000.0,
+        open_duration_sec=config_manager.get_cached_int(
+            FALLBACK_BREAKER_OPEN_DURATION_SEC, DEFAULT_FALLBACK_BREAKER_OPEN_DURATION_SEC))
+
 
-    def __init__(self, primary_cpu_allocator: CpuAllocator, secondary_cpu_allocator: CpuAllocator):
+class FallbackCpuAllocator(CpuAllocator):
+    """
+    Isolates with the primary allocator, falling back to the secondary allocator when the primary fails.
+
+    A circuit breaker tracks the primary's recent failures and latency, and while it is open requests go straight to
+    the secondary.  When a hedge delay is configured the secondary's answer is computed in parallel with the primary's,
+    and is used if the primary has not answered within the delay.  Requests go straight to the secondary while such a
+    late primary call is still running, rather than queueing behind it.
+    """
+
+    def __init__(
+            self,
+            primary_cpu_allocator: CpuAllocator,
+            secondary_cpu_allocator: CpuAllocator,
+            circuit_breaker: CircuitBreaker = None):
         if primary_cpu_allocator is None:
             raise ValueError("Must be provided a primary cpu allocator.")
 
@@ -32,30 +65,117 @@ class FallbackCpuAllocator(CpuAllocator):
         self.__secondary_rebalance_call_count = 0
 
         self.__queue_depth_fallback_count = 0
+        self.__breaker_open_fallback_count = 0
+        self.__hedge_fallback_count = 0
 
         cm = get_config_manager()
         self.__fallback_queue_depth = cm.get_cached_int(FALLBACK_QUEUE_DEPTH, DEFAULT_FALLBACK_QUEUE_DEPTH)
+        self.__hedge_delay_sec = cm.get_cached_int(FALLBACK_HEDGE_DELAY_MS, DEFAULT_FALLBACK_HEDGE_DELAY_MS) / 1000.0
+
+        if circuit_breaker is None:
+            circuit_breaker = get_circuit_breaker(cm)
+        self.__breaker = circuit_breaker
+
+        # Primary calls run on this thread when hedging, so a call which misses the hedge delay can complete in the
+        # background without blocking the caller.
+        self.__primary_executor = ThreadPoolExecutor(max_workers=1)
+        self.__primary_running = Event()
 
         log.info(
-            "Created FallbackCpuAllocator with primary cpu allocator: '{}' and secondary cpu allocator: '{}', fallback queue depth: '{}'".format(
+            "Created FallbackCpuAllocator with primary cpu allocator: '{}' and secondary cpu allocator: '{}', fallback queue depth: '{}', hedge delay: '{}'".format(
                 self.__primary_allocator.__class__.__name__,
                 self.__secondary_allocator.__class__.__name__,
-                self.__fallback_queue_depth))
+                self.__fallback_queue_depth,
+                self.__hedge_delay_sec))
 
     def isolate(self, request: AllocateRequest) -> AllocateResponse:
+        self.__primary_assign_threads_call_count += 1
+        if self.__should_fallback_immediately():
+            return self.__isolate_with_secondary(request)
+
+        if self.__hedge_delay_sec > 0 and self.__primary_running.is_set():
+            log.info("Falling back as a late call to primary allocator: '%s' is still running",
+                     self.__primary_allocator.__class__.__name__)
+            self.__hedge_fallback_count += 1
+            return self.__isolate_with_secondary(request)
+
+        token = self.__breaker.allow_request()
+        if token is None:
+            log.info("Falling back as the circuit breaker of primary allocator: '%s' is %s",
+                     self.__primary_allocator.__class__.__name__, self.__breaker.get_state())
+            self.__breaker_open_fallback_count += 1
+            return self.__isolate_with_secondary(request)
+
+        if self.__hedge_delay_sec > 0:
+            return self.__isolate_hedged(request, token)
+
+        start_time = time.time()
         try:
-            self.__primary_assign_threads_call_count += 1
-            self.__should_fallback_immediately()
-            return self.__primary_allocator.isolate(request)
+            response = self.__primary_allocator.isolate(request)
         except Exception as e:
-            log.error(
-                "Failed to isolate with primary allocator: '%s', falling back to: '%s' because '%s'",
-                self.__primary_allocator.__class__.__name__,
-                self.__secondary_allocator.__class__.__name__,
-                e)
-            self.__secondary_assign_threads_call_count += 1
-            return self.__secondary_allocator.isolate(request)
-        pass
+            self.__breaker.record_failure(time.time() - start_time, token)
+            self.__log_primary_failure(e)
+            return self.__isolate_with_secondary(request)
+
+        self.__breaker.record_success(time.time() - start_time, token)
+        return response
+
+    def __isolate_hedged(self, request: AllocateRequest, token: int) -> AllocateResponse:
+        # The allocators may modify their request's cpu, so each is given its own snapshot of it
+        hedge_request = AllocateRequest(request.get_cpu(), request.get_workloads(), request.get_metadata())
+
+        start_time = time.time()
+        self.__primary_running.set()
+        primary_future = self.__primary_executor.submit(self.__isolate_with_primary, request, token)
+
+        try:
+            hedge_response = self.__secondary_allocator.isolate(hedge_request)
+        except Exception:
+            log.exception("Failed to compute hedge allocation with secondary allocator: '%s'",
+                          self.__secondary_allocator.__class__.__name__)
+            hedge_response = None
+
+        remaining_sec = self.__hedge_delay_sec - (time.time() - start_time)
+        try:
+            return primary_future.result(timeout=max(remaining_sec, 0) if hedge_response is not None else None)
+        except TimeoutError:
+            log.warning("Primary allocator: '%s' missed the hedge delay of %s seconds, using the hedge allocation",
+                        self.__primary_allocator.__class__.__name__, self.__hedge_delay_sec)
+        except Exception as e:
+            self.__log_primary_failure(e)
+            if hedge_response is None:
+                raise e
+
+        self.__hedge_fallback_count += 1
+        self.__secondary_assign_threads_call_count += 1
+        return hedge_response
+
+    def __isolate_with_primary(self, request: AllocateRequest, token: int) -> AllocateResponse:
+        # Timed on the executor's thread, so the latency recorded is that of the call itself
+        start_time = time.time()
+        succeeded = False
+        try:
+            response = self.__primary_allocator.isolate(request)
+            succeeded = True
+            return response
+        finally:
+            latency_sec = time.time() - start_time
+            self.__primary_running.clear()
+            if succeeded:
+                self.__breaker.record_success(latency_sec, token)
+            else:
+                self.__breaker.record_failure(latency_sec, token)
+
+    def __isolate_with_secondary(self, request: AllocateRequest) -> AllocateResponse:
+        self.__secondary_assign_threads_call_count += 1
+        return self.__secondary_allocator.isolate(request)
+
+    def __log_primary_failure(self, e: Exception):
+        log.error(
+            "Failed to isolate with primary allocator: '%s', falling back to: '%s' because '%s'",
+            self.__primary_allocator.__class__.__name__,
+            self.__secondary_allocator.__class__.__name__,
+            e)
 
     def get_name(self) -> str:
         return "{}({},{})".format(
@@ -69,15 +189,25 @@ class FallbackCpuAllocator(CpuAllocator):
     def get_secondary_allocator(self) -> CpuAllocator:
         return self.__secondary_allocator
 
+    def get_circuit_breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
     def get_fallback_allocator_calls_count(self):
         return self.__secondary_assign_threads_call_count + \
                self.__secondary_free_threads_call_count + \
                self.__secondary_rebalance_call_count
 
+    def get_breaker_open_fallback_count(self):
+        return self.__breaker_open_fallback_count
+
+    def get_hedge_fallback_count(self):
+        return self.__hedge_fallback_count
+
     def set_registry(self, registry, tags):
         self.__reg = registry
         self.__primary_allocator.set_registry(registry, tags)
         self.__secondary_allocator.set_registry(registry, tags)
+        self.__breaker.set_registry(registry, tags)
 
     def report_metrics(self, tags):
         self.__reg.counter(PRIMARY_ASSIGN_COUNT, tags).increment(self.__primary_assign_threads_call_count)
@@ -87,6 +217,8 @@ class FallbackCpuAllocator(CpuAllocator):
         self.__reg.counter(FALLBACK_FREE_COUNT, tags).increment(self.__secondary_free_threads_call_count)
         self.__reg.counter(FALLBACK_REBALANCE_COUNT, tags).increment(self.__secondary_rebalance_call_count)
         self.__reg.counter(FALLBACK_QUEUE_DEPTH_COUNT, tags).increment(self.__queue_depth_fallback_count)
+        self.__reg.counter(FALLBACK_BREAKER_OPEN_COUNT, tags).increment(self.__breaker_open_fallback_count)
+        self.__reg.counter(FALLBACK_HEDGE_COUNT, tags).increment(self.__hedge_fallback_count)
 
         self.__primary_assign_threads_call_count = 0
         self.__primary_free_threads_call_count = 0
@@ -95,7 +227,10 @@ class FallbackCpuAllocator(CpuAllocator):
         self.__secondary_free_threads_call_count = 0
         self.__secondary_rebalance_call_count = 0
         self.__queue_depth_fallback_count = 0
+        self.__breaker_open_fallback_count = 0
+        self.__hedge_fallback_count = 0
 
+        self.__breaker.report_metrics(tags)
         self.__primary_allocator.report_metrics(tags)
         self.__secondary_allocator.report_metrics(tags)
 
@@ -104,14 +239,15 @@ class FallbackCpuAllocator(CpuAllocator):
             self.__primary_allocator,
             self.__secondary_allocator)
 
-    def __should_fallback_immediately(self):
+    def __should_fallback_immediately(self) -> bool:
         em = get_event_manager()
 
         if em is not None:
             queue_depth = em.get_queue_depth()
             if queue_depth >= self.__fallback_queue_depth:
-                msg = "Falling back due to excessive queue depth: {} > {}".format(
-                    queue_depth, self.__fallback_queue_depth)
-                log.info(msg)
+                log.info("Falling back due to excessive queue depth: {} > {}".format(
+                    queue_depth, self.__fallback_queue_depth))
                 self.__queue_depth_fallback_count += 1
-                raise Exception(msg)
+                return True
+
+        return False
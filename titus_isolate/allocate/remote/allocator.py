@@ -1,8 +1,9 @@
 import json
 from collections import defaultdict
 import copy
+from threading import Lock
+from typing import List, Optional
 
-from google.protobuf.json_format import Parse as ParsePbJson
 import grpc
 import titus_isolate.allocate.remote.isolate_pb2 as pb
 import titus_isolate.allocate.remote.isolate_pb2_grpc as pb_grpc
@@ -11,13 +12,25 @@ from titus_isolate import log
 from titus_isolate.allocate.allocate_request import AllocateRequest
 from titus_isolate.allocate.allocate_response import AllocateResponse
 from titus_isolate.allocate.cpu_allocator import CpuAllocator
+from titus_isolate.allocate.remote.channel import get_channel, get_compression, get_deadline_budget
+from titus_isolate.allocate.remote.constants import REQ_MODE_METADATA_KEY, FULL_REQ_MODE, DELTA_REQ_MODE, \
+    PLACEMENT_VERSION_METADATA_KEY, REMOVED_TASKS_METADATA_KEY, WORKLOAD_ID_TO_THREAD_COUNT_METADATA_KEY
+from titus_isolate.allocate.remote.constraints_loader import ConstraintsLoader
+from titus_isolate.allocate.remote.layout_builder import LayoutBuilder
+from titus_isolate.allocate.remote.placement import Placement
 from titus_isolate.allocate.workload_allocate_response import WorkloadAllocateResponse
 from titus_isolate.config.constants import GRPC_REMOTE_ALLOC_ENDPOINT, GRPC_REMOTE_ALLOC_CLIENT_CALL_TIMEOUT_MS, \
-    GRPC_REMOTE_ALLOC_DEFAULT_CLIENT_CALL_TIMEOUT_MS, SYS_CORE_IDS, SYS_CORES_USAGE, SYS_CORES_HARD_ISOLATE
+    GRPC_REMOTE_ALLOC_DEFAULT_CLIENT_CALL_TIMEOUT_MS, SYS_CORE_IDS, SYS_CORES_USAGE, SYS_CORES_HARD_ISOLATE, \
+    GRPC_REMOTE_ALLOC_MIN_CLIENT_CALL_TIMEOUT_MS, GRPC_REMOTE_ALLOC_DEFAULT_MIN_CLIENT_CALL_TIMEOUT_MS, \
+    GRPC_REMOTE_ALLOC_DELTA_MODE, DEFAULT_GRPC_REMOTE_ALLOC_DELTA_MODE, GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS, \
+    DEFAULT_GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS
 from titus_isolate.kub.constants import *
 from titus_isolate.kub.utils import get_node
+from titus_isolate.metrics.constants import GRPC_REMOTE_ALLOC_DEADLINE, CUSTOM_CONSTRAINTS_PARSE_ERROR_COUNT, \
+    GRPC_REMOTE_ALLOC_DELTA_COUNT, GRPC_REMOTE_ALLOC_DELTA_REJECTED_COUNT
 from titus_isolate.model.processor.config import get_cpu_from_env
-from titus_isolate.utils import get_config_manager
+from titus_isolate.model.workload_interface import Workload
+from titus_isolate.utils import get_config_manager, get_event_manager
 
 REQ_TYPE_METADATA_KEY = "req_type"
 
@@ -27,6 +40,8 @@ SYS_CORES_HARD_ISOLATE_KEY = 'SYS_CORES_HARD_ISOLATE'
 
 CONSTRAINTS_FILE_PATH = "/opt/venvs/titus-isolate/constraints.json"
 
+PER_CALL_FIELDS = ["metadata", "task_to_job_id", "tasks_to_place", "constraints"]
+
 
 class GrpcRemoteIsolationAllocator(CpuAllocator):
 
@@ -37,14 +52,28 @@ class GrpcRemoteIsolationAllocator(CpuAllocator):
             raise Exception("Could not get remote allocator endpoint address.")
         self.__call_timeout_secs = config_manager.get_cached_int(GRPC_REMOTE_ALLOC_CLIENT_CALL_TIMEOUT_MS,
                                                                  GRPC_REMOTE_ALLOC_DEFAULT_CLIENT_CALL_TIMEOUT_MS) / 1000.0
+        self.__min_call_timeout_secs = config_manager.get_cached_int(
+            GRPC_REMOTE_ALLOC_MIN_CLIENT_CALL_TIMEOUT_MS, GRPC_REMOTE_ALLOC_DEFAULT_MIN_CLIENT_CALL_TIMEOUT_MS) / 1000.0
+        self.__keepalive_time_ms = config_manager.get_cached_int(
+            GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS, DEFAULT_GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS)
 
         self.__stub = self.__create_stub()
         self.__instance_ctx = self.__pull_context()
         self.__reg = None
+        self.__tags = None
         self.__empty_cpu = get_cpu_from_env()
         self.__natural2original_indexing = self.__empty_cpu.get_natural_indexing_2_original_indexing()
         self.__original2natural_indexing = {v: k for k, v in self.__natural2original_indexing.items()}
         self.__init_sys_cores_data(config_manager)
+        self.__init_req()
+        self.__constraints_loader = ConstraintsLoader(CONSTRAINTS_FILE_PATH)
+
+        self.__delta_mode = config_manager.get_cached_bool(
+            GRPC_REMOTE_ALLOC_DELTA_MODE, DEFAULT_GRPC_REMOTE_ALLOC_DELTA_MODE)
+        # The placement of the last response, which delta requests are based on
+        self.__placement = None
+        self.__delta_count = 0
+        self.__delta_rejected_count = 0
 
     def __init_sys_cores_data(self, config_manager):
         self.__metadata = {}
@@ -58,70 +87,30 @@ class GrpcRemoteIsolationAllocator(CpuAllocator):
         if sys_cores_hard_isolate != None:
             self.__metadata[SYS_CORES_HARD_ISOLATE_KEY] = str(sys_cores_hard_isolate)
 
+    def __init_req(self):
+        # A single request is reused by every call so that its layout only needs to be patched, see LayoutBuilder.
+        self.__req_lock = Lock()
+        self.__req = pb.IsolationRequest()
+        self.__req.instance_context.CopyFrom(self.__instance_ctx)
+        self.__layout_builder = LayoutBuilder(self.__empty_cpu, self.__original2natural_indexing, self.__req.layout)
+
     def __build_base_req(self, cpu) -> pb.IsolationRequest:
-        req = pb.IsolationRequest()
-        packages = []
-        for p in cpu.get_packages():
-            cores = []
-            num_cores = 0
-            for c in p.get_cores():
-                num_cores += 1
-                threads = []
-                threads_per_core = 0
-                for t in c.get_threads():
-                    threads_per_core += 1
-                    task_ids = t.get_workload_ids()
-                    if len(task_ids) > 0:
-                        pt = pb.Thread()
-                        pt.id = self.__original2natural_indexing[t.get_id()]
-                        for tid in task_ids:
-                            pt.task_ids.append(tid)
-                        threads.append(pt)
-                if len(threads) > 0:
-                    pc = pb.Core()
-                    pc.id = c.get_id()
-                    pc.threads.extend(threads)
-                    cores.append(pc)
-            pp = pb.Package()
-            pp.id = p.get_id()
-            pp.num_cores = num_cores
-            pp.cores.extend(cores)
-            packages.append(pp)
-        req.layout.packages.extend(packages)
-        req.layout.threads_per_core = threads_per_core
-        req.instance_context.CopyFrom(self.__instance_ctx)
-        for k,v in self.__metadata.items():
+        req = self.__req
+        for field in PER_CALL_FIELDS:
+            req.ClearField(field)
+        for k, v in self.__metadata.items():
             req.metadata[k] = v
+        self.__layout_builder.update(cpu)
         return req
 
-    @staticmethod
-    def __load_custom_constraints() -> pb.Constraints:
-        try:
-            with open(CONSTRAINTS_FILE_PATH) as f:
-                return ParsePbJson(f.read(), pb.Constraints())
-        except FileNotFoundError:
-            return None
-        except Exception as e:
-            log.error("Failed to load custom constraints file. Invalid syntax:\n %s", e, exc_info=1)
-            return None
-
-
     def __deser(self, response: pb.IsolationResponse) -> AllocateResponse:
         new_cpu = copy.deepcopy(self.__empty_cpu)
         id2workloads = defaultdict(list)
         wa_responses = []
         for wid, cpuset in response.cpusets.items():
-            thread_ids = [self.__natural2original_indexing[tid] for tid in cpuset.thread_ids]
-            war = WorkloadAllocateResponse(
-                wid,
-                thread_ids,
-                cpuset.cfs_tunables.shares,
-                cpuset.cfs_tunables.quota_us,
-                cpuset.cpuset_tunables.memory_migrate,
-                cpuset.cpuset_tunables.memory_spread_page,
-                cpuset.cpuset_tunables.memory_spread_slab)
+            war = self.__get_workload_allocation(wid, cpuset)
             wa_responses.append(war)
-            for tid in thread_ids:
+            for tid in war.get_thread_ids():
                 id2workloads[tid].append(wid)
         for package in new_cpu.get_packages():
             for core in package.get_cores():
@@ -131,43 +120,127 @@ class GrpcRemoteIsolationAllocator(CpuAllocator):
                         for wid in workloads:
                             thread.claim(wid)
 
+        if self.__delta_mode and PLACEMENT_VERSION_METADATA_KEY in response.metadata:
+            self.__placement = Placement(
+                response.metadata[PLACEMENT_VERSION_METADATA_KEY],
+                new_cpu.snapshot(),
+                {war.get_workload_id(): war for war in wa_responses})
+
         return AllocateResponse(new_cpu, wa_responses, self.get_name(), {})
 
+    def __get_workload_allocation(self, wid: str, cpuset: pb.Cpuset) -> WorkloadAllocateResponse:
+        return WorkloadAllocateResponse(
+            wid,
+            [self.__natural2original_indexing[tid] for tid in cpuset.thread_ids],
+            cpuset.cfs_tunables.shares,
+            cpuset.cfs_tunables.quota_us,
+            cpuset.cpuset_tunables.memory_migrate,
+            cpuset.cpuset_tunables.memory_spread_page,
+            cpuset.cpuset_tunables.memory_spread_slab)
+
     def __process(self, request: AllocateRequest) -> AllocateResponse:
+        with self.__req_lock:
+            if self.__placement is not None and self.__placement.is_base_of(request.get_cpu()):
+                response = self.__process_delta(request)
+                if response is not None:
+                    return response
+
+            self.__placement = None
+            response = self.__compute_isolation(request)
+
+            try:
+                return self.__deser(response)
+            except Exception as e:
+                log.exception("failed to deseralize response for remote isolate request")
+                raise e
+
+    def __compute_isolation(self, request: AllocateRequest) -> pb.IsolationResponse:
         req = self.__build_base_req(request.get_cpu())
         req.metadata[REQ_TYPE_METADATA_KEY] = "isolate" # for logging purposes server side
+        if self.__delta_mode:
+            req.metadata[REQ_MODE_METADATA_KEY] = FULL_REQ_MODE
+        self.__add_tasks_to_place(req, list(request.get_workloads().values()))
+        return self.__call(req)
 
+    def __process_delta(self, request: AllocateRequest) -> Optional[AllocateResponse]:
+        placement = self.__placement
+        workloads = request.get_workloads()
+        added, removed = placement.get_delta(workloads.keys())
+
+        req = pb.IsolationRequest()
+        req.instance_context.CopyFrom(self.__instance_ctx)
+        for k, v in self.__metadata.items():
+            req.metadata[k] = v
+        req.metadata[REQ_TYPE_METADATA_KEY] = "isolate"
+        req.metadata[REQ_MODE_METADATA_KEY] = DELTA_REQ_MODE
+        req.metadata[PLACEMENT_VERSION_METADATA_KEY] = placement.get_version()
+        req.metadata[REMOVED_TASKS_METADATA_KEY] = json.dumps(removed)
+        self.__add_tasks_to_place(req, [workloads[wid] for wid in added])
+
+        try:
+            response = self.__call(req)
+        except grpc.RpcError as e:
+            if not self.__is_rejected_delta(req, e):
+                raise e
+            log.warning("remote isolate delta was rejected, falling back to a full request: %s", e.details())
+            self.__delta_rejected_count += 1
+            return None
+
+        if response.metadata.get(REQ_MODE_METADATA_KEY, None) != DELTA_REQ_MODE:
+            log.error("remote isolate service does not support delta requests, disabling them")
+            self.__delta_mode = False
+            self.__delta_rejected_count += 1
+            return None
+
+        changed = [self.__get_workload_allocation(wid, cpuset) for wid, cpuset in response.cpusets.items()]
+        self.__placement = placement.apply(response.metadata[PLACEMENT_VERSION_METADATA_KEY], removed, changed)
+        self.__delta_count += 1
+        return AllocateResponse(
+            self.__placement.get_cpu().snapshot(),
+            list(self.__placement.get_allocations().values()),
+            self.get_name(),
+            {})
+
+    def __add_tasks_to_place(self, req: pb.IsolationRequest, workloads: List[Workload]):
         workload_id_to_thread_count = {}
-        for wid, w in request.get_workloads().items():
-            req.task_to_job_id[wid] = w.get_job_id()
-            req.tasks_to_place.append(wid)
+        for w in workloads:
+            req.task_to_job_id[w.get_task_id()] = w.get_job_id()
+            req.tasks_to_place.append(w.get_task_id())
             workload_id_to_thread_count[w.get_task_id()] = str(w.get_thread_count())
 
-        req.metadata['workload_id_to_thread_count'] = json.dumps(workload_id_to_thread_count)
+        req.metadata[WORKLOAD_ID_TO_THREAD_COUNT_METADATA_KEY] = json.dumps(workload_id_to_thread_count)
 
-        constraints = self.__load_custom_constraints()
+        constraints = self.__constraints_loader.load()
         if constraints is not None:
-            log.info("custom constraints to apply: %s", str(constraints).replace('\n', ' '))
             req.constraints.CopyFrom(constraints)
 
+    def __call(self, req: pb.IsolationRequest) -> pb.IsolationResponse:
         try:
-            log.info("remote isolate (tasks_to_place=%s)", req.tasks_to_place)
-            response = self.__stub.ComputeIsolation(req, timeout=self.__call_timeout_secs)
+            timeout = self.__get_call_timeout()
+            log.info("remote isolate (mode=%s, tasks_to_place=%s, timeout=%s)",
+                     req.metadata.get(REQ_MODE_METADATA_KEY, FULL_REQ_MODE), req.tasks_to_place, timeout)
+            return self.__stub.ComputeIsolation(req, timeout=timeout, compression=get_compression(req))
         except grpc.RpcError as e:
-            log.exception("remote isolate failed (tasks_to_place=%s)")
+            # Rejected deltas are expected, e.g. after the service restarted, and are retried as full requests
+            if not self.__is_rejected_delta(req, e):
+                log.exception("remote isolate failed (tasks_to_place=%s)", req.tasks_to_place)
             raise e
 
-        try:
-            return self.__deser(response)
-        except Exception as e:
-            log.exception("failed to deseralize response for remote isolate request")
-            raise e
+    @staticmethod
+    def __is_rejected_delta(req: pb.IsolationRequest, e: grpc.RpcError) -> bool:
+        return req.metadata.get(REQ_MODE_METADATA_KEY, None) == DELTA_REQ_MODE and \
+            e.code() == grpc.StatusCode.FAILED_PRECONDITION
 
-    def __create_stub(self) -> pb_grpc.IsolationServiceStub:
-        channel = grpc.insecure_channel(self.__endpoint,
-                                        compression=grpc.Compression.Gzip)
+    def __get_call_timeout(self) -> float:
+        event_manager = get_event_manager()
+        queue_depth = 0 if event_manager is None else event_manager.get_queue_depth()
+        timeout = get_deadline_budget(self.__call_timeout_secs, self.__min_call_timeout_secs, queue_depth)
+        if self.__reg is not None:
+            self.__reg.distribution_summary(GRPC_REMOTE_ALLOC_DEADLINE, self.__tags).record(timeout)
+        return timeout
 
-        return pb_grpc.IsolationServiceStub(channel)
+    def __create_stub(self) -> pb_grpc.IsolationServiceStub:
+        return pb_grpc.IsolationServiceStub(get_channel(self.__endpoint, self.__keepalive_time_ms))
 
     @staticmethod
     def __pull_context() -> pb.InstanceContext:
@@ -188,7 +261,16 @@ class GrpcRemoteIsolationAllocator(CpuAllocator):
         return self.__class__.__name__
 
     def set_registry(self, registry, tags):
-        pass
+        self.__reg = registry
+        self.__tags = tags
+
+    def get_delta_count(self) -> int:
+        return self.__delta_count
+
+    def get_delta_rejected_count(self) -> int:
+        return self.__delta_rejected_count
 
     def report_metrics(self, tags):
-        pass
+        self.__reg.gauge(GRPC_REMOTE_ALLOC_DELTA_COUNT, tags).set(self.get_delta_count())
+        self.__reg.gauge(GRPC_REMOTE_ALLOC_DELTA_REJECTED_COUNT, tags).set(self.get_delta_rejected_count())
+        self.__reg.gauge(CUSTOM_CONSTRAINTS_PARSE_ERROR_COUNT, tags).set(self.__constraints_loader.get_error_count())
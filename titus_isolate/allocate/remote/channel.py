@@ -0,0 +1,121 @@
+import json
+from threading import Lock
+
+import grpc
+
+from titus_isolate import log
+
+SERVICE_NAME = "isolation.v1.IsolationService"
+
+KEEPALIVE_TIMEOUT_MS = 10000
+INITIAL_RECONNECT_BACKOFF_MS = 100
+MAX_RECONNECT_BACKOFF_MS = 5000
+
+# Requests smaller than this are sent uncompressed, gzip costs more cpu than it saves on them.
+GZIP_MIN_REQUEST_BYTES = 8192
+
+# Calls which fail before reaching the service, e.g. while it restarts, are retried within their deadline.
+SERVICE_CONFIG = {
+    "methodConfig": [{
+        "name": [{"service": SERVICE_NAME}],
+        "retryPolicy": {
+            "maxAttempts": 3,
+            "initialBackoff": "0.05s",
+            "maxBackoff": "0.5s",
+            "backoffMultiplier": 2,
+            "retryableStatusCodes": ["UNAVAILABLE"]
+        }
+    }]
+}
+
+CHANNEL_OPTIONS = [
+    ('grpc.initial_reconnect_backoff_ms', INITIAL_RECONNECT_BACKOFF_MS),
+    ('grpc.max_reconnect_backoff_ms', MAX_RECONNECT_BACKOFF_MS),
+    ('grpc.enable_retries', 1),
+    ('grpc.service_config', json.dumps(SERVICE_CONFIG)),
+]
+
+# endpoint -> channel
+__channels = {}
+__channels_lock = Lock()
+
+# endpoint -> future of the reconnection of its idle channel
+__ready_futures = {}
+
+
+def get_channel_options(keepalive_time_ms: int) -> list:
+    """
+    Keepalive pings are only sent while calls are in flight, as pings on an idle connection are answered with a GOAWAY
+    by services which enforce the default keepalive policy.
+    """
+    if keepalive_time_ms <= 0:
+        return CHANNEL_OPTIONS
+
+    return CHANNEL_OPTIONS + [
+        ('grpc.keepalive_time_ms', keepalive_time_ms),
+        ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT_MS),
+    ]
+
+
+def get_channel(endpoint: str, keepalive_time_ms: int = 0) -> grpc.Channel:
+    """
+    Returns the channel shared by all clients of an endpoint, created with the keepalive time of its first client.
+
+    The channel reconnects as soon as it becomes idle, e.g. after the service restarts, so that calls do not pay for
+    connection establishment.
+    """
+    with __channels_lock:
+        channel = __channels.get(endpoint, None)
+        if channel is None:
+            log.info("Creating grpc channel to: %s with keepalive time: %d ms", endpoint, keepalive_time_ms)
+            channel = grpc.insecure_channel(endpoint, options=get_channel_options(keepalive_time_ms))
+            channel.subscribe(lambda state: __on_connectivity_change(endpoint, channel, state), try_to_connect=True)
+            __channels[endpoint] = channel
+        return channel
+
+
+def close_channels():
+    with __channels_lock:
+        for future in __ready_futures.values():
+            future.cancel()
+        __ready_futures.clear()
+
+        for channel in __channels.values():
+            channel.close()
+        __channels.clear()
+
+
+def get_compression(request) -> grpc.Compression:
+    if request.ByteSize() >= GZIP_MIN_REQUEST_BYTES:
+        return grpc.Compression.Gzip
+    return grpc.Compression.NoCompression
+
+
+def get_deadline_budget(timeout_sec: float, min_timeout_sec: float, queue_depth: int) -> float:
+    """
+    Shares the call timeout among the queued events, so a slow service does not hold up a growing queue for the full
+    timeout on every event.  The budget never drops below the minimum timeout, nor exceeds the call timeout.
+    """
+    return min(timeout_sec, max(min_timeout_sec, timeout_sec / (1 + max(queue_depth, 0))))
+
+
+def __on_connectivity_change(endpoint: str, channel: grpc.Channel, state: grpc.ChannelConnectivity):
+    log.debug("grpc channel to: %s is %s", endpoint, state)
+    if state != grpc.ChannelConnectivity.IDLE:
+        return
+
+    with __channels_lock:
+        if __channels.get(endpoint, None) is not channel:
+            log.debug("grpc channel to: %s is closed", endpoint)
+            return
+
+        future = __ready_futures.get(endpoint, None)
+        if future is not None and not future.done():
+            return
+
+        try:
+            # Waiting on readiness asks the channel to connect again, the future is only kept to avoid creating another
+            # one while it is pending
+            __ready_futures[endpoint] = grpc.channel_ready_future(channel)
+        except ValueError:
+            log.debug("grpc channel to: %s is closed", endpoint)
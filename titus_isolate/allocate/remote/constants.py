@@ -0,0 +1,20 @@
+# Delta isolation protocol
+#
+# The IsolationRequest / IsolationResponse messages are shared with the isolation service, so delta requests are
+# expressed with their existing fields plus the metadata keys below.  A delta request carries no layout, only the
+# added tasks in tasks_to_place, the removed tasks and the version of the placement they apply to.  Its response only
+# holds the cpusets which changed.  A service which cannot apply the delta, e.g. because it no longer knows the base
+# placement version, fails the call with FAILED_PRECONDITION and the client falls back to a full request.
+
+REQ_MODE_METADATA_KEY = "req_mode"
+FULL_REQ_MODE = "full"
+DELTA_REQ_MODE = "delta"
+
+# The version of the placement a delta applies to in requests, and the version of the resulting placement in responses
+PLACEMENT_VERSION_METADATA_KEY = "placement_version"
+
+# A JSON list of the task ids removed since the base placement
+REMOVED_TASKS_METADATA_KEY = "removed_tasks"
+
+# A JSON map of task id to thread count, for the tasks in tasks_to_place
+WORKLOAD_ID_TO_THREAD_COUNT_METADATA_KEY = "workload_id_to_thread_count"
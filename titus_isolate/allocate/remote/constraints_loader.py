@@ -0,0 +1,61 @@
+import os
+from threading import Lock
+from typing import Optional
+
+from google.protobuf.json_format import Parse as ParsePbJson
+
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+from titus_isolate import log
+
+
+class ConstraintsLoader:
+    """
+    Loads custom constraints from a JSON file.
+
+    The parsed constraints are cached until the file's modification time or size changes, so the file is only
+    stat'ed on each load.  A file which fails to parse is reported once, and is not parsed again until it changes.
+    """
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__lock = Lock()
+        self.__version = None
+        self.__constraints = None
+        self.__parse_count = 0
+        self.__error_count = 0
+
+    def load(self) -> Optional[pb.Constraints]:
+        with self.__lock:
+            try:
+                stat = os.stat(self.__path)
+            except FileNotFoundError:
+                self.__version = None
+                self.__constraints = None
+                return None
+
+            version = (stat.st_mtime_ns, stat.st_size)
+            if version != self.__version:
+                self.__version = version
+                self.__constraints = self.__parse()
+
+            return self.__constraints
+
+    def __parse(self) -> Optional[pb.Constraints]:
+        self.__parse_count += 1
+        try:
+            with open(self.__path) as f:
+                constraints = ParsePbJson(f.read(), pb.Constraints())
+            log.info("custom constraints to apply: %s", str(constraints).replace('\n', ' '))
+            return constraints
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.__error_count += 1
+            log.error("Failed to load custom constraints file. Invalid syntax:\n %s", e, exc_info=1)
+            return None
+
+    def get_parse_count(self) -> int:
+        return self.__parse_count
+
+    def get_error_count(self) -> int:
+        return self.__error_count
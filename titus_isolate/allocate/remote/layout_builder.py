@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from typing import Dict
+
+import titus_isolate.allocate.remote.isolate_pb2 as pb
+
+from titus_isolate import log
+from titus_isolate.model.processor.cpu import Cpu
+from titus_isolate.model.processor.topology import Topology
+
+
+class LayoutBuilder:
+    """
+    Maintains the layout of an isolation request in place.
+
+    The topology part of the layout (packages, their core counts and threads per core) is built once.  On every update
+    the CPU's occupancy is diffed against the previous update's and only the cores whose threads changed are patched.
+    A package's list of cores is only rebuilt from the first of its cores which became occupied or empty.
+
+    The layout message is owned by the builder between updates, callers must not modify it nor update it concurrently.
+    """
+
+    def __init__(self, cpu: Cpu, original2natural_indexing: Dict[int, int], layout: pb.Layout):
+        self.__original2natural_indexing = original2natural_indexing
+        self.__layout = layout
+        self.__reset(cpu.get_topology())
+
+    def __reset(self, topology: Topology):
+        self.__topology = topology
+        self.__natural_ids = tuple(self.__original2natural_indexing[t_id] for t_id in topology.get_thread_ids())
+
+        self.__layout.Clear()
+        for p_i, package_id in enumerate(topology.get_package_ids()):
+            self.__layout.packages.add(id=package_id, num_cores=len(topology.get_package_cores(p_i)))
+        self.__layout.threads_per_core = len(topology.get_core_slots(topology.get_core_count() - 1))
+
+        # package -> sorted indices of the package's occupied cores, in the order of the package's layout cores
+        self.__occupied_cores = [[] for _ in range(topology.get_package_count())]
+        self.__workload_ids = ((),) * topology.get_slot_count()
+
+    def update(self, cpu: Cpu):
+        if cpu.get_topology() != self.__topology:
+            log.info("CPU topology has changed, rebuilding isolation request layout")
+            self.__reset(cpu.get_topology())
+
+        self.__patch(cpu.get_occupancy().get_all_workload_ids())
+
+    def __patch(self, workload_ids):
+        topology = self.__topology
+        changed_cores = {
+            topology.get_slot_core(slot)
+            for slot, (ids, prev_ids) in enumerate(zip(workload_ids, self.__workload_ids))
+            if ids is not prev_ids and ids != prev_ids}
+        self.__workload_ids = workload_ids
+
+        # package -> lowest index of the package's cores which became occupied or empty
+        dirty_packages = {}
+        patched_cores = []
+        for c_i in changed_cores:
+            p_i = topology.get_core_package(c_i)
+            occupied_cores = self.__occupied_cores[p_i]
+            is_occupied = any(len(workload_ids[slot]) > 0 for slot in topology.get_core_slots(c_i))
+            position = bisect_left(occupied_cores, c_i)
+            was_occupied = position < len(occupied_cores) and occupied_cores[position] == c_i
+
+            if is_occupied != was_occupied:
+                if is_occupied:
+                    occupied_cores.insert(position, c_i)
+                else:
+                    del occupied_cores[position]
+                dirty_packages[p_i] = min(c_i, dirty_packages.get(p_i, c_i))
+            elif is_occupied:
+                patched_cores.append(c_i)
+
+        # Cores before the first one which became occupied or empty keep their position in the package's layout
+        rebuilt_from = {}
+        for p_i, c_i in dirty_packages.items():
+            position = bisect_left(self.__occupied_cores[p_i], c_i)
+            cores = self.__layout.packages[p_i].cores
+            del cores[position:]
+            for c_i in self.__occupied_cores[p_i][position:]:
+                self.__add_threads(cores.add(id=topology.get_core_ids()[c_i]), c_i)
+            rebuilt_from[p_i] = position
+
+        for c_i in patched_cores:
+            p_i = topology.get_core_package(c_i)
+            position = bisect_left(self.__occupied_cores[p_i], c_i)
+            if position >= rebuilt_from.get(p_i, position + 1):
+                continue
+            core = self.__layout.packages[p_i].cores[position]
+            del core.threads[:]
+            self.__add_threads(core, c_i)
+
+    def __add_threads(self, core: pb.Core, c_i: int):
+        for slot in self.__topology.get_core_slots(c_i):
+            task_ids = self.__workload_ids[slot]
+            if len(task_ids) > 0:
+                thread = core.threads.add(id=self.__natural_ids[slot])
+                thread.task_ids.extend(task_ids)
@@ -0,0 +1,64 @@
+from typing import Dict, Iterable, List, Tuple
+
+from titus_isolate.allocate.workload_allocate_response import WorkloadAllocateResponse
+from titus_isolate.model.processor.cpu import Cpu
+
+
+class Placement:
+    """
+    A versioned placement returned by the isolation service.
+
+    It is the base against which delta requests are computed and to which the cpusets of delta responses are applied.
+    Placements are immutable, applying a delta returns a new placement built on a copy-on-write snapshot of the CPU.
+    """
+
+    def __init__(self, version: str, cpu: Cpu, allocations: Dict[str, WorkloadAllocateResponse]):
+        self.__version = version
+        self.__cpu = cpu
+        self.__allocations = allocations
+
+    def get_version(self) -> str:
+        return self.__version
+
+    def get_cpu(self) -> Cpu:
+        return self.__cpu
+
+    def get_allocations(self) -> Dict[str, WorkloadAllocateResponse]:
+        return self.__allocations
+
+    def is_base_of(self, cpu: Cpu) -> bool:
+        """
+        Whether a CPU is still in the state of this placement, e.g. it was not since changed by another allocator.
+        Unchanged slots share their workload id tuples with the placement's CPU, so this mostly compares identities.
+        """
+        return cpu.get_topology() == self.__cpu.get_topology() and \
+            cpu.get_occupancy().get_all_workload_ids() == self.__cpu.get_occupancy().get_all_workload_ids()
+
+    def get_delta(self, workload_ids: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        :return: the workloads added to and removed from this placement, in that order
+        """
+        workload_ids = set(workload_ids)
+        added = sorted(workload_ids.difference(self.__allocations.keys()))
+        removed = sorted(set(self.__allocations.keys()).difference(workload_ids))
+        return added, removed
+
+    def apply(self, version: str, removed: List[str], changed: List[WorkloadAllocateResponse]) -> 'Placement':
+        cpu = self.__cpu.snapshot()
+        occupancy = cpu.get_occupancy()
+        topology = cpu.get_topology()
+        allocations = dict(self.__allocations)
+
+        for w_id in removed + [w_alloc.get_workload_id() for w_alloc in changed]:
+            w_alloc = allocations.pop(w_id, None)
+            if w_alloc is not None:
+                for t_id in w_alloc.get_thread_ids():
+                    occupancy.free(topology.get_slot(t_id), w_id)
+
+        for w_alloc in changed:
+            w_id = w_alloc.get_workload_id()
+            for t_id in w_alloc.get_thread_ids():
+                occupancy.claim(topology.get_slot(t_id), w_id)
+            allocations[w_id] = w_alloc
+
+        return Placement(version, cpu, allocations)
@@ -0,0 +1,201 @@
+from typing import Dict, List, Tuple
+
+from titus_isolate import log
+from titus_isolate.allocate.allocate_request import AllocateRequest
+from titus_isolate.allocate.allocate_response import AllocateResponse
+from titus_isolate.allocate.cpu_allocator import CpuAllocator
+from titus_isolate.allocate.workload_allocate_response import WorkloadAllocateResponse, \
+    get_workload_response_for_threads
+from titus_isolate.model.processor.occupancy import Occupancy
+from titus_isolate.model.processor.topology import Topology
+from titus_isolate.model.workload_interface import Workload
+
+
+def get_bit_count(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def get_slots(mask: int) -> List[int]:
+    slots = []
+    while mask:
+        low_bit = mask & -mask
+        slots.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return slots
+
+
+class TopologyMasks:
+    """
+    The slot bitmasks of every core and package of a Topology.
+    """
+
+    def __init__(self, topology: Topology):
+        self.topology = topology
+        self.core_masks = [sum(1 << s for s in topology.get_core_slots(c)) for c in range(topology.get_core_count())]
+        self.package_cores = [topology.get_package_cores(p) for p in range(topology.get_package_count())]
+        self.package_masks = [sum(self.core_masks[c] for c in cores) for cores in self.package_cores]
+
+
+class TopologyCpuAllocator(CpuAllocator):
+    """
+    Places workloads using bitmasks of the free threads of each core and package.
+
+    Workloads which are already placed keep their threads, so only new workloads are placed and departed workloads are
+    freed.  New workloads are placed largest first, each on a single package whenever one has enough free threads and
+    on whole free cores where possible, so cores are only shared and workloads only split across packages when the CPU
+    is too full to avoid it.
+    """
+
+    def __init__(self):
+        self.__masks = None
+
+    def isolate(self, request: AllocateRequest) -> AllocateResponse:
+        cpu = request.get_cpu()
+        topology = cpu.get_topology()
+        occupancy = cpu.get_occupancy()
+        workloads = request.get_workloads()
+
+        if self.__masks is None or self.__masks.topology != topology:
+            self.__masks = TopologyMasks(topology)
+        masks = self.__masks
+
+        placements = self.__keep_placements(occupancy, workloads)
+
+        free = 0
+        for slot in occupancy.get_empty_slots():
+            free |= 1 << slot
+
+        new_workloads = [w for w_id, w in workloads.items() if w_id not in placements]
+        new_workloads.sort(key=lambda w: (-w.get_thread_count(), w.get_task_id()))
+        for workload in new_workloads:
+            w_id = workload.get_task_id()
+            slots, free = self.__place(masks, free, workload.get_thread_count())
+            if len(slots) < workload.get_thread_count():
+                slots += self.__get_oversubscribed_slots(occupancy, slots, workload.get_thread_count() - len(slots))
+                log.warning("Oversubscribing threads for workload: %s", w_id)
+
+            slots.sort()
+            for slot in slots:
+                occupancy.claim(slot, w_id)
+            placements[w_id] = slots
+
+        return AllocateResponse(cpu, self.__get_allocations(topology, workloads, placements), self.get_name(), {})
+
+    @staticmethod
+    def __keep_placements(occupancy: Occupancy, workloads: Dict[str, Workload]) -> Dict[str, List[int]]:
+        """
+        Workloads keep their threads unless they were removed or their thread count changed, in which case they are
+        freed.
+
+        :return: the slots of the workloads which kept their threads
+        """
+        placements = {}
+        for w_id, slots in occupancy.get_workload_ids_to_slots().items():
+            workload = workloads.get(w_id, None)
+            if workload is None or workload.get_thread_count() != len(slots):
+                for slot in slots:
+                    occupancy.free(slot, w_id)
+            else:
+                placements[w_id] = slots
+        return placements
+
+    @staticmethod
+    def __get_allocations(
+            topology: Topology,
+            workloads: Dict[str, Workload],
+            placements: Dict[str, List[int]]) -> List[WorkloadAllocateResponse]:
+        thread_ids = topology.get_thread_ids()
+        allocations = []
+        for w_id, workload in workloads.items():
+            allocation = get_workload_response_for_threads(
+                workload, [thread_ids[s] for s in placements.get(w_id, [])])
+            if allocation is not None:
+                allocations.append(allocation)
+        return allocations
+
+    def __place(self, masks: TopologyMasks, free: int, thread_count: int) -> Tuple[List[int], int]:
+        package_frees = [free & package_mask for package_mask in masks.package_masks]
+        package_free_counts = [get_bit_count(package_free) for package_free in package_frees]
+
+        candidates = [p for p, count in enumerate(package_free_counts) if count >= thread_count]
+        if len(candidates) > 0:
+            # Prefer packages where the workload fits on whole free cores, then the fullest package which fits it, which
+            # keeps larger holes for larger workloads
+            package = min(candidates, key=lambda p: (
+                self.__get_free_core_thread_count(masks, p, package_frees[p]) < thread_count,
+                package_free_counts[p],
+                p))
+            slots = self.__select(masks, package, package_frees[package], thread_count)
+        else:
+            # The workload has to be split, starting with the emptiest packages
+            slots = []
+            for package in sorted(range(len(package_frees)), key=lambda p: (-package_free_counts[p], p)):
+                if len(slots) == thread_count:
+                    break
+                slots += self.__select(
+                    masks, package, package_frees[package], min(thread_count - len(slots), package_free_counts[package]))
+
+        for slot in slots:
+            free &= ~(1 << slot)
+        return slots, free
+
+    @staticmethod
+    def __get_free_core_thread_count(masks: TopologyMasks, package: int, package_free: int) -> int:
+        count = 0
+        for core in masks.package_cores[package]:
+            core_mask = masks.core_masks[core]
+            if package_free & core_mask == core_mask:
+                count += get_bit_count(core_mask)
+        return count
+
+    @staticmethod
+    def __select(masks: TopologyMasks, package: int, package_free: int, thread_count: int) -> List[int]:
+        free_cores = []
+        partial_cores = []
+        for core in masks.package_cores[package]:
+            core_mask = masks.core_masks[core]
+            core_free = package_free & core_mask
+            if core_free == core_mask:
+                free_cores.append(core_mask)
+            elif core_free != 0:
+                partial_cores.append(core_free)
+
+        slots = []
+
+        # Whole free cores first
+        for core_mask in free_cores:
+            remaining = thread_count - len(slots)
+            if remaining <= 0:
+                break
+            core_slots = get_slots(core_mask)
+            if len(core_slots) > remaining:
+                # The remainder still goes to a free core, idle siblings are better than shared cores
+                slots += core_slots[:remaining]
+                break
+            slots += core_slots
+
+        # Then the partially free cores with the most free threads, i.e. shared with the fewest threads
+        partial_cores.sort(key=lambda core_free: -get_bit_count(core_free))
+        for core_free in partial_cores:
+            remaining = thread_count - len(slots)
+            if remaining <= 0:
+                break
+            slots += get_slots(core_free)[:remaining]
+
+        return slots
+
+    @staticmethod
+    def __get_oversubscribed_slots(occupancy: Occupancy, slots: List[int], thread_count: int) -> List[int]:
+        # The least shared threads are oversubscribed first
+        candidates = [s for s in range(occupancy.get_slot_count()) if s not in slots]
+        candidates.sort(key=lambda s: len(occupancy.get_workload_ids(s)))
+        return candidates[:thread_count]
+
+    def get_name(self) -> str:
+        return self.__class__.__name__
+
+    def set_registry(self, registry, tags):
+        pass
+
+    def report_metrics(self, tags):
+        pass
@@ -90,7 +90,11 @@ def get_cpu_shares(workload: Workload) -> int:
 
 
 def get_workload_response(workload: Workload, cpu: Cpu) -> Optional[WorkloadAllocateResponse]:
-    thread_ids = get_threads(cpu, workload.get_task_id())
+    return get_workload_response_for_threads(workload, get_threads(cpu, workload.get_task_id()))
+
+
+def get_workload_response_for_threads(workload: Workload, thread_ids: List[int]) \
+        -> Optional[WorkloadAllocateResponse]:
     cpu_shares = get_cpu_shares(workload)
     cpu_quota = get_cpu_quota(workload)
 
@@ -8,19 +8,18 @@ from flask import Flask
 
 from titus_isolate import log
 from titus_isolate.api.testing import is_testing
-from titus_isolate.cgroup.file_cgroup_manager import FileCgroupManager
 from titus_isolate.config.constants import RESTART_PROPERTIES
 from titus_isolate.config.restart_property_watcher import RestartPropertyWatcher
 from titus_isolate.crd.publish.kubernetes_predicted_usage_publisher import KubernetesPredictedUsagePublisher
+from titus_isolate.event.constants import DOCKER_EVENT_FILTERS
 from titus_isolate.event.container_batch_event_handler import ContainerBatchEventHandler
 from titus_isolate.event.event_manager import EventManager
 from titus_isolate.event.predict_usage_event_handler import ResourceUsagePredictionHandler
 from titus_isolate.event.rebalance_event_handler import RebalanceEventHandler
 from titus_isolate.event.reconcile_event_handler import ReconcileEventHandler
 from titus_isolate.event.utils import get_current_workloads
-from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
 from titus_isolate.isolate.reconciler import Reconciler
-from titus_isolate.isolate.utils import get_fallback_allocator, get_resource_usage_provider
+from titus_isolate.isolate.utils import get_fallback_allocator, get_resource_usage_provider, get_cgroup_manager
 from titus_isolate.isolate.workload_manager import WorkloadManager
 from titus_isolate.metrics.constants import ISOLATE_LATENCY_KEY
 from titus_isolate.metrics.keystone_event_log_manager import KeystoneEventLogManager
@@ -96,9 +95,10 @@ def get_cpu_viz():
 
 @app.route('/violations')
 def get_violations():
+    violations = get_workload_manager().get_cpu().get_violation_index()
     return json.dumps({
-        "cross_package": get_cross_package_violations(get_workload_manager().get_cpu()),
-        "shared_core": get_shared_core_violations(get_workload_manager().get_cpu())
+        "cross_package": violations.get_cross_package_violations(),
+        "shared_core": violations.get_shared_core_violations()
     })
 
 
@@ -184,7 +184,7 @@ if __name__ != '__main__' and not is_testing():
     log.info("Created Fallback CPU allocator with primary: '{}' and secondary: '{}".format(
         cpu_allocator.get_primary_allocator().__class__.__name__,
         cpu_allocator.get_secondary_allocator().__class__.__name__))
-    cgroup_manager = FileCgroupManager()
+    cgroup_manager = get_cgroup_manager()
     workload_manager = WorkloadManager(cpu=cpu, cgroup_manager=cgroup_manager, cpu_allocator=cpu_allocator)
     set_workload_manager(workload_manager)
 
@@ -206,7 +206,7 @@ if __name__ != '__main__' and not is_testing():
 
     # Start event processing
     log.info("Starting Docker event handling...")
-    event_manager = EventManager(docker.from_env().events(), event_handlers)
+    event_manager = EventManager(docker.from_env().events(filters=DOCKER_EVENT_FILTERS), event_handlers)
     set_event_manager(event_manager)
 
     # Report metrics
@@ -217,7 +217,8 @@ if __name__ != '__main__' and not is_testing():
                                      reconciler,
                                      workload_manager,
                                      predicted_usage_handler,
-                                     container_batch_event_handler] if m is not None]
+                                     container_batch_event_handler,
+                                     workload_monitor_manager] if m is not None]
 
     metrics_manager = MetricsManager(metrics_reporters)
 
@@ -14,6 +14,12 @@ class CgroupManager(MetricsReporter):
     def get_cpuset(self, container_name: str) -> List[int]:
         pass
 
+    def repair_cpuset(self, container_name: str, thread_ids: List[int]):
+        """
+        Re-applies a cpuset which has drifted from the value last set, bypassing any caching of written values.
+        """
+        self.set_cpuset(container_name, thread_ids)
+
     @abstractmethod
     def set_quota(self, container_name: str, quota: int):
         pass
@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict, deque
+from threading import Thread, Condition
+from typing import Callable
+
+from titus_isolate import log
+from titus_isolate.config.constants import DEFAULT_CGROUP_WRITER_THREAD_COUNT
+from titus_isolate.metrics.constants import CGROUP_WRITE_QUEUE_DEPTH_KEY, CGROUP_WRITE_LATENCY_KEY, \
+    CGROUP_WRITE_COALESCED_KEY
+from titus_isolate.metrics.metrics_reporter import MetricsReporter
+
+
+class CgroupWriter(MetricsReporter):
+    """
+    Applies cgroup writes on a fixed pool of worker threads.
+
+    Each container has its own ordered queue of pending writes, keyed by knob (e.g. "cpuset"), and only one worker
+    handles a given container at a time.  So writes to a container are applied in the order their knobs were first
+    enqueued, which preserves the cpuset-first ordering WorkloadManager relies upon.  If a write is enqueued for a
+    knob which already has a pending write it replaces the pending value in place: only the latest value is written.
+    Releasing a container drops its pending writes.
+    """
+
+    def __init__(self, thread_count: int = DEFAULT_CGROUP_WRITER_THREAD_COUNT):
+        self.__reg = None
+        self.__tags = None
+        self.__cond = Condition()
+
+        # container_name -> OrderedDict(knob -> (write, enqueue_time))
+        self.__pending = {}
+        self.__ready = deque()
+        self.__active = set()
+        # container_name -> callback of a release which waits for the container's writes in progress
+        self.__releases = {}
+        self.__pending_count = 0
+        self.__coalesced_count = 0
+
+        self.__threads = [Thread(target=self.__work, daemon=True) for _ in range(max(1, thread_count))]
+        for t in self.__threads:
+            t.start()
+
+    def write(self, container_name: str, knob: str, write: Callable[[], None]):
+        with self.__cond:
+            writes = self.__pending.get(container_name, None)
+            if writes is None:
+                writes = self.__pending[container_name] = OrderedDict()
+
+            if knob in writes:
+                _, enqueue_time = writes[knob]
+                writes[knob] = (write, enqueue_time)
+                self.__coalesced_count += 1
+                log.debug("Coalesced pending write of '{}' for container: {}".format(knob, container_name))
+                return
+
+            writes[knob] = (write, time.time())
+            self.__pending_count += 1
+
+            if container_name not in self.__active and len(writes) == 1:
+                self.__ready.append(container_name)
+                self.__cond.notify()
+
+    def release(self, container_name: str, on_released: Callable[[], None]):
+        """
+        Drops the container's pending writes and calls on_released once none of its writes is in progress, i.e. right
+        away or on the worker which is applying its writes.  on_released must not call back into the writer.
+        """
+        with self.__cond:
+            writes = self.__pending.pop(container_name, None)
+            if writes is not None:
+                log.debug("Dropping {} pending writes for released container: {}".format(len(writes), container_name))
+                self.__pending_count -= len(writes)
+                if container_name in self.__ready:
+                    self.__ready.remove(container_name)
+
+            if container_name in self.__active:
+                self.__releases[container_name] = on_released
+                return
+
+        on_released()
+
+    def get_queue_depth(self) -> int:
+        with self.__cond:
+            return self.__pending_count
+
+    def get_active_count(self) -> int:
+        with self.__cond:
+            return len(self.__active)
+
+    def get_coalesced_count(self) -> int:
+        return self.__coalesced_count
+
+    def has_pending_work(self) -> bool:
+        with self.__cond:
+            return self.__pending_count > 0 or len(self.__active) > 0
+
+    def __work(self):
+        while True:
+            with self.__cond:
+                while len(self.__ready) == 0:
+                    self.__cond.wait()
+                container_name = self.__ready.popleft()
+                writes = self.__pending.pop(container_name)
+                self.__pending_count -= len(writes)
+                self.__active.add(container_name)
+
+            for knob, (write, enqueue_time) in writes.items():
+                try:
+                    write()
+                except Exception:
+                    log.exception("Failed to write '{}' for container: {}".format(knob, container_name))
+                self.__record_latency(time.time() - enqueue_time)
+
+            with self.__cond:
+                # Released before the container stops being active, so it has no pending work until then
+                on_released = self.__releases.pop(container_name, None)
+                if on_released is not None:
+                    on_released()
+
+                self.__active.discard(container_name)
+                # Writes enqueued while this container was being handled were held back to preserve ordering.
+                if container_name in self.__pending:
+                    self.__ready.append(container_name)
+                    self.__cond.notify()
+
+    def __record_latency(self, latency: float):
+        if self.__reg is not None:
+            self.__reg.distribution_summary(CGROUP_WRITE_LATENCY_KEY, self.__tags).record(latency)
+
+    def set_registry(self, registry, tags):
+        self.__reg = registry
+        self.__tags = tags
+
+    def report_metrics(self, tags):
+        self.__reg.gauge(CGROUP_WRITE_QUEUE_DEPTH_KEY, tags).set(self.get_queue_depth())
+        self.__reg.gauge(CGROUP_WRITE_COALESCED_KEY, tags).set(self.get_coalesced_count())
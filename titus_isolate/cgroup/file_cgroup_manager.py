@@ -1,31 +1,47 @@
 import copy
-from threading import Thread, Lock
+from threading import Lock
 from types import FunctionType
 from typing import List
 
 from titus_isolate import log
 from titus_isolate.cgroup.cgroup_manager import CgroupManager
+from titus_isolate.cgroup.cgroup_writer import CgroupWriter
 from titus_isolate.cgroup.utils import set_cpuset, get_cpuset, parse_cpuset, set_quota, get_quota, set_shares, \
     get_shares, set_memory_migrate, set_memory_spread_page, set_memory_spread_slab, get_memory_migrate, \
-    get_memory_spread_page, get_memory_spread_slab
-from titus_isolate.metrics.constants import WRITE_CPUSET_FAILED_KEY, WRITE_CPUSET_SUCCEEDED_KEY, ISOLATED_WORKLOAD_COUNT, CPUSET_THREAD_COUNT
+    get_memory_spread_page, get_memory_spread_slab, CPUSET, MEMORY_MIGRATE, MEMORY_SPREAD_PAGE, MEMORY_SPREAD_SLAB, \
+    QUOTA, SHARES, invalidate_cgroup_paths
+from titus_isolate.config.constants import CGROUP_WRITER_THREAD_COUNT, DEFAULT_CGROUP_WRITER_THREAD_COUNT
+from titus_isolate.metrics.constants import WRITE_CPUSET_FAILED_KEY, WRITE_CPUSET_SUCCEEDED_KEY, ISOLATED_WORKLOAD_COUNT, CPUSET_THREAD_COUNT, \
+    CGROUP_WRITE_PERFORMED_KEY, CGROUP_WRITE_SKIPPED_KEY
+from titus_isolate.utils import get_config_manager
 
 
 class FileCgroupManager(CgroupManager):
+    """
+    Manages containers' cgroups through the cgroup v1 filesystem.
+    """
 
     def __init__(self):
         self.__reg = None
-        self.__thread_lock = Lock()
-        self.__threads = []
+        self.__writer = CgroupWriter(get_config_manager().get_cached_int(
+            CGROUP_WRITER_THREAD_COUNT, DEFAULT_CGROUP_WRITER_THREAD_COUNT))
 
+        # Writes are counted from the writer's threads
+        self.__count_lock = Lock()
         self.__write_count = 0
         self.__fail_count = 0
+        self.__performed_count = 0
+        self.__skipped_count = 0
+
+        # container_name -> {knob -> value}, the value each knob holds once all pending writes have been applied
+        self.__written_lock = Lock()
+        self.__written_values = {}
 
         self.__isolated_lock = Lock()
         self.__isolated_workload_ids = set([])
 
     def set_cpuset(self, container_name: str, thread_ids: List[int]):
-        self.__start(func=self.__set_cpuset, args=[container_name, thread_ids])
+        self._write(CPUSET, set_cpuset, container_name, self._get_thread_ids_str(thread_ids))
 
     def get_cpuset(self, container_name: str) -> List[int]:
         cpuset_str = self.__get_cpuset(container_name)
@@ -34,90 +50,112 @@ class FileCgroupManager(CgroupManager):
         else:
             return parse_cpuset(cpuset_str)
 
+    def repair_cpuset(self, container_name: str, thread_ids: List[int]):
+        # The cpuset no longer holds the value we wrote, so neither the written value nor the path can be trusted.
+        self.__forget_written_value(container_name, CPUSET)
+        invalidate_cgroup_paths(container_name)
+        self.set_cpuset(container_name, thread_ids)
+
     def set_quota(self, container_name: str, quota: int):
-        self.__start(func=self.__set_quota, args=[container_name, quota])
+        self._write(QUOTA, set_quota, container_name, str(quota))
 
     def get_quota(self, container_name: str) -> int:
         return self.__get_quota(container_name)
 
     def set_shares(self, container_name: str, shares: int):
-        self.__start(func=self.__set_shares, args=[container_name, shares])
+        self._write(SHARES, set_shares, container_name, str(shares))
 
     def get_shares(self, container_name: str) -> int:
         return self.__get_shares(container_name)
 
     def set_memory_migrate(self, container_name, on: bool):
-        self.__set(set_memory_migrate, container_name, str(int(on)))
+        self._write(MEMORY_MIGRATE, set_memory_migrate, container_name, str(int(on)))
 
     def get_memory_migrate(self, container_name) -> bool:
-        return bool(int(self.__get(get_memory_migrate, container_name)))
+        return bool(int(self._read(get_memory_migrate, container_name)))
 
     def set_memory_spread_page(self, container_name, on: bool):
-        self.__set(set_memory_spread_page, container_name, str(int(on)))
+        self._write(MEMORY_SPREAD_PAGE, set_memory_spread_page, container_name, str(int(on)))
 
     def get_memory_spread_page(self, container_name) -> bool:
-        return bool(int(self.__get(get_memory_spread_page, container_name)))
+        return bool(int(self._read(get_memory_spread_page, container_name)))
 
     def set_memory_spread_slab(self, container_name, on: bool):
-        self.__set(set_memory_spread_slab, container_name, str(int(on)))
+        self._write(MEMORY_SPREAD_SLAB, set_memory_spread_slab, container_name, str(int(on)))
 
     def get_memory_spread_slab(self, container_name) -> bool:
-        return bool(int(self.__get(get_memory_spread_slab, container_name)))
+        return bool(int(self._read(get_memory_spread_slab, container_name)))
 
     def release_container(self, container_name):
+        with self.__written_lock:
+            self.__written_values.pop(container_name, None)
+
+        # A write still in progress would mark the container isolated and cache its paths again, so they are also
+        # dropped once it completes
+        self.__release(container_name)
+        self.__writer.release(container_name, lambda: self.__release(container_name))
+
+    def __release(self, container_name):
         self.__remove_isolated_workload(container_name)
+        invalidate_cgroup_paths(container_name)
 
     def get_isolated_workload_ids(self):
         with self.__isolated_lock:
             return copy.deepcopy(self.__isolated_workload_ids)
 
     def has_pending_work(self):
-        return self.__get_thread_count() > 0
-
-    def __get_thread_count(self) -> int:
-        self.__remove_dead_threads()
-        return len(self.__threads)
-
-    def __remove_dead_threads(self):
-        with self.__thread_lock:
-            self.__threads = [t for t in self.__threads if t.is_alive()]
+        return self.__writer.has_pending_work()
 
-    def __start(self, func, args):
-        t = Thread(target=func, args=args)
-        t.start()
+    def get_performed_write_count(self) -> int:
+        with self.__count_lock:
+            return self.__performed_count
 
-        with self.__thread_lock:
-            self.__threads.append(t)
-
-    def __set_cpuset(self, container_name: str, thread_ids: List[Thread]):
-        thread_ids_str = self.__get_thread_ids_str(thread_ids)
-        self.__set(set_cpuset, container_name, thread_ids_str)
+    def get_skipped_write_count(self) -> int:
+        with self.__count_lock:
+            return self.__skipped_count
 
     def __get_cpuset(self, container_name: str) -> str:
-        return self.__get(get_cpuset, container_name)
-
-    def __set_quota(self, container_name: str, quota: int):
-        self.__set(set_quota, container_name, str(quota))
+        return self._read(get_cpuset, container_name)
 
     def __get_quota(self, container_name: str) -> int:
-        return int(self.__get(get_quota, container_name))
-
-    def __set_shares(self, container_name: str, shares: int):
-        self.__set(set_shares, container_name, str(shares))
+        return int(self._read(get_quota, container_name))
 
     def __get_shares(self, container_name: str) -> int:
-        return int(self.__get(get_shares, container_name))
-
-    def __set(self, func: FunctionType, container_name: str, value: str):
+        return int(self._read(get_shares, container_name))
+
+    def _write(self, knob: str, func: FunctionType, container_name: str, value: str):
+        with self.__written_lock:
+            values = self.__written_values.setdefault(container_name, {})
+            if values.get(knob, None) == value:
+                with self.__count_lock:
+                    self.__skipped_count += 1
+                log.debug("Skipping unchanged write of {}: {} to container: {}".format(knob, value, container_name))
+                return
+            values[knob] = value
+
+        self.__writer.write(container_name, knob, lambda: self.__set(knob, func, container_name, value))
+
+    def __set(self, knob: str, func: FunctionType, container_name: str, value: str):
+        with self.__count_lock:
+            self.__performed_count += 1
         try:
             func(container_name, value)
             self.__write_succeeded(container_name)
         except Exception:
             self.__write_failed()
+            self.__forget_written_value(container_name, knob, value)
             log.debug("Failed to apply func: {} with value: {} to container: {}".format(
                 func.__name__, value, container_name))
 
-    def __get(self, func: FunctionType, container_name: str) -> str:
+    def __forget_written_value(self, container_name: str, knob: str, value: str = None):
+        # The next request to write the knob must not be skipped.  If a value is given, only forget it if it is still
+        # the latest value, as a newer write may have been requested in the meantime.
+        with self.__written_lock:
+            values = self.__written_values.get(container_name, {})
+            if knob in values and (value is None or values[knob] == value):
+                values.pop(knob)
+
+    def _read(self, func: FunctionType, container_name: str) -> str:
         try:
             return func(container_name)
         except Exception:
@@ -125,10 +163,12 @@ class FileCgroupManager(CgroupManager):
 
     def __write_succeeded(self, container_name):
         self.__add_isolated_workload(container_name)
-        self.__write_count += 1
+        with self.__count_lock:
+            self.__write_count += 1
 
     def __write_failed(self):
-        self.__fail_count += 1
+        with self.__count_lock:
+            self.__fail_count += 1
 
     def __add_isolated_workload(self, container_name):
         with self.__isolated_lock:
@@ -139,14 +179,22 @@ class FileCgroupManager(CgroupManager):
             self.__isolated_workload_ids.discard(container_name)
 
     @staticmethod
-    def __get_thread_ids_str(thread_ids):
+    def _get_thread_ids_str(thread_ids):
         return ",".join([str(t_id) for t_id in thread_ids])
 
     def set_registry(self, registry, tags):
         self.__reg = registry
+        self.__writer.set_registry(registry, tags)
 
     def report_metrics(self, tags):
-        self.__reg.gauge(WRITE_CPUSET_SUCCEEDED_KEY, tags).set(self.__write_count)
-        self.__reg.gauge(WRITE_CPUSET_FAILED_KEY, tags).set(self.__fail_count)
+        with self.__count_lock:
+            write_count = self.__write_count
+            fail_count = self.__fail_count
+
+        self.__reg.gauge(WRITE_CPUSET_SUCCEEDED_KEY, tags).set(write_count)
+        self.__reg.gauge(WRITE_CPUSET_FAILED_KEY, tags).set(fail_count)
         self.__reg.gauge(ISOLATED_WORKLOAD_COUNT, tags).set(len(self.get_isolated_workload_ids()))
-        self.__reg.gauge(CPUSET_THREAD_COUNT, tags).set(self.__get_thread_count())
+        self.__reg.gauge(CPUSET_THREAD_COUNT, tags).set(self.__writer.get_active_count())
+        self.__reg.gauge(CGROUP_WRITE_PERFORMED_KEY, tags).set(self.get_performed_write_count())
+        self.__reg.gauge(CGROUP_WRITE_SKIPPED_KEY, tags).set(self.get_skipped_write_count())
+        self.__writer.report_metrics(tags)
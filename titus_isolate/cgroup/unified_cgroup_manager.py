@@ -0,0 +1,62 @@
+from typing import List
+
+from titus_isolate import log
+from titus_isolate.cgroup.file_cgroup_manager import FileCgroupManager
+from titus_isolate.cgroup.utils import CPUSET, QUOTA, SHARES, parse_cpuset, set_unified_cpuset, get_unified_cpuset, \
+    set_cpu_max, get_cpu_max, set_cpu_weight, get_cpu_weight, quota_to_cpu_max, cpu_max_to_quota, shares_to_weight, \
+    weight_to_shares
+
+
+class UnifiedCgroupManager(FileCgroupManager):
+    """
+    Manages containers' cgroups through the cgroup v2 (unified hierarchy) filesystem.
+
+    All knobs live in a single directory per container, so only one cgroup path is resolved per container.  Quota and
+    period are written together to cpu.max, and shares are mapped onto cpu.weight.  The unified hierarchy has no
+    equivalent of the v1 cpuset memory_* flags, so those are not written.
+    """
+
+    def set_cpuset(self, container_name: str, thread_ids: List[int]):
+        self._write(CPUSET, set_unified_cpuset, container_name, self._get_thread_ids_str(thread_ids))
+
+    def get_cpuset(self, container_name: str) -> List[int]:
+        cpuset_str = self._read(get_unified_cpuset, container_name)
+        if cpuset_str is None or len(cpuset_str) == 0:
+            return []
+        else:
+            return parse_cpuset(cpuset_str)
+
+    def set_quota(self, container_name: str, quota: int):
+        self._write(QUOTA, set_cpu_max, container_name, quota_to_cpu_max(quota))
+
+    def get_quota(self, container_name: str) -> int:
+        return cpu_max_to_quota(self._read(get_cpu_max, container_name))
+
+    def set_shares(self, container_name: str, shares: int):
+        self._write(SHARES, set_cpu_weight, container_name, str(shares_to_weight(shares)))
+
+    def get_shares(self, container_name: str) -> int:
+        return weight_to_shares(int(self._read(get_cpu_weight, container_name)))
+
+    def set_memory_migrate(self, container_name, on: bool):
+        self.__skip_memory_flag("memory_migrate", container_name, on)
+
+    def get_memory_migrate(self, container_name) -> bool:
+        return False
+
+    def set_memory_spread_page(self, container_name, on: bool):
+        self.__skip_memory_flag("memory_spread_page", container_name, on)
+
+    def get_memory_spread_page(self, container_name) -> bool:
+        return False
+
+    def set_memory_spread_slab(self, container_name, on: bool):
+        self.__skip_memory_flag("memory_spread_slab", container_name, on)
+
+    def get_memory_spread_slab(self, container_name) -> bool:
+        return False
+
+    @staticmethod
+    def __skip_memory_flag(name: str, container_name: str, on: bool):
+        if on:
+            log.debug("Ignoring {} for container: {}, it is not supported by cgroup v2".format(name, container_name))
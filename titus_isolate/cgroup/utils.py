@@ -1,3 +1,5 @@
+import os
+from threading import Lock
 from typing import List
 
 from titus_isolate import log
@@ -7,6 +9,11 @@ TITUS_INITS_PATH = "/var/lib/titus-inits"
 TITUS_ENVIRONMENTS_PATH = "/var/lib/titus-environments"
 
 CPUSET = "cpuset"
+MEMORY_MIGRATE = "memory_migrate"
+MEMORY_SPREAD_PAGE = "memory_spread_page"
+MEMORY_SPREAD_SLAB = "memory_spread_slab"
+QUOTA = "quota"
+SHARES = "shares"
 
 CPU_CPUACCT = "cpu,cpuacct"
 CPUACCT_USAGE_FILE = "cpuacct.usage_all"
@@ -14,11 +21,31 @@ CPUACCT_USAGE_FILE = "cpuacct.usage_all"
 MEMORY = "memory"
 MEMORY_USAGE_FILE = "memory.usage_in_bytes"
 
+# cgroup v2 (unified hierarchy)
+UNIFIED = ""
+CGROUP_CONTROLLERS_FILE = "cgroup.controllers"
+CPU_MAX_FILE = "cpu.max"
+CPU_WEIGHT_FILE = "cpu.weight"
+CPUSET_CPUS_FILE = "cpuset.cpus"
+CPU_STAT_FILE = "cpu.stat"
+CPU_STAT_USAGE_USEC = "usage_usec"
+MEMORY_CURRENT_FILE = "memory.current"
+CPU_MAX_UNLIMITED = "max"
+CPU_MAX_PERIOD_US = 100000
+MIN_CPU_SHARES = 2
+MAX_CPU_SHARES = 262144
+MIN_CPU_WEIGHT = 1
+MAX_CPU_WEIGHT = 10000
+
 USAGE_FILE = {
     CPU_CPUACCT: CPUACCT_USAGE_FILE,
     MEMORY: MEMORY_USAGE_FILE
 }
 
+# container_name -> {cgroup_name -> cgroup_path}
+__cgroup_paths = {}
+__cgroup_paths_lock = Lock()
+
 
 def get_info_path(container_name):
     return "{}/{}/cgroup".format(TITUS_INITS_PATH, container_name)
@@ -55,121 +82,280 @@ def get_cgroup_path_from_file(file_path, cgroup_name):
         return _get_cgroup_path_from_list(data, cgroup_name)
 
 
+def get_cgroup_path(container_name, cgroup_name):
+    """
+    Returns the path of a container's cgroup within a hierarchy, as recorded in its titus-inits cgroup file.  Paths
+    are cached per container until invalidate_cgroup_paths() is called for it.
+    """
+    with __cgroup_paths_lock:
+        paths = __cgroup_paths.get(container_name, None)
+        if paths is not None and cgroup_name in paths:
+            return paths[cgroup_name]
+
+    cgroup_path = get_cgroup_path_from_file(get_info_path(container_name), cgroup_name)
+    if cgroup_path is None:
+        return None
+
+    with __cgroup_paths_lock:
+        __cgroup_paths.setdefault(container_name, {})[cgroup_name] = cgroup_path
+    return cgroup_path
+
+
+def invalidate_cgroup_paths(container_name):
+    with __cgroup_paths_lock:
+        __cgroup_paths.pop(container_name, None)
+
+
+def has_cached_cgroup_paths(container_name):
+    with __cgroup_paths_lock:
+        return container_name in __cgroup_paths
+
+
 def get_cpuset_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPUSET)
+    cgroup_path = get_cgroup_path(container_name, CPUSET)
     return "{}/cpuset{}/cpuset.cpus".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_memory_migrate_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPUSET)
+    cgroup_path = get_cgroup_path(container_name, CPUSET)
     return "{}/cpuset{}/cpuset.memory_migrate".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_memory_spread_page_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPUSET)
+    cgroup_path = get_cgroup_path(container_name, CPUSET)
     return "{}/cpuset{}/cpuset.memory_spread_page".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_memory_spread_slab_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPUSET)
+    cgroup_path = get_cgroup_path(container_name, CPUSET)
     return "{}/cpuset{}/cpuset.memory_spread_slab".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_quota_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPU_CPUACCT)
+    cgroup_path = get_cgroup_path(container_name, CPU_CPUACCT)
     return "{}/cpu,cpuacct{}/cpu.cfs_quota_us".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_shares_path(container_name):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, CPU_CPUACCT)
+    cgroup_path = get_cgroup_path(container_name, CPU_CPUACCT)
     return "{}/cpu,cpuacct{}/cpu.shares".format(ROOT_CGROUP_PATH, cgroup_path)
 
 
 def get_usage_path(container_name, resource_key):
-    file_path = get_info_path(container_name)
-    cgroup_path = get_cgroup_path_from_file(file_path, resource_key)
+    cgroup_path = get_cgroup_path(container_name, resource_key)
     usage_file = USAGE_FILE[resource_key]
     return "{}/{}{}/{}".format(ROOT_CGROUP_PATH, resource_key, cgroup_path, usage_file)
 
 
+def is_unified_hierarchy(root=None):
+    """
+    The unified hierarchy is mounted at the cgroup root when it exposes the list of available controllers there.
+    """
+    if root is None:
+        root = ROOT_CGROUP_PATH
+    return os.path.isfile(os.path.join(root, CGROUP_CONTROLLERS_FILE))
+
+
+def get_unified_path(container_name, file_name):
+    cgroup_path = get_cgroup_path(container_name, UNIFIED)
+    return "{}{}/{}".format(ROOT_CGROUP_PATH, cgroup_path, file_name)
+
+
+def get_cpu_stat_path(container_name):
+    return get_unified_path(container_name, CPU_STAT_FILE)
+
+
+def get_memory_current_path(container_name):
+    return get_unified_path(container_name, MEMORY_CURRENT_FILE)
+
+
+def get_unified_cpuset_path(container_name):
+    return get_unified_path(container_name, CPUSET_CPUS_FILE)
+
+
+def get_cpu_max_path(container_name):
+    return get_unified_path(container_name, CPU_MAX_FILE)
+
+
+def get_cpu_weight_path(container_name):
+    return get_unified_path(container_name, CPU_WEIGHT_FILE)
+
+
+def quota_to_cpu_max(quota: int) -> str:
+    if quota < 0:
+        return "{} {}".format(CPU_MAX_UNLIMITED, CPU_MAX_PERIOD_US)
+    return "{} {}".format(quota, CPU_MAX_PERIOD_US)
+
+
+def cpu_max_to_quota(cpu_max: str) -> int:
+    """
+    Converts a cpu.max value ("<quota> <period>") to a v1 quota expressed against CPU_MAX_PERIOD_US.
+    """
+    values = cpu_max.split()
+    if values[0] == CPU_MAX_UNLIMITED:
+        return -1
+
+    period = int(values[1]) if len(values) > 1 else CPU_MAX_PERIOD_US
+    return int(int(values[0]) * CPU_MAX_PERIOD_US / period)
+
+
+def shares_to_weight(shares: int) -> int:
+    # The same linear mapping of [2, 262144] onto [1, 10000] used by the container runtimes
+    shares = min(max(shares, MIN_CPU_SHARES), MAX_CPU_SHARES)
+    scale = (MAX_CPU_WEIGHT - MIN_CPU_WEIGHT) / (MAX_CPU_SHARES - MIN_CPU_SHARES)
+    return int(MIN_CPU_WEIGHT + (shares - MIN_CPU_SHARES) * scale)
+
+
+def weight_to_shares(weight: int) -> int:
+    weight = min(max(weight, MIN_CPU_WEIGHT), MAX_CPU_WEIGHT)
+    scale = (MAX_CPU_SHARES - MIN_CPU_SHARES) / (MAX_CPU_WEIGHT - MIN_CPU_WEIGHT)
+    return int(MIN_CPU_SHARES + (weight - MIN_CPU_WEIGHT) * scale)
+
+
+def set_unified_cpuset(container_name, threads_str):
+    __write(container_name, get_unified_cpuset_path, threads_str)
+
+
+def get_unified_cpuset(container_name):
+    return __read(container_name, get_unified_cpuset_path)
+
+
+def set_cpu_max(container_name, value):
+    __write(container_name, get_cpu_max_path, value)
+
+
+def get_cpu_max(container_name):
+    return __read(container_name, get_cpu_max_path)
+
+
+def set_cpu_weight(container_name, value):
+    __write(container_name, get_cpu_weight_path, value)
+
+
+def get_cpu_weight(container_name):
+    return __read(container_name, get_cpu_weight_path)
+
+
+def get_cpuacct_usage_ns(container_name) -> int:
+    """
+    Sums the user and system time, in nanoseconds, of all cpus listed in cpuacct.usage_all:
+
+        cpu user system
+        0 1000 2000
+        1 ...
+    """
+    lines = __read_lines(container_name, lambda c: get_usage_path(c, CPU_CPUACCT))
+    return sum(int(user) + int(system) for _, user, system in (line.split() for line in lines[1:] if line.strip()))
+
+
+def get_memory_usage_bytes(container_name) -> int:
+    return int(__read(container_name, lambda c: get_usage_path(c, MEMORY)))
+
+
+def get_unified_cpu_usage_ns(container_name) -> int:
+    for line in __read_lines(container_name, get_cpu_stat_path):
+        key, value = line.split()
+        if key == CPU_STAT_USAGE_USEC:
+            return int(value) * 1000
+    raise ValueError("No {} in {} of container: {}".format(CPU_STAT_USAGE_USEC, CPU_STAT_FILE, container_name))
+
+
+def get_unified_memory_usage_bytes(container_name) -> int:
+    return int(__read(container_name, get_memory_current_path))
+
+
 def set_cpuset(container_name, threads_str):
-    path = get_cpuset_path(container_name)
-    __write(path, threads_str)
+    __write(container_name, get_cpuset_path, threads_str)
 
 
 def get_cpuset(container_name):
-    path = get_cpuset_path(container_name)
-    return __read(path)
+    return __read(container_name, get_cpuset_path)
 
 
 def set_memory_migrate(container_name, on):
-    path = get_memory_migrate_path(container_name)
-    __write(path, on)
+    __write(container_name, get_memory_migrate_path, on)
 
 
 def get_memory_migrate(container_name):
-    path = get_memory_migrate_path(container_name)
-    return __read(path)
+    return __read(container_name, get_memory_migrate_path)
 
 
 def set_memory_spread_page(container_name, on):
-    path = get_memory_spread_page_path(container_name)
-    __write(path, on)
+    __write(container_name, get_memory_spread_page_path, on)
 
 
 def get_memory_spread_page(container_name):
-    path = get_memory_spread_page_path(container_name)
-    return __read(path)
+    return __read(container_name, get_memory_spread_page_path)
 
 
 def set_memory_spread_slab(container_name, on):
-    path = get_memory_spread_slab_path(container_name)
-    __write(path, on)
+    __write(container_name, get_memory_spread_slab_path, on)
 
 
 def get_memory_spread_slab(container_name):
-    path = get_memory_spread_slab_path(container_name)
-    return __read(path)
+    return __read(container_name, get_memory_spread_slab_path)
 
 
 def set_quota(container_name, value):
-    path = get_quota_path(container_name)
-    __write(path, value)
+    __write(container_name, get_quota_path, value)
 
 
 def get_quota(container_name):
-    path = get_quota_path(container_name)
-    return __read(path)
+    return __read(container_name, get_quota_path)
 
 
 def set_shares(container_name, value):
-    path = get_shares_path(container_name)
-    __write(path, value)
+    __write(container_name, get_shares_path, value)
 
 
 def get_shares(container_name):
-    path = get_shares_path(container_name)
-    return __read(path)
+    return __read(container_name, get_shares_path)
+
+
+def __write(container_name, get_path, value):
+    __with_path(container_name, get_path, lambda path: __write_path(path, value))
+
+
+def __read(container_name, get_path) -> str:
+    return __with_path(container_name, get_path, __read_path)
 
 
-def __write(path, value):
+def __read_lines(container_name, get_path) -> List[str]:
+    return __with_path(container_name, get_path, __read_lines_path)
+
+
+def __with_path(container_name, get_path, func):
+    cached = has_cached_cgroup_paths(container_name)
+    try:
+        return func(get_path(container_name))
+    except FileNotFoundError:
+        if not cached:
+            raise
+
+        # The cached path may be stale, e.g. the container's cgroup was recreated, so resolve it again once.
+        log.debug("Re-resolving cgroup paths for container: '{}'".format(container_name))
+        invalidate_cgroup_paths(container_name)
+        return func(get_path(container_name))
+
+
+def __write_path(path, value):
     log.debug("Writing '{}' to path '{}'".format(value, path))
     with open(path, 'w') as f:
         f.write(str(value))
 
 
-def __read(path) -> str:
+def __read_path(path) -> str:
     log.debug("Reading from path '{}'".format(path))
     with open(path, 'r') as f:
         return f.readline().strip()
 
 
+def __read_lines_path(path) -> List[str]:
+    log.debug("Reading lines from path '{}'".format(path))
+    with open(path, 'r') as f:
+        return f.readlines()
+
+
 def parse_cpuset(cpuset_str: str) -> List[int]:
     ranges = list(x.split("-") for x in cpuset_str.split(","))
     if len(ranges) == 0:
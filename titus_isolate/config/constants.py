@@ -5,10 +5,19 @@ LOG_FMT_STRING = '%(asctime)s,%(msecs)d %(levelname)s [%(filename)s:%(lineno)d]
 REBALANCE_FREQUENCY_KEY = 'TITUS_ISOLATE_REBALANCE_FREQUENCY'
 DEFAULT_REBALANCE_FREQUENCY = 60
 
+# Rebalances move only the workloads needed to improve isolation, moving at most this many threads
+REBALANCE_MINIMAL_MOVEMENT = 'TITUS_ISOLATE_REBALANCE_MINIMAL_MOVEMENT'
+DEFAULT_REBALANCE_MINIMAL_MOVEMENT = False
+REBALANCE_MAX_MOVED_THREADS = 'TITUS_ISOLATE_REBALANCE_MAX_MOVED_THREADS'
+DEFAULT_REBALANCE_MAX_MOVED_THREADS = 16
+
 # Reconcile
 RECONCILE_FREQUENCY_KEY = 'TITUS_ISOLATE_RECONCILE_FREQUENCY'
 DEFAULT_RECONCILE_FREQUENCY = 60
 
+RECONCILE_MAX_REPAIR_ATTEMPTS = 'TITUS_ISOLATE_RECONCILE_MAX_REPAIR_ATTEMPTS'
+DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS = 3
+
 # Healthcheck
 HEALTH_CHECK_FREQUENCY_KEY = 'TITUS_ISOLATE_HEALTHCHECK_FREQUENCY'
 DEFAULT_HEALTH_CHECK_FREQUENCY = 60
@@ -26,6 +35,14 @@ SERVICE_CPU_PREDICTOR = 'service'
 DEFAULT_CPU_PREDICTOR = SERVICE_CPU_PREDICTOR
 
 
+# Isolate
+TRACE_ISOLATE_ALLOCATIONS = 'TITUS_ISOLATE_TRACE_ISOLATE_ALLOCATIONS'
+DEFAULT_TRACE_ISOLATE_ALLOCATIONS = False
+
+# Cgroups
+CGROUP_WRITER_THREAD_COUNT = 'TITUS_ISOLATE_CGROUP_WRITER_THREAD_COUNT'
+DEFAULT_CGROUP_WRITER_THREAD_COUNT = 4
+
 # CPU Allocator
 CPU_ALLOCATOR = 'TITUS_ISOLATE_ALLOCATOR'
 FALLBACK_ALLOCATOR = 'TITUS_ISOLATE_FALLBACK_ALLOCATOR'
@@ -40,18 +57,38 @@ REMOTE_REBALANCE_ALLOCATOR = 'REMOTE_REBALANCE_ALLOCATOR'
 GRPC_REMOTE_ALLOC_ENDPOINT = 'TITUS_ISOLATE_GRPC_REMOTE_ALLOCATOR_ENDPOINT'
 GRPC_REMOTE_ALLOC_CLIENT_CALL_TIMEOUT_MS = 'TITUS_ISOLATE_GRPC_REMOTE_ALLOCATOR_CLIENT_CALL_TIMEOUT_MS'
 GRPC_REMOTE_ALLOC_DEFAULT_CLIENT_CALL_TIMEOUT_MS = 3000
+GRPC_REMOTE_ALLOC_MIN_CLIENT_CALL_TIMEOUT_MS = 'TITUS_ISOLATE_GRPC_REMOTE_ALLOCATOR_MIN_CLIENT_CALL_TIMEOUT_MS'
+GRPC_REMOTE_ALLOC_DEFAULT_MIN_CLIENT_CALL_TIMEOUT_MS = 500
+GRPC_REMOTE_ALLOC_DELTA_MODE = 'TITUS_ISOLATE_GRPC_REMOTE_ALLOCATOR_DELTA_MODE'
+DEFAULT_GRPC_REMOTE_ALLOC_DELTA_MODE = False
+# Keepalive pings must be permitted by the service's keepalive enforcement policy, so they are off unless configured
+GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS = 'TITUS_ISOLATE_GRPC_REMOTE_ALLOCATOR_KEEPALIVE_TIME_MS'
+DEFAULT_GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS = 0
 
 # Fallback
 FALLBACK_QUEUE_DEPTH = 'TITUS_ISOLATE_FALLBACK_QUEUE_DEPTH'
 DEFAULT_FALLBACK_QUEUE_DEPTH = 20
+FALLBACK_BREAKER_WINDOW_SIZE = 'TITUS_ISOLATE_FALLBACK_BREAKER_WINDOW_SIZE'
+DEFAULT_FALLBACK_BREAKER_WINDOW_SIZE = 20
+FALLBACK_BREAKER_MIN_CALLS = 'TITUS_ISOLATE_FALLBACK_BREAKER_MIN_CALLS'
+DEFAULT_FALLBACK_BREAKER_MIN_CALLS = 5
+FALLBACK_BREAKER_FAILURE_RATIO = 'TITUS_ISOLATE_FALLBACK_BREAKER_FAILURE_RATIO'
+DEFAULT_FALLBACK_BREAKER_FAILURE_RATIO = 0.5
+FALLBACK_BREAKER_SLOW_CALL_MS = 'TITUS_ISOLATE_FALLBACK_BREAKER_SLOW_CALL_MS'
+DEFAULT_FALLBACK_BREAKER_SLOW_CALL_MS = 2000
+FALLBACK_BREAKER_OPEN_DURATION_SEC = 'TITUS_ISOLATE_FALLBACK_BREAKER_OPEN_DURATION_SEC'
+DEFAULT_FALLBACK_BREAKER_OPEN_DURATION_SEC = 30
+FALLBACK_HEDGE_DELAY_MS = 'TITUS_ISOLATE_FALLBACK_HEDGE_DELAY_MS'
+DEFAULT_FALLBACK_HEDGE_DELAY_MS = 0
 
 GREEDY = 'GREEDY'
 NAIVE = 'NAIVE'
 NOOP = 'NOOP'
 GRPC_REMOTE = 'GRPC_REMOTE'
+TOPOLOGY = 'TOPOLOGY'
 DEFAULT_ALLOCATOR = GRPC_REMOTE
 DEFAULT_FALLBACK_ALLOCATOR = NAIVE
-CPU_ALLOCATORS = [GREEDY, NAIVE, NOOP, GRPC_REMOTE]
+CPU_ALLOCATORS = [GREEDY, NAIVE, NOOP, GRPC_REMOTE, TOPOLOGY]
 
 # Forecast CPU Allocator
 ALPHA_NU = 'TITUS_ISOLATE_ALPHA_NU'
@@ -110,8 +147,11 @@ DEFAULT_TITUS_ISOLATE_MEMORY_SPREAD_SLAB = False
 
 # Metrics querying
 PROMETHEUS = 'prometheus'
+CGROUP = 'cgroup'
 RESOURCE_USAGE_PROVIDER = 'TITUS_ISOLATE_RESOURCE_USAGE_PROVIDER'
 DEFAULT_RESOURCE_USAGE_PROVIDER = PROMETHEUS
+CGROUP_USAGE_SAMPLE_INTERVAL = 'TITUS_ISOLATE_CGROUP_USAGE_SAMPLE_INTERVAL_SEC'
+DEFAULT_CGROUP_USAGE_SAMPLE_INTERVAL = 60
 PROMETHEUS_HOST_OVERRIDE = 'TITUS_ISOLATE_PROMETHEUS_HOST_OVERRIDE'
 
 PROMETHEUS_SHARDING_ENABLED = 'TITUS_ISOLATE_PROMETHEUS_SHARDING_ENABLED'
@@ -175,8 +215,16 @@ RESTART_PROPERTIES = [
     ALPHA_PREV,
     BURST_CORE_COLLOC_USAGE_THRESH,
     BURST_MULTIPLIER,
+    CGROUP_USAGE_SAMPLE_INTERVAL,
+    CGROUP_WRITER_THREAD_COUNT,
     CPU_ALLOCATOR,
     FALLBACK_ALLOCATOR,
+    FALLBACK_BREAKER_FAILURE_RATIO,
+    FALLBACK_BREAKER_MIN_CALLS,
+    FALLBACK_BREAKER_OPEN_DURATION_SEC,
+    FALLBACK_BREAKER_SLOW_CALL_MS,
+    FALLBACK_BREAKER_WINDOW_SIZE,
+    FALLBACK_HEDGE_DELAY_MS,
     FALLBACK_QUEUE_DEPTH,
     FREE_THREAD_PROVIDER,
     MAX_BURST_POOL_INCREASE_RATIO,
@@ -187,13 +235,19 @@ RESTART_PROPERTIES = [
     PROMETHEUS_HOST_OVERRIDE,
     PROMETHEUS_SHARDING_ENABLED,
     REBALANCE_FREQUENCY_KEY,
+    REBALANCE_MAX_MOVED_THREADS,
+    REBALANCE_MINIMAL_MOVEMENT,
     RECONCILE_FREQUENCY_KEY,
+    RECONCILE_MAX_REPAIR_ATTEMPTS,
     REMOTE_ALLOCATOR_URL,
     RESOURCE_USAGE_PROVIDER,
     TOTAL_THRESHOLD,
     WEIGHT_CPU_USE_BURST,
     GRPC_REMOTE_ALLOC_ENDPOINT,
     GRPC_REMOTE_ALLOC_CLIENT_CALL_TIMEOUT_MS,
+    GRPC_REMOTE_ALLOC_MIN_CLIENT_CALL_TIMEOUT_MS,
+    GRPC_REMOTE_ALLOC_DELTA_MODE,
+    GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS,
     SYS_CORE_IDS,
     SYS_CORES_USAGE,
     SYS_CORES_HARD_ISOLATE]
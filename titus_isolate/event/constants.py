@@ -34,6 +34,11 @@ CONTAINER_EVENTS = [START, DIE]
 INTERNAL_EVENTS = [REBALANCE, RECONCILE, PREDICT_USAGE]
 HANDLED_ACTIONS = CONTAINER_EVENTS + INTERNAL_EVENTS
 
+# Docker only streams the events of containers starting and dying, titus-isolate has no use for the others
+TYPE_FILTER = "type"
+EVENT_FILTER = "event"
+DOCKER_EVENT_FILTERS = {TYPE_FILTER: CONTAINER, EVENT_FILTER: CONTAINER_EVENTS}
+
 REQUIRED_LABELS = [NAME]
 
 SERVICE = "SERVICE"
@@ -15,12 +15,13 @@ from titus_isolate.config.constants import REBALANCE_FREQUENCY_KEY, DEFAULT_REBA
     PREDICT_RESOURCE_USAGE_FREQUENCY_KEY, \
     DEFAULT_PREDICT_RESOURCE_USAGE_FREQUENCY
 from titus_isolate.event.constants import REBALANCE_EVENT, RECONCILE_EVENT, ACTION, \
-    HANDLED_ACTIONS, PREDICT_USAGE_EVENT, CONTAINER_EVENTS, INTERNAL_EVENTS, CONTAINER_BATCH, STARTS, DIES, \
+    HANDLED_ACTIONS, PREDICT_USAGE_EVENT, CONTAINER_EVENTS, CONTAINER_BATCH, STARTS, DIES, \
     START, DIE
 from titus_isolate.event.event_handler import EventHandler
-from titus_isolate.event.utils import get_task_id, get_container_name
+from titus_isolate.event.utils import get_task_id, get_container_name, coalesce_events, may_handle_raw_event
 from titus_isolate.metrics.constants import QUEUE_DEPTH_KEY, EVENT_SUCCEEDED_KEY, EVENT_FAILED_KEY, EVENT_PROCESSED_KEY, \
-    ENQUEUED_COUNT_KEY, DEQUEUED_COUNT_KEY, QUEUE_LATENCY_KEY
+    ENQUEUED_COUNT_KEY, DEQUEUED_COUNT_KEY, QUEUE_LATENCY_KEY, EVENT_COALESCED_KEY, EVENT_RECEIVED_KEY, \
+    EVENT_DROPPED_KEY, EVENT_DROP_RATIO_KEY, EVENT_DECODE_DURATION_KEY
 from titus_isolate.metrics.metrics_reporter import MetricsReporter
 from titus_isolate.utils import get_config_manager
 
@@ -41,6 +42,13 @@ class EventManager(MetricsReporter):
         self.__event_timeout = event_timeout
 
         self.__processed_count = 0
+        self.__coalesced_count = 0
+
+        # Events received from the event stream, and those of them which were not handled
+        self.__received_count = 0
+        self.__dropped_count = 0
+        self.__reported_received_count = 0
+        self.__reported_dropped_count = 0
 
         self.__started = False
         self.__started_lock = Lock()
@@ -93,6 +101,15 @@ class EventManager(MetricsReporter):
     def get_processed_count(self):
         return self.__processed_count
 
+    def get_coalesced_count(self):
+        return self.__coalesced_count
+
+    def get_received_count(self):
+        return self.__received_count
+
+    def get_dropped_count(self):
+        return self.__dropped_count
+
     def __rebalance(self):
         self.__put_event(REBALANCE_EVENT)
 
@@ -104,17 +121,37 @@ class EventManager(MetricsReporter):
 
     def __pull_events(self):
         for event in self.__events:
+            self.__received_count += 1
+            if self.__reg is not None:
+                self.__reg.counter(EVENT_RECEIVED_KEY, self.__tags).increment()
             self.__put_event(event)
 
-    def __put_event(self, event):
-        event = json.loads(event.decode("utf-8"))
-        if self.__should_handle(event):
-            log.info("Enqueuing event: {}, queue depth: {}".format(event[ACTION], self.get_queue_depth()))
-            event[ENQUEUE_TIME_KEY] = time.time()
-            self.__q.put(event)
-            if self.__reg is not None:
-                self.__reg.counter(ENQUEUED_COUNT_KEY, self.__tags).increment()
-                self.__reg.counter(self.__get_enqueued_metric_name(event), self.__tags).increment()
+    def __put_event(self, raw_event: bytes):
+        # Most events on a host are of no interest, so they are dropped before being decoded where possible
+        if not may_handle_raw_event(raw_event):
+            self.__drop_event()
+            return
+
+        start_time = time.time()
+        event = json.loads(raw_event.decode("utf-8"))
+        if self.__reg is not None:
+            self.__reg.distribution_summary(EVENT_DECODE_DURATION_KEY, self.__tags).record(time.time() - start_time)
+
+        if not self.__should_handle(event):
+            self.__drop_event()
+            return
+
+        log.info("Enqueuing event: {}, queue depth: {}".format(event[ACTION], self.get_queue_depth()))
+        event[ENQUEUE_TIME_KEY] = time.time()
+        self.__q.put(event)
+        if self.__reg is not None:
+            self.__reg.counter(ENQUEUED_COUNT_KEY, self.__tags).increment()
+            self.__reg.counter(self.__get_enqueued_metric_name(event), self.__tags).increment()
+
+    def __drop_event(self):
+        self.__dropped_count += 1
+        if self.__reg is not None:
+            self.__reg.counter(EVENT_DROPPED_KEY, self.__tags).increment()
 
     @staticmethod
     def __should_handle(event):
@@ -129,14 +166,6 @@ class EventManager(MetricsReporter):
 
         return True
 
-    @staticmethod
-    def __get_container_events(events: List) -> List:
-        return [event for event in events if event[ACTION] in CONTAINER_EVENTS]
-
-    @staticmethod
-    def __get_internal_events(events: List) -> List:
-        return [event for event in events if event[ACTION] in INTERNAL_EVENTS]
-
     def __dequeue_event(self):
         try:
             event = self.__q.get(timeout=self.__event_timeout)
@@ -191,8 +220,8 @@ class EventManager(MetricsReporter):
                 log.info("Got empty batch")
                 continue
 
-            internal_events = self.__get_internal_events(batch)
-            container_events = self.__get_container_events(batch)
+            container_events, internal_events, coalesced_count = coalesce_events(batch)
+            self.__report_coalesced_events(coalesced_count)
 
             events = []
             if len(container_events) > 0:
@@ -210,13 +239,22 @@ class EventManager(MetricsReporter):
                             type(event_handler).__name__, event))
                         self.__report_failed_event(event_handler)
 
-            for _ in itertools.repeat(None, len(internal_events) + len(container_events)):
+            for _ in itertools.repeat(None, len(batch)):
                 self.__reg.counter(EVENT_PROCESSED_KEY, self.__tags).increment()
                 self.__processed_count += 1
                 self.__q.task_done()
 
             self.__reg.gauge(QUEUE_DEPTH_KEY, self.__tags).set(self.get_queue_depth())
 
+    def __report_coalesced_events(self, coalesced_count: int):
+        if coalesced_count == 0:
+            return
+
+        log.info("Coalesced %d events", coalesced_count)
+        self.__coalesced_count += coalesced_count
+        if self.__reg is not None:
+            self.__reg.counter(EVENT_COALESCED_KEY, self.__tags).increment(coalesced_count)
+
     def __report_succeeded_event(self, event_handler: EventHandler):
         if self.__reg is not None:
             self.__reg.counter(self.__get_event_succeeded_metric_name(event_handler), self.__tags).increment()
@@ -249,4 +287,15 @@ class EventManager(MetricsReporter):
         self.__tags = tags
 
     def report_metrics(self, tags):
-        pass
+        # The drop ratio covers the events received since the last report
+        received_count = self.__received_count
+        dropped_count = self.__dropped_count
+        interval_received_count = received_count - self.__reported_received_count
+        interval_dropped_count = dropped_count - self.__reported_dropped_count
+        self.__reported_received_count = received_count
+        self.__reported_dropped_count = dropped_count
+
+        drop_ratio = 0
+        if interval_received_count > 0:
+            drop_ratio = interval_dropped_count / interval_received_count
+        self.__reg.gauge(EVENT_DROP_RATIO_KEY, tags).set(drop_ratio)
@@ -1,14 +1,35 @@
 import datetime
+import re
 import signal
-from typing import List
+from typing import List, Tuple
 
 from titus_isolate import log
-from titus_isolate.event.constants import ACTOR, ATTRIBUTES, NAME, TASK_ID
+from titus_isolate.event.constants import ACTOR, ATTRIBUTES, NAME, TASK_ID, ACTION, START, DIE, REBALANCE, \
+    CONTAINER_EVENTS, INTERNAL_EVENTS, HANDLED_ACTIONS
 from titus_isolate.model.utils import get_workload
 from titus_isolate.model.workload_interface import Workload
 
 epoch = datetime.datetime.utcfromtimestamp(0)
 
+RAW_ACTION = re.compile(b'"' + ACTION.encode("utf-8") + br'"\s*:\s*"([^"]*)"')
+RAW_HANDLED_ACTIONS = {a.encode("utf-8") for a in HANDLED_ACTIONS}
+
+
+def may_handle_raw_event(event: bytes) -> bool:
+    """
+    Checks the actions of an event before it is decoded, so events which are certainly not handled can be dropped
+    without paying for json decoding.  Events are only dropped if none of the action fields found are handled, e.g. a
+    label named like the action field cannot cause a handled event to be dropped.
+    """
+    actions = RAW_ACTION.findall(event)
+    if len(actions) == 0:
+        return True
+
+    for action in actions:
+        if action in RAW_HANDLED_ACTIONS:
+            return True
+    return False
+
 
 def get_container_name(event):
     return __get_attribute(event, NAME)
@@ -44,6 +65,48 @@ def get_current_workloads(docker_client) -> List[Workload]:
     return workloads
 
 
+def coalesce_events(events: List[dict]) -> Tuple[List[dict], List[dict], int]:
+    """
+    Coalesces a batch of events into the container and internal events which need handling.
+
+        - a container which both starts and dies within the batch needs no handling at all
+        - repeated starts of the same container, and repeated internal events, collapse into the first occurrence
+        - a rebalance is dropped if the batch's container events will cause an isolation anyway
+
+    :return: (container events, internal events, number of events coalesced away)
+    """
+    container_events = []
+    starts = {}
+    internal_events = {}
+    coalesced_count = 0
+
+    for event in events:
+        action = event[ACTION]
+        if action in CONTAINER_EVENTS:
+            container_name = get_container_name(event)
+            if action == START:
+                if container_name in starts:
+                    coalesced_count += 1
+                    continue
+                starts[container_name] = event
+            elif action == DIE and container_name in starts:
+                container_events.remove(starts.pop(container_name))
+                coalesced_count += 2
+                continue
+            container_events.append(event)
+        elif action in INTERNAL_EVENTS:
+            if action in internal_events:
+                coalesced_count += 1
+            else:
+                internal_events[action] = event
+
+    if len(container_events) > 0 and REBALANCE in internal_events:
+        internal_events.pop(REBALANCE)
+        coalesced_count += 1
+
+    return container_events, list(internal_events.values()), coalesced_count
+
+
 def unix_time_millis(dt: datetime):
     return (dt - epoch).total_seconds() * 1000.0
 
@@ -1,4 +1,4 @@
-from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
+from typing import Dict, List, Optional, Tuple
 
 
 def has_better_isolation(cur_cpu, new_cpu):
@@ -40,11 +40,14 @@ def has_better_isolation(cur_cpu, new_cpu):
 
     :return: True if the new_cpu has better placement, False otherwise
     """
-    cur_cross_package_violation_count = len(get_cross_package_violations(cur_cpu))
-    new_cross_package_violation_count = len(get_cross_package_violations(new_cpu))
+    cur_violations = cur_cpu.get_violation_index()
+    new_violations = new_cpu.get_violation_index()
 
-    cur_shared_core_violation_count = len(get_shared_core_violations(cur_cpu))
-    new_shared_core_violation_count = len(get_shared_core_violations(new_cpu))
+    cur_cross_package_violation_count = cur_violations.get_cross_package_violation_count()
+    new_cross_package_violation_count = new_violations.get_cross_package_violation_count()
+
+    cur_shared_core_violation_count = cur_violations.get_shared_core_violation_count()
+    new_shared_core_violation_count = new_violations.get_shared_core_violation_count()
 
     # More violations is bad, so a positive change is bad
     cross_package_violation_change = new_cross_package_violation_count - cur_cross_package_violation_count
@@ -61,3 +64,129 @@ def has_better_isolation(cur_cpu, new_cpu):
     # Middle row of matrix, can assume cross_package_violation_change == 0
     return shared_core_violation_change < 0
 
+
+def get_minimal_moves(cur_cpu, new_cpu, max_moved_thread_count: int) -> List[str]:
+    """
+    Finds the smallest set of workload moves from the current placement towards a proposed one which improves
+    isolation.  The proposed placement must not oversubscribe any thread.
+
+    A move places a workload on the threads the proposed placement gives it.  Workloads still holding any of those
+    threads are displaced, so they move to their own proposed threads in the same move, as do the workloads they
+    displace in turn.  A move costs the number of threads its workloads move onto.  Moves are chosen greedily, each
+    time the one leaving the fewest violations, until the proposed placement's violation counts are reached or no move
+    fits within the remaining budget.  As a move may temporarily add violations, only the shortest sequence of moves
+    reaching the best placement found is returned.
+
+    :return: the ids of the workloads to move, or an empty list if no improvement fits within the budget.  Only whole
+    moves are returned, so the list must be applied as a whole with apply_moves().
+    """
+    cur_slots = cur_cpu.get_occupancy().get_workload_ids_to_slots()
+    new_slots = new_cpu.get_occupancy().get_workload_ids_to_slots()
+
+    cpu = cur_cpu.snapshot()
+    occupancy = cpu.get_occupancy()
+    target_score = __get_score(new_cpu)
+    best_score = __get_score(cpu)
+    best_move_count = 0
+    positions = dict(cur_slots)
+    moves = []
+    budget = max_moved_thread_count
+
+    while best_score > target_score:
+        best_move = None
+        for w_id in sorted(new_slots.keys()):
+            if w_id not in positions or set(positions[w_id]) == set(new_slots[w_id]):
+                continue
+
+            group = __get_move_group(occupancy, w_id, new_slots)
+            if group is None:
+                continue
+
+            cost = sum(get_moved_thread_count(positions[m], new_slots[m]) for m in group)
+            if cost > budget:
+                continue
+
+            __move_group(occupancy, group, positions, new_slots)
+            score = (__get_score(cpu), cost)
+            __move_group(occupancy, group, new_slots, positions)
+            if best_move is None or score < best_move[0]:
+                best_move = (score, group)
+
+        if best_move is None:
+            break
+
+        (score, cost), group = best_move
+        __move_group(occupancy, group, positions, new_slots)
+        for m in group:
+            positions[m] = new_slots[m]
+        budget -= cost
+        moves += group
+        if score < best_score:
+            best_score = score
+            best_move_count = len(moves)
+
+    return moves[:best_move_count]
+
+
+def apply_moves(cur_cpu, new_cpu, workload_ids: List[str]):
+    """
+    :return: a snapshot of the current cpu on which the workloads have been moved to their threads on the new cpu
+    """
+    cpu = cur_cpu.snapshot()
+    occupancy = cpu.get_occupancy()
+    cur_occupancy = cur_cpu.get_occupancy()
+    new_occupancy = new_cpu.get_occupancy()
+
+    positions = {w_id: cur_occupancy.get_slots_with_workload(w_id) for w_id in workload_ids}
+    new_slots = {w_id: new_occupancy.get_slots_with_workload(w_id) for w_id in workload_ids}
+    __move_group(occupancy, workload_ids, positions, new_slots)
+
+    for w_id in workload_ids:
+        for slot in new_slots[w_id]:
+            if len(occupancy.get_workload_ids(slot)) > 1:
+                raise ValueError("Moving workloads: {} oversubscribes slot: {}, held by: {}".format(
+                    workload_ids, slot, occupancy.get_workload_ids(slot)))
+    return cpu
+
+
+def get_moved_thread_count(cur_thread_ids, new_thread_ids) -> int:
+    """
+    :return: the number of threads a workload moves onto
+    """
+    return len(set(new_thread_ids) - set(cur_thread_ids))
+
+
+def __get_score(cpu) -> Tuple[int, int]:
+    # Compared in the same order as has_better_isolation(): cross package violations first
+    violations = cpu.get_violation_index()
+    return violations.get_cross_package_violation_count(), violations.get_shared_core_violation_count()
+
+
+def __get_move_group(occupancy, workload_id: str, new_slots: Dict[str, List[int]]) -> Optional[List[str]]:
+    # The workload, and transitively every workload holding one of the threads the moving workloads are proposed
+    group = [workload_id]
+    seen = {workload_id}
+    i = 0
+    while i < len(group):
+        w_id = group[i]
+        i += 1
+        if w_id not in new_slots:
+            # A displaced workload has no proposed threads to move to
+            return None
+
+        for slot in new_slots[w_id]:
+            for other_id in occupancy.get_workload_ids(slot):
+                if other_id not in seen:
+                    seen.add(other_id)
+                    group.append(other_id)
+    return group
+
+
+def __move_group(occupancy, workload_ids: List[str], from_slots: Dict[str, List[int]], to_slots: Dict[str, List[int]]):
+    # Every workload leaves its threads before any claims its new ones, so no thread is held by two of them at once
+    for w_id in workload_ids:
+        for slot in from_slots[w_id]:
+            occupancy.free(slot, w_id)
+    for w_id in workload_ids:
+        for slot in to_slots[w_id]:
+            occupancy.claim(slot, w_id)
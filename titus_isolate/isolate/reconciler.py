@@ -1,20 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
 from titus_isolate import log
 from titus_isolate.cgroup.cgroup_manager import CgroupManager
+from titus_isolate.config.constants import RECONCILE_MAX_REPAIR_ATTEMPTS, DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS
 from titus_isolate.constants import RECONCILIATION_FAILURE_EXIT
 from titus_isolate.exit_handler import ExitHandler
-from titus_isolate.metrics.constants import RECONCILE_SKIP_COUNT, RECONCILE_SUCCESS_COUNT
+from titus_isolate.metrics.constants import RECONCILE_SKIP_COUNT, RECONCILE_SUCCESS_COUNT, RECONCILE_DRIFT_COUNT, \
+    RECONCILE_REPAIR_FAILURE_COUNT, RECONCILE_REPAIR_LATENCY
 from titus_isolate.metrics.metrics_reporter import MetricsReporter
 from titus_isolate.model.processor.cpu import Cpu
+from titus_isolate.utils import get_config_manager
+
+DEFAULT_READ_THREAD_COUNT = 8
+DEFAULT_REPAIR_TIMEOUT_SEC = 5
+REPAIR_POLL_INTERVAL_SEC = 0.01
 
 
 class Reconciler(MetricsReporter):
+    """
+    Compares the cpusets applied to containers with the current CPU placement.
+
+    All cpusets are read in a single parallel pass.  Workloads whose cpuset has drifted are re-applied through the
+    cgroup manager and verified, and the process only exits once a workload has failed repair on several consecutive
+    reconciliations.
+    """
 
-    def __init__(self, cgroup_manager: CgroupManager, exit_handler: ExitHandler):
+    def __init__(
+            self,
+            cgroup_manager: CgroupManager,
+            exit_handler: ExitHandler,
+            read_thread_count: int = DEFAULT_READ_THREAD_COUNT,
+            repair_timeout: float = DEFAULT_REPAIR_TIMEOUT_SEC):
         self.__cgroup_manager = cgroup_manager
         self.__exit_handler = exit_handler
+        self.__executor = ThreadPoolExecutor(max_workers=read_thread_count)
+        self.__repair_timeout = repair_timeout
         self.__reg = None
+        self.__tags = None
         self.__skip_count = 0
         self.__success_count = 0
+        self.__drift_count = 0
+        self.__repair_failure_count = 0
+
+        # workload_id -> number of consecutive reconciliations on which its repair has failed
+        self.__failed_repairs = {}
 
     def reconcile(self, cpu: Cpu):
         if self.__cgroup_manager.has_pending_work():
@@ -23,19 +54,64 @@ class Reconciler(MetricsReporter):
             return
 
         workloads = self.get_workloads(cpu)
-        for w_id, t_ids in workloads.items():
-            cpuset = sorted(self.__cgroup_manager.get_cpuset(w_id))
-            t_ids = sorted(t_ids)
+        drifted = self.__get_drifted_workloads(workloads)
+        self.__drift_count += len(drifted)
+
+        failed = {}
+        if len(drifted) > 0:
+            failed = self.__repair(drifted)
+
+        self.__failed_repairs = {w_id: self.__failed_repairs.get(w_id, 0) + 1 for w_id in failed}
+        self.__repair_failure_count += len(failed)
+
+        max_attempts = get_config_manager().get_cached_int(
+            RECONCILE_MAX_REPAIR_ATTEMPTS, DEFAULT_RECONCILE_MAX_REPAIR_ATTEMPTS)
+        exhausted = [w_id for w_id, count in self.__failed_repairs.items() if count >= max_attempts]
+        if len(exhausted) > 0:
+            log.error("Reconciliation has failed to repair workloads: {} after {} attempts".format(
+                exhausted, max_attempts))
+            self.__exit_handler.exit(RECONCILIATION_FAILURE_EXIT)
+
+        self.__success_count += 1
+
+    def __get_drifted_workloads(self, workloads: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        w_ids = list(workloads.keys())
+        cpusets = self.__executor.map(self.__cgroup_manager.get_cpuset, w_ids)
+
+        drifted = {}
+        for w_id, cpuset in zip(w_ids, cpusets):
+            cpuset = sorted(cpuset)
+            t_ids = sorted(workloads[w_id])
 
             if cpuset != t_ids:
-                log.error("Reconciliation has failed for workload: '{}', cpuset: {} != t_ids: {}".format(
+                log.warning("Reconciliation found drift for workload: '{}', cpuset: {} != t_ids: {}".format(
                     w_id, cpuset, t_ids))
-                self.__exit_handler.exit(RECONCILIATION_FAILURE_EXIT)
+                drifted[w_id] = t_ids
             else:
-                log.info("Reconciliation has succeeded for workload: '{}', cpuset: {} == t_ids: {}".format(
+                log.debug("Reconciliation has succeeded for workload: '{}', cpuset: {} == t_ids: {}".format(
                     w_id, cpuset, t_ids))
 
-        self.__success_count += 1
+        log.info("Reconciled %d workloads, %d have drifted", len(workloads), len(drifted))
+        return drifted
+
+    def __repair(self, drifted: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        start_time = time.time()
+        for w_id, t_ids in drifted.items():
+            log.info("Repairing cpuset of workload: '{}' to: {}".format(w_id, t_ids))
+            self.__cgroup_manager.repair_cpuset(w_id, t_ids)
+
+        deadline = start_time + self.__repair_timeout
+        while self.__cgroup_manager.has_pending_work() and time.time() < deadline:
+            time.sleep(REPAIR_POLL_INTERVAL_SEC)
+
+        failed = self.__get_drifted_workloads(drifted)
+        stop_time = time.time()
+        if self.__reg is not None:
+            self.__reg.distribution_summary(RECONCILE_REPAIR_LATENCY, self.__tags).record(stop_time - start_time)
+
+        if len(failed) > 0:
+            log.error("Failed to repair workloads: {}".format(list(failed.keys())))
+        return failed
 
     def get_skip_count(self):
         return self.__skip_count
@@ -43,12 +119,21 @@ class Reconciler(MetricsReporter):
     def get_success_count(self):
         return self.__success_count
 
+    def get_drift_count(self):
+        return self.__drift_count
+
+    def get_repair_failure_count(self):
+        return self.__repair_failure_count
+
     def set_registry(self, registry, tags):
         self.__reg = registry
+        self.__tags = tags
 
     def report_metrics(self, tags):
         self.__reg.gauge(RECONCILE_SKIP_COUNT, tags).set(self.get_skip_count())
         self.__reg.gauge(RECONCILE_SUCCESS_COUNT, tags).set(self.get_success_count())
+        self.__reg.gauge(RECONCILE_DRIFT_COUNT, tags).set(self.get_drift_count())
+        self.__reg.gauge(RECONCILE_REPAIR_FAILURE_COUNT, tags).set(self.get_repair_failure_count())
 
     @staticmethod
     def get_workloads(cpu: Cpu):
@@ -4,9 +4,16 @@ from titus_isolate.allocate.greedy_cpu_allocator import GreedyCpuAllocator
 from titus_isolate.allocate.naive_cpu_allocator import NaiveCpuAllocator
 from titus_isolate.allocate.noop_allocator import NoopCpuAllocator
 from titus_isolate.allocate.remote.allocator import GrpcRemoteIsolationAllocator
+from titus_isolate.allocate.topology_cpu_allocator import TopologyCpuAllocator
+from titus_isolate.cgroup.cgroup_manager import CgroupManager
+from titus_isolate.cgroup.file_cgroup_manager import FileCgroupManager
+from titus_isolate.cgroup.unified_cgroup_manager import UnifiedCgroupManager
+from titus_isolate.cgroup.utils import is_unified_hierarchy
 from titus_isolate.config.constants import CPU_ALLOCATOR, CPU_ALLOCATORS, DEFAULT_ALLOCATOR,  GREEDY, NOOP, \
     GRPC_REMOTE, FALLBACK_ALLOCATOR, DEFAULT_FALLBACK_ALLOCATOR, NAIVE, RESOURCE_USAGE_PROVIDER, \
-    DEFAULT_RESOURCE_USAGE_PROVIDER, PROMETHEUS
+    DEFAULT_RESOURCE_USAGE_PROVIDER, PROMETHEUS, CGROUP, CGROUP_USAGE_SAMPLE_INTERVAL, DEFAULT_CGROUP_USAGE_SAMPLE_INTERVAL, \
+    TOPOLOGY
+from titus_isolate.monitor.cgroup_resource_usage_provider import CgroupResourceUsageProvider
 from titus_isolate.monitor.noop_resource_usage_provider import NoopResourceUsageProvider
 from titus_isolate.monitor.prom_resource_usage_provider import PrometheusResourceUsageProvider
 
@@ -14,7 +21,8 @@ CPU_ALLOCATOR_NAME_TO_CLASS_MAP = {
     GREEDY: GreedyCpuAllocator,
     NAIVE: NaiveCpuAllocator,
     NOOP: NoopCpuAllocator,
-    GRPC_REMOTE: GrpcRemoteIsolationAllocator
+    GRPC_REMOTE: GrpcRemoteIsolationAllocator,
+    TOPOLOGY: TopologyCpuAllocator
 }
 
 
@@ -36,6 +44,15 @@ def get_allocator(allocator_str):
     return CPU_ALLOCATOR_NAME_TO_CLASS_MAP[allocator_str]()
 
 
+def get_cgroup_manager() -> CgroupManager:
+    if is_unified_hierarchy():
+        log.info("CgroupManager: unified hierarchy (cgroup v2)")
+        return UnifiedCgroupManager()
+
+    log.info("CgroupManager: cgroup v1")
+    return FileCgroupManager()
+
+
 def get_resource_usage_provider(config_manager):
     rup_str = config_manager.get_cached_str(RESOURCE_USAGE_PROVIDER, DEFAULT_RESOURCE_USAGE_PROVIDER)
 
@@ -44,5 +61,10 @@ def get_resource_usage_provider(config_manager):
     if rup_str == PROMETHEUS:
         return PrometheusResourceUsageProvider()
 
+    if rup_str == CGROUP:
+        sample_interval = config_manager.get_cached_int(
+            CGROUP_USAGE_SAMPLE_INTERVAL, DEFAULT_CGROUP_USAGE_SAMPLE_INTERVAL)
+        return CgroupResourceUsageProvider(sample_interval=sample_interval)
+
     if rup_str == NOOP:
         return NoopResourceUsageProvider()
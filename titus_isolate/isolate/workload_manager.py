@@ -1,7 +1,7 @@
-import copy
 from threading import Lock
 import time
-from typing import List, Dict
+import tracemalloc
+from typing import List, Dict, Optional
 
 from titus_isolate import log
 
@@ -10,10 +10,13 @@ from titus_isolate.allocate.allocate_response import AllocateResponse
 from titus_isolate.allocate.constants import *
 from titus_isolate.allocate.cpu_allocator import CpuAllocator
 from titus_isolate.allocate.noop_allocator import NoopCpuAllocator
-from titus_isolate.allocate.workload_allocate_response import WorkloadAllocateResponse
+from titus_isolate.allocate.workload_allocate_response import WorkloadAllocateResponse, get_workload_response
 from titus_isolate.cgroup.cgroup_manager import CgroupManager
-from titus_isolate.config.constants import EC2_INSTANCE_ID
-from titus_isolate.isolate.detect import get_cross_package_violations, get_shared_core_violations
+from titus_isolate.config.constants import EC2_INSTANCE_ID, TRACE_ISOLATE_ALLOCATIONS, \
+    DEFAULT_TRACE_ISOLATE_ALLOCATIONS, REBALANCE_MINIMAL_MOVEMENT, DEFAULT_REBALANCE_MINIMAL_MOVEMENT, \
+    REBALANCE_MAX_MOVED_THREADS, DEFAULT_REBALANCE_MAX_MOVED_THREADS
+from titus_isolate.isolate.balance import has_better_isolation, get_minimal_moves, apply_moves, \
+    get_moved_thread_count
 from titus_isolate.isolate.metrics_utils import *
 from titus_isolate.metrics.constants import *
 from titus_isolate.metrics.event_log import report_cpu_event
@@ -21,7 +24,7 @@ from titus_isolate.metrics.metrics_reporter import MetricsReporter
 from titus_isolate.model.processor.cpu import Cpu
 from titus_isolate.model.processor.utils import visualize_cpu_comparison
 from titus_isolate.model.workload_interface import Workload
-from titus_isolate.utils import get_config_manager
+from titus_isolate.utils import get_config_manager, get_workload_monitor_manager
 
 
 class WorkloadManager(MetricsReporter):
@@ -31,7 +34,12 @@ class WorkloadManager(MetricsReporter):
         self.__reg = None
         self.__tags = None
         self.__lock = Lock()
-        self.__instance_id = get_config_manager().get_str(EC2_INSTANCE_ID)
+        config_manager = get_config_manager()
+        self.__instance_id = config_manager.get_str(EC2_INSTANCE_ID)
+        self.__minimal_movement_rebalance = config_manager.get_cached_bool(
+            REBALANCE_MINIMAL_MOVEMENT, DEFAULT_REBALANCE_MINIMAL_MOVEMENT)
+        self.__rebalance_max_moved_threads = config_manager.get_cached_int(
+            REBALANCE_MAX_MOVED_THREADS, DEFAULT_REBALANCE_MAX_MOVED_THREADS)
 
         self.__cpu_allocator = cpu_allocator
 
@@ -41,6 +49,8 @@ class WorkloadManager(MetricsReporter):
         self.__rebalanced_count = 0
         self.__workload_processing_duration_sec = 0
         self.__update_state_duration_sec = 0
+        self.__isolate_allocated_bytes = None
+        self.__rebalance_moved_thread_count = None
 
         self.__cpu = cpu
         self.__cgroup_manager = cgroup_manager
@@ -54,7 +64,14 @@ class WorkloadManager(MetricsReporter):
             with self.__lock:
                 log.debug("Acquired isolate lock")
                 start_time = time.time()
-                self.__isolate(adds, removes)
+                tracing = get_config_manager().get_cached_bool(
+                    TRACE_ISOLATE_ALLOCATIONS, DEFAULT_TRACE_ISOLATE_ALLOCATIONS)
+                trace_baseline = self.__start_allocation_trace() if tracing else None
+                try:
+                    self.__isolate(adds, removes)
+                finally:
+                    if tracing:
+                        self.__stop_allocation_trace(trace_baseline)
 
                 self.__added_count += len(adds)
                 self.__removed_count += len(removes)
@@ -70,6 +87,10 @@ class WorkloadManager(MetricsReporter):
                     self.__reg.distribution_summary(
                         WORKLOAD_PROCESSING_DURATION,
                         self.__tags).record(stop_time - start_time)
+                    if tracing:
+                        self.__reg.distribution_summary(
+                            ISOLATE_ALLOCATED_BYTES,
+                            self.__tags).record(self.__isolate_allocated_bytes)
 
             log.debug("Released isolate lock")
             return True
@@ -78,16 +99,46 @@ class WorkloadManager(MetricsReporter):
             log.exception("Failed to isolate")
             return False
 
+    @staticmethod
+    def __start_allocation_trace() -> Optional[int]:
+        """
+        Traces from a fresh start unless tracing is already running, e.g. under a profiler, whose traces are left alone.
+
+        :return: None if tracing was started here, otherwise the memory traced so far, to be subtracted from the peak
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            return None
+
+        current, _ = tracemalloc.get_traced_memory()
+        return current
+
+    def __stop_allocation_trace(self, baseline: Optional[int]):
+        # Tracing is process wide, so the peak also includes memory allocated by other threads in the meantime.  When
+        # tracing was already running, the peak may also have been reached before this call.
+        _, peak = tracemalloc.get_traced_memory()
+        if baseline is None:
+            tracemalloc.stop()
+            baseline = 0
+
+        self.__isolate_allocated_bytes = peak - baseline
+        log.debug("isolate allocated %d bytes", self.__isolate_allocated_bytes)
+
     def __isolate(self, adds: List[Workload], removes: List[str]):
         log.info("adding %d workloads, removing %d workloads", len(adds), len(removes))
 
-        cpu = self.get_cpu_copy()
+        # The request takes a copy-on-write snapshot of the cpu, so it is passed in without copying here.
+        cpu = self.__cpu
         workload_map = self.get_workload_map_copy()
 
         for task_id in removes:
             self.__cgroup_manager.release_container(task_id)
             workload_map.pop(task_id, None)
 
+        wmm = get_workload_monitor_manager()
+        if wmm is not None and len(removes) > 0:
+            wmm.remove_workloads(removes)
+
         for w in adds:
             workload_map[w.get_task_id()] = w
 
@@ -97,9 +148,69 @@ class WorkloadManager(MetricsReporter):
             self.__get_request_metadata(self.__get_request_type(len(adds), len(removes))))
         response = self.__cpu_allocator.isolate(request)
 
+        if len(adds) == 0 and len(removes) == 0:
+            if self.__minimal_movement_rebalance:
+                response = self.__get_minimal_movement_response(response, workload_map)
+            self.__report_rebalance_movement(response)
+
         self.__update_state(response, workload_map)
         report_cpu_event(request, response)
 
+    def __get_minimal_movement_response(self, response: AllocateResponse, workloads: Dict[str, Workload]) \
+            -> AllocateResponse:
+        """
+        Treats the allocator's response as a candidate placement, and only moves the workloads needed to improve upon
+        the current placement within the movement budget.
+        """
+        last_response = self.__last_response
+        cur_cpu = self.__cpu
+        new_cpu = response.get_cpu()
+        if last_response is None or cur_cpu.get_topology() != new_cpu.get_topology():
+            return response
+
+        # Moves displace the workloads on their new threads, which assumes every new thread has a single owner
+        if get_oversubscribed_thread_count(new_cpu) > 0:
+            log.info("Applying the rebalanced placement as is, it oversubscribes threads")
+            return response
+
+        moved_workload_ids = []
+        if has_better_isolation(cur_cpu, new_cpu):
+            moved_workload_ids = get_minimal_moves(cur_cpu, new_cpu, self.__rebalance_max_moved_threads)
+
+        if len(moved_workload_ids) == 0:
+            log.info("Keeping the current placement, the rebalanced placement does not improve isolation within a "
+                     "budget of %d moved threads", self.__rebalance_max_moved_threads)
+            return last_response
+
+        log.info("Moving workloads: %s to improve isolation", moved_workload_ids)
+        moved_cpu = apply_moves(cur_cpu, new_cpu, moved_workload_ids)
+
+        w_allocs = self.__get_workload_allocation_dict(response)
+        last_w_allocs = self.__get_workload_allocation_dict(last_response)
+        moved_workload_ids = set(moved_workload_ids)
+        allocations = []
+        for w_id, workload in workloads.items():
+            w_alloc = w_allocs.get(w_id, None) if w_id in moved_workload_ids else last_w_allocs.get(w_id, None)
+            if w_alloc is None:
+                w_alloc = get_workload_response(workload, moved_cpu)
+            if w_alloc is not None:
+                allocations.append(w_alloc)
+
+        return AllocateResponse(moved_cpu, allocations, self.__cpu_allocator.get_name(), dict(response.get_metadata()))
+
+    def __report_rebalance_movement(self, response: AllocateResponse):
+        last_w_allocs = self.__get_workload_allocation_dict(self.__last_response)
+        moved_thread_count = 0
+        for w_alloc in response.get_workload_allocations():
+            last_w_alloc = last_w_allocs.get(w_alloc.get_workload_id(), None)
+            if last_w_alloc is not None:
+                moved_thread_count += get_moved_thread_count(last_w_alloc.get_thread_ids(), w_alloc.get_thread_ids())
+
+        log.info("rebalance moved %d threads", moved_thread_count)
+        self.__rebalance_moved_thread_count = moved_thread_count
+        if self.__reg is not None:
+            self.__reg.distribution_summary(REBALANCE_MOVED_THREAD_COUNT, self.__tags).record(moved_thread_count)
+
     @staticmethod
     def __get_request_type(add_count, remove_count):
         request_type = "isolate"
@@ -114,7 +225,7 @@ class WorkloadManager(MetricsReporter):
 
     def __update_state(self, response: AllocateResponse, new_workloads: Dict[str, Workload]):
         start_time = time.time()
-        old_cpu = self.get_cpu_copy()
+        old_cpu = self.__cpu
         new_cpu = response.get_cpu()
 
         self.__apply_isolation(response)
@@ -134,7 +245,9 @@ class WorkloadManager(MetricsReporter):
 
         for w_alloc in response.get_workload_allocations():
             last_w_alloc = last_w_responses.get(w_alloc.get_workload_id(), None)
-            if w_alloc == last_w_alloc:
+            # Allocators which patch their last response, e.g. the remote allocator's delta mode, hand back the same
+            # allocations for unchanged workloads
+            if w_alloc is last_w_alloc or w_alloc == last_w_alloc:
                 log.info("Skipping update of workload: {}".format(w_alloc.get_workload_id()))
                 continue
 
@@ -188,7 +301,8 @@ class WorkloadManager(MetricsReporter):
         return list(self.__workloads.values())
 
     def get_workload_map_copy(self) -> Dict[str, Workload]:
-        return copy.deepcopy(self.__workloads)
+        # Workloads are immutable, so only the map itself needs copying.
+        return dict(self.__workloads)
 
     def get_isolated_workload_ids(self):
         return self.__cgroup_manager.get_isolated_workload_ids()
@@ -203,7 +317,7 @@ class WorkloadManager(MetricsReporter):
         return self.__cpu
 
     def get_cpu_copy(self):
-        return copy.deepcopy(self.__cpu)
+        return self.__cpu.snapshot()
 
     def get_added_count(self):
         return self.__added_count
@@ -222,6 +336,19 @@ class WorkloadManager(MetricsReporter):
     def get_error_count(self):
         return self.__error_count
 
+    def get_isolate_allocated_bytes(self):
+        """
+        The peak memory allocated while the last traced isolate call ran, or None unless allocation tracing is
+        enabled.  This includes memory allocated by other threads during the call.
+        """
+        return self.__isolate_allocated_bytes
+
+    def get_rebalance_moved_thread_count(self):
+        """
+        The number of threads workloads were moved onto by the last rebalance, or None if there has been none.
+        """
+        return self.__rebalance_moved_thread_count
+
     def get_allocator_name(self):
         return self.__cpu_allocator.get_name()
 
@@ -274,8 +401,9 @@ class WorkloadManager(MetricsReporter):
         self.__rebalanced_count = 0
         self.__error_count = 0
 
-        cross_package_violation_count = len(get_cross_package_violations(cpu))
-        shared_core_violation_count = len(get_shared_core_violations(cpu))
+        violations = cpu.get_violation_index()
+        cross_package_violation_count = violations.get_cross_package_violation_count()
+        shared_core_violation_count = violations.get_shared_core_violation_count()
         self.__reg.gauge(PACKAGE_VIOLATIONS_KEY, tags).set(cross_package_violation_count)
         self.__reg.gauge(CORE_VIOLATIONS_KEY, tags).set(shared_core_violation_count)
 
@@ -5,10 +5,23 @@ SUCCEEDED_KEY = 'titus-isolate.succeededCount'
 FAILED_KEY = 'titus-isolate.failedCount'
 WORKLOAD_PROCESSING_DURATION = 'titus-isolate.workloadProcessingDurationSec'
 UPDATE_STATE_DURATION = 'titus-isolate.updateStateDurationSec'
+RESOURCE_USAGE_FETCH_DURATION = 'titus-isolate.resourceUsageFetchDurationSec'
+RESOURCE_USAGE_FETCH_FAILURE_COUNT = 'titus-isolate.resourceUsageFetchFailureCount'
+RESOURCE_USAGE_CACHED_SERIES_COUNT = 'titus-isolate.resourceUsageCachedSeriesCount'
+PROMETHEUS_QUERY_LATENCY = 'titus-isolate.prometheusQueryLatencySec'
+PROMETHEUS_QUERY_FAILURE_COUNT = 'titus-isolate.prometheusQueryFailureCount'
+CGROUP_USAGE_SAMPLE_FAILURE_COUNT = 'titus-isolate.cgroupUsageSampleFailureCount'
+ISOLATE_ALLOCATED_BYTES = 'titus-isolate.isolateAllocatedBytes'
+REBALANCE_MOVED_THREAD_COUNT = 'titus-isolate.rebalanceMovedThreadCount'
 WORKLOAD_COUNT_KEY = 'titus-isolate.workloadCount'
 EVENT_SUCCEEDED_KEY = 'titus-isolate.eventSucceeded'
 EVENT_FAILED_KEY = 'titus-isolate.eventFailed'
 EVENT_PROCESSED_KEY = 'titus-isolate.eventProcessed'
+EVENT_COALESCED_KEY = 'titus-isolate.eventCoalesced'
+EVENT_RECEIVED_KEY = 'titus-isolate.eventReceived'
+EVENT_DROPPED_KEY = 'titus-isolate.eventDropped'
+EVENT_DROP_RATIO_KEY = 'titus-isolate.eventDropRatio'
+EVENT_DECODE_DURATION_KEY = 'titus-isolate.eventDecodeDurationSec'
 
 ENQUEUED_COUNT_KEY = 'titus-isolate.enqueuedCount'
 DEQUEUED_COUNT_KEY = 'titus-isolate.dequeuedCount'
@@ -21,6 +34,11 @@ WRITE_CPUSET_SUCCEEDED_KEY = 'titus-isolate.writeCpusetSucceeded'
 WRITE_CPUSET_FAILED_KEY = 'titus-isolate.writeCpusetFailed'
 ISOLATED_WORKLOAD_COUNT = 'titus-isolate.isolatedWorkloadCount'
 CPUSET_THREAD_COUNT = 'titus-isolate.cpusetThreadCount'
+CGROUP_WRITE_QUEUE_DEPTH_KEY = 'titus-isolate.cgroupWriteQueueDepth'
+CGROUP_WRITE_LATENCY_KEY = 'titus-isolate.cgroupWriteLatency'
+CGROUP_WRITE_COALESCED_KEY = 'titus-isolate.cgroupWriteCoalescedCount'
+CGROUP_WRITE_PERFORMED_KEY = 'titus-isolate.cgroupWritePerformedCount'
+CGROUP_WRITE_SKIPPED_KEY = 'titus-isolate.cgroupWriteSkippedCount'
 
 PACKAGE_VIOLATIONS_KEY = 'titus-isolate.crossPackageViolations'
 CORE_VIOLATIONS_KEY = 'titus-isolate.sharedCoreViolations'
@@ -40,6 +58,10 @@ FALLBACK_ASSIGN_COUNT = 'titus-isolate.assignThreadsFallback'
 FALLBACK_FREE_COUNT = 'titus-isolate.freeThreadsFallback'
 FALLBACK_REBALANCE_COUNT = 'titus-isolate.rebalanceFallback'
 FALLBACK_QUEUE_DEPTH_COUNT = 'titus-isolate.queueDepthFallback'
+FALLBACK_BREAKER_OPEN_COUNT = 'titus-isolate.breakerOpenFallback'
+FALLBACK_HEDGE_COUNT = 'titus-isolate.hedgeFallback'
+FALLBACK_BREAKER_STATE = 'titus-isolate.fallbackBreakerState'
+FALLBACK_BREAKER_TRANSITION_COUNT = 'titus-isolate.fallbackBreakerTransition'
 
 SOLVER_GET_CPU_ALLOCATOR_SUCCESS = 'titus-isolate.getCpuAllocatorSuccessCount'
 SOLVER_GET_CPU_ALLOCATOR_FAILURE = 'titus-isolate.getCpuAllocatorFailureCount'
@@ -59,5 +81,13 @@ RUNNING = 'titus-isolate.running'
 
 RECONCILE_SKIP_COUNT = 'titus-isolate.reconcileSkipCount'
 RECONCILE_SUCCESS_COUNT = 'titus-isolate.reconcileSuccessCount'
+RECONCILE_DRIFT_COUNT = 'titus-isolate.reconcileDriftCount'
+RECONCILE_REPAIR_FAILURE_COUNT = 'titus-isolate.reconcileRepairFailureCount'
+RECONCILE_REPAIR_LATENCY = 'titus-isolate.reconcileRepairLatency'
 
 PARSE_POD_REQUESTED_RESOURCES_FAIL_COUNT = 'titus-isolate.parsePodRequestedResourcesFailCount'
+
+GRPC_REMOTE_ALLOC_DEADLINE = 'titus-isolate.grpcRemoteAllocDeadlineSec'
+GRPC_REMOTE_ALLOC_DELTA_COUNT = 'titus-isolate.grpcRemoteAllocDeltaCount'
+GRPC_REMOTE_ALLOC_DELTA_REJECTED_COUNT = 'titus-isolate.grpcRemoteAllocDeltaRejectedCount'
+CUSTOM_CONSTRAINTS_PARSE_ERROR_COUNT = 'titus-isolate.customConstraintsParseErrorCount'
@@ -1,5 +1,7 @@
 import json
 import socket
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
 
 import requests
 
@@ -36,13 +38,25 @@ def get_cpu_event(request: AllocateRequest, response: AllocateResponse):
     }
 
 
-def report_cpu_event(request: AllocateRequest, response: AllocateResponse):
+# Building a cpu event fetches the request's resource usage, so events are built off the isolate path.  A single
+# thread keeps them in the order they were reported.
+__cpu_event_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def report_cpu_event(request: AllocateRequest, response: AllocateResponse) -> Optional[Future]:
     event_log_manager = get_event_log_manager()
     if event_log_manager is None:
         log.warning("Event log manager is not set.")
-        return
+        return None
+
+    return __cpu_event_executor.submit(__report_cpu_event, event_log_manager, request, response)
+
 
-    event_log_manager.report_event(get_cpu_event(request, response))
+def __report_cpu_event(event_log_manager, request: AllocateRequest, response: AllocateResponse):
+    try:
+        event_log_manager.report_event(get_cpu_event(request, response))
+    except Exception:
+        log.exception("Failed to report cpu event")
 
 
 class EventException(Exception):
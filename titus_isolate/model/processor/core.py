@@ -5,6 +5,9 @@ from titus_isolate.model.processor.thread import Thread
 
 
 class Core:
+
+    __slots__ = ('__identifier', '__threads')
+
     def __init__(self, identifier, threads):
         if len(threads) < 1:
             raise ValueError("A CPU core must have at least 1 thread")
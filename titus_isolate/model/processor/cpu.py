@@ -1,83 +1,128 @@
 from collections import defaultdict
-from functools import reduce
 from typing import List
 
 from titus_isolate.model.processor import utils
 from titus_isolate.model.processor.core import Core
+from titus_isolate.model.processor.occupancy import Occupancy
 from titus_isolate.model.processor.package import Package
 from titus_isolate.model.processor.thread import Thread
+from titus_isolate.model.processor.topology import Topology
+from titus_isolate.model.processor.violation_index import ViolationIndex
 
 
 class Cpu:
+    """
+    A CPU is an immutable Topology plus an Occupancy table recording which workloads have claimed which threads.  The
+    Package, Core and Thread objects it hands out are views over that table, so claiming a Thread updates the CPU.
+
+    Copies of a CPU (copy.copy, copy.deepcopy or snapshot()) are O(1) copy-on-write snapshots which share the Topology
+    and only copy the Occupancy when either side is modified.  Their views are built on first use.
+    """
+
+    __slots__ = ('__topology', '__occupancy', '__packages', '__threads')
+
     def __init__(self, packages):
         if len(packages) < 1:
             raise ValueError("A CPU must contain at least 1 package.")
 
+        self.__topology = Topology([
+            (p.get_id(), [(c.get_id(), [t.get_id() for t in c.get_threads()]) for c in p.get_cores()])
+            for p in packages])
+        self.__occupancy = Occupancy(self.__topology.get_slot_count(), ViolationIndex(self.__topology))
         self.__packages = packages
+        self.__threads = [t for p in packages for c in p.get_cores() for t in c.get_threads()]
+
+        for slot, thread in enumerate(self.__threads):
+            thread._bind(self.__occupancy, slot)
+
+    def snapshot(self) -> 'Cpu':
+        cpu = Cpu.__new__(Cpu)
+        cpu.__topology = self.__topology
+        cpu.__occupancy = self.__occupancy.snapshot()
+        cpu.__packages = None
+        cpu.__threads = None
+        return cpu
+
+    def get_topology(self) -> Topology:
+        return self.__topology
+
+    def get_occupancy(self) -> Occupancy:
+        return self.__occupancy
+
+    def get_violation_index(self) -> ViolationIndex:
+        return self.__occupancy.get_violation_index()
 
     def get_packages(self) -> List[Package]:
+        self.__build_views()
         return self.__packages
 
     def get_emptiest_package(self):
-        emptiest_package = self.__packages[0]
-        curr_empty_thread_count = len(emptiest_package.get_empty_threads())
+        topology = self.__topology
+        occupancy = self.__occupancy
 
-        for package in self.get_packages()[1:]:
-            new_empty_thread_count = len(package.get_empty_threads())
+        emptiest_package_index = 0
+        curr_empty_thread_count = -1
+        for p_i in range(topology.get_package_count()):
+            new_empty_thread_count = \
+                len([s for s in topology.get_package_slots(p_i) if not occupancy.is_claimed(s)])
 
             if new_empty_thread_count > curr_empty_thread_count:
-                emptiest_package = package
+                emptiest_package_index = p_i
                 curr_empty_thread_count = new_empty_thread_count
 
-        return emptiest_package
+        return self.get_packages()[emptiest_package_index]
 
     def get_cores(self) -> List[Core]:
-        return reduce(list.__add__, [package.get_cores() for package in self.get_packages()])
+        return [c for p in self.get_packages() for c in p.get_cores()]
 
     def get_threads(self) -> List[Thread]:
-        return reduce(list.__add__, [package.get_threads() for package in self.get_packages()])
+        self.__build_views()
+        return list(self.__threads)
 
     def get_empty_threads(self):
-        return utils.get_empty_threads(self.get_threads())
+        self.__build_views()
+        return [self.__threads[s] for s in self.__occupancy.get_empty_slots()]
 
     def get_claimed_threads(self):
-        return utils.get_claimed_threads(self.get_threads())
+        self.__build_views()
+        return [self.__threads[s] for s in self.__occupancy.get_claimed_slots()]
 
     def clear(self):
-        for t in self.get_threads():
-            t.clear()
+        self.__occupancy.clear()
 
     def get_workload_ids_to_thread_ids(self):
+        thread_ids = self.__topology.get_thread_ids()
         res = defaultdict(list)
-        for t in self.get_threads():
-            if t.is_claimed():
-                for w_id in t.get_workload_ids():
-                    res[w_id] += [t.get_id()]
+        for w_id, slots in self.__occupancy.get_workload_ids_to_slots().items():
+            res[w_id] += [thread_ids[s] for s in slots]
         return res
 
     def get_natural_indexing_2_original_indexing(self):
-        return {i: t.get_id() for i, t in enumerate(self.get_threads())}
+        return dict(enumerate(self.__topology.get_thread_ids()))
 
     def to_dict(self):
+        topology = self.__topology
+        occupancy = self.__occupancy
+
         packages = []
-        for p in self.get_packages():
+        for p_i, package_id in enumerate(topology.get_package_ids()):
 
             cores = []
-            for c in p.get_cores():
+            for c_i in topology.get_package_cores(p_i):
 
                 threads = []
-                for t in c.get_threads():
+                for slot in topology.get_core_slots(c_i):
                     threads.append({
-                        "id": t.get_id(),
-                        "workload_id": t.get_workload_ids()
+                        "id": topology.get_thread_id(slot),
+                        "workload_id": list(occupancy.get_workload_ids(slot))
                     })
                 cores.append({
-                    "id": c.get_id(),
+                    "id": topology.get_core_ids()[c_i],
                     "threads": threads
                 })
 
             packages.append({
-                "id": p.get_id(),
+                "id": package_id,
                 "cores": cores
             })
 
@@ -86,18 +131,44 @@ class Cpu:
         }
 
     def to_array(self):
+        topology = self.__topology
+        occupancy = self.__occupancy
+
         cpu = []
-        for p in self.get_packages():
+        for p_i in range(topology.get_package_count()):
             package = []
-            for c in p.get_cores():
+            for c_i in topology.get_package_cores(p_i):
                 core = []
-                for t in c.get_threads():
-                    core.append(t.get_workload_ids())
+                for slot in topology.get_core_slots(c_i):
+                    core.append(list(occupancy.get_workload_ids(slot)))
                 package.append(core)
             cpu.append(package)
 
         return cpu
 
+    def __build_views(self):
+        if self.__packages is not None:
+            return
+
+        topology = self.__topology
+        core_ids = topology.get_core_ids()
+        threads = [Thread(t_id, self.__occupancy, slot) for slot, t_id in enumerate(topology.get_thread_ids())]
+
+        packages = []
+        for p_i, package_id in enumerate(topology.get_package_ids()):
+            cores = [Core(core_ids[c_i], [threads[s] for s in topology.get_core_slots(c_i)])
+                     for c_i in topology.get_package_cores(p_i)]
+            packages.append(Package(package_id, cores))
+
+        self.__threads = threads
+        self.__packages = packages
+
+    def __copy__(self):
+        return self.snapshot()
+
+    def __deepcopy__(self, memo):
+        return self.snapshot()
+
     def __str__(self):
         n_packages = len(self.get_packages())
         n_cores = n_packages * len(self.get_packages()[0].get_cores())
@@ -113,8 +184,19 @@ class Cpu:
 
     def __eq__(self, other):
         if isinstance(other, Cpu):
-            return set(self.get_packages()) == set(other.get_packages())
+            if self.__topology != other.__topology:
+                return False
+
+            occupancy = self.__occupancy
+            other_occupancy = other.__occupancy
+            for slot in range(self.__topology.get_slot_count()):
+                if not occupancy.has_same_workloads(slot, other_occupancy, slot):
+                    return False
+            return True
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple([frozenset(self.get_packages())]))
+        occupancy = self.__occupancy
+        return hash(tuple([
+            self.__topology,
+            frozenset([(s, occupancy.get_workloads_hash(s)) for s in occupancy.get_claimed_slots()])]))
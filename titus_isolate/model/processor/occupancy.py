@@ -0,0 +1,213 @@
+from typing import Dict, List, Tuple
+
+from titus_isolate.model.processor.violation_index import ViolationIndex
+
+
+class Occupancy:
+    """
+    A per-thread occupancy table.
+
+    Workload ids are interned into small integer indices and every slot (see Topology) holds the tuple of workload
+    indices which have claimed it.  Alongside it each slot holds an immutable tuple of the workload ids themselves,
+    which is rebuilt on write so that reads can hand it out without copying.  Snapshots are copy-on-write: taking one
+    is O(1) and the underlying tables are only copied by whichever side writes first.
+
+    An optional ViolationIndex is kept up to date with every claim and free.
+    """
+
+    __slots__ = (
+        '__owners',
+        '__owner_ids',
+        '__names',
+        '__indices',
+        '__refs',
+        '__free_indices',
+        '__violation_index',
+        '__shared')
+
+    def __init__(self, slot_count: int, violation_index: ViolationIndex = None):
+        self.__owners = [()] * slot_count
+        self.__owner_ids = [()] * slot_count
+        self.__names = []
+        self.__indices = {}
+        self.__refs = []
+        self.__free_indices = []
+        self.__violation_index = violation_index
+        self.__shared = False
+
+    def snapshot(self) -> 'Occupancy':
+        snapshot = Occupancy.__new__(Occupancy)
+        snapshot.__owners = self.__owners
+        snapshot.__owner_ids = self.__owner_ids
+        snapshot.__names = self.__names
+        snapshot.__indices = self.__indices
+        snapshot.__refs = self.__refs
+        snapshot.__free_indices = self.__free_indices
+        snapshot.__violation_index = None
+        if self.__violation_index is not None:
+            snapshot.__violation_index = self.__violation_index.snapshot()
+
+        # Both sides now refer to the same tables, so each must copy them before its next write.
+        self.__shared = True
+        snapshot.__shared = True
+        return snapshot
+
+    def get_violation_index(self) -> ViolationIndex:
+        return self.__violation_index
+
+    def get_slot_count(self) -> int:
+        return len(self.__owners)
+
+    def get_workload_ids(self, slot: int) -> Tuple[str, ...]:
+        """
+        Returns the workload ids on a slot in claim order.  The tuple is shared, not copied.
+        """
+        return self.__owner_ids[slot]
+
+    def get_all_workload_ids(self) -> Tuple[Tuple[str, ...], ...]:
+        """
+        Returns the workload ids of every slot.  Unchanged slots hold the same tuple across snapshots, so callers may
+        detect changes by identity.
+        """
+        return tuple(self.__owner_ids)
+
+    def is_claimed(self, slot: int) -> bool:
+        return len(self.__owners[slot]) > 0
+
+    def has_same_workloads(self, slot: int, other: 'Occupancy', other_slot: int) -> bool:
+        ids = self.__owner_ids[slot]
+        other_ids = other.__owner_ids[other_slot]
+        if ids == other_ids:
+            return True
+
+        if len(ids) != len(other_ids):
+            return False
+
+        for w_id in ids:
+            if w_id not in other_ids:
+                return False
+        return True
+
+    def get_workloads_hash(self, slot: int) -> int:
+        """
+        An order independent hash of the workload ids on a slot, consistent with has_same_workloads().
+        """
+        h = 0
+        for w_id in self.__owner_ids[slot]:
+            h ^= hash(w_id)
+        return h
+
+    def has_workload(self, slot: int, workload_id: str) -> bool:
+        index = self.__indices.get(workload_id, None)
+        return index is not None and index in self.__owners[slot]
+
+    def get_slots_with_workload(self, workload_id: str) -> List[int]:
+        index = self.__indices.get(workload_id, None)
+        if index is None:
+            return []
+        return [slot for slot, indices in enumerate(self.__owners) if index in indices]
+
+    def get_claimed_slots(self) -> List[int]:
+        return [slot for slot, indices in enumerate(self.__owners) if len(indices) > 0]
+
+    def get_empty_slots(self) -> List[int]:
+        return [slot for slot, indices in enumerate(self.__owners) if len(indices) == 0]
+
+    def get_workload_ids_to_slots(self) -> Dict[str, List[int]]:
+        res = {}
+        for slot, ids in enumerate(self.__owner_ids):
+            for w_id in ids:
+                if w_id in res:
+                    res[w_id].append(slot)
+                else:
+                    res[w_id] = [slot]
+        return res
+
+    def claim(self, slot: int, workload_id: str):
+        index = self.__indices.get(workload_id, None)
+        if index is not None and index in self.__owners[slot]:
+            return
+
+        self.__own()
+        if index is None:
+            index = self.__intern(workload_id)
+
+        self.__owners[slot] = self.__owners[slot] + (index,)
+        self.__owner_ids[slot] = self.__owner_ids[slot] + (workload_id,)
+        self.__refs[index] += 1
+        if self.__violation_index is not None:
+            self.__violation_index.add(slot, workload_id)
+
+    def free(self, slot: int, workload_id: str):
+        index = self.__indices.get(workload_id, None)
+        if index is None or index not in self.__owners[slot]:
+            return
+
+        self.__own()
+        self.__owners[slot] = tuple(i for i in self.__owners[slot] if i != index)
+        self.__owner_ids[slot] = tuple(w_id for w_id in self.__owner_ids[slot] if w_id != workload_id)
+        self.__release(index)
+        if self.__violation_index is not None:
+            self.__violation_index.remove(slot, workload_id)
+
+    def clear_slot(self, slot: int):
+        indices = self.__owners[slot]
+        if len(indices) == 0:
+            return
+
+        self.__own()
+        workload_ids = self.__owner_ids[slot]
+        self.__owners[slot] = ()
+        self.__owner_ids[slot] = ()
+        for index in indices:
+            self.__release(index)
+
+        if self.__violation_index is not None:
+            for w_id in workload_ids:
+                self.__violation_index.remove(slot, w_id)
+
+    def clear(self):
+        if len(self.__names) == 0:
+            return
+
+        self.__shared = False
+        self.__owners = [()] * len(self.__owners)
+        self.__owner_ids = [()] * len(self.__owner_ids)
+        self.__names = []
+        self.__indices = {}
+        self.__refs = []
+        self.__free_indices = []
+        if self.__violation_index is not None:
+            self.__violation_index.clear()
+
+    def __intern(self, workload_id: str) -> int:
+        if len(self.__free_indices) > 0:
+            index = self.__free_indices.pop()
+            self.__names[index] = workload_id
+        else:
+            index = len(self.__names)
+            self.__names.append(workload_id)
+            self.__refs.append(0)
+
+        self.__indices[workload_id] = index
+        return index
+
+    def __release(self, index: int):
+        self.__refs[index] -= 1
+        if self.__refs[index] == 0:
+            del self.__indices[self.__names[index]]
+            self.__names[index] = None
+            self.__free_indices.append(index)
+
+    def __own(self):
+        # Copy-on-write: the first write after a snapshot copies the tables this occupancy shares with others.
+        if not self.__shared:
+            return
+
+        self.__shared = False
+        self.__owners = list(self.__owners)
+        self.__owner_ids = list(self.__owner_ids)
+        self.__names = list(self.__names)
+        self.__indices = dict(self.__indices)
+        self.__refs = list(self.__refs)
+        self.__free_indices = list(self.__free_indices)
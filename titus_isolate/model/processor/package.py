@@ -1,15 +1,17 @@
-from functools import reduce
-
 from titus_isolate.model.processor import utils
 
 
 class Package:
+
+    __slots__ = ('__identifier', '__cores', '__threads')
+
     def __init__(self, identifier, cores):
         if len(cores) < 1:
             raise ValueError("A CPU package must have at least 1 core.")
 
         self.__identifier = identifier
         self.__cores = cores
+        self.__threads = [t for c in cores for t in c.get_threads()]
 
     def get_id(self):
         return self.__identifier
@@ -18,10 +20,10 @@ class Package:
         return self.__cores
 
     def get_threads(self):
-        return reduce(list.__add__, [core.get_threads() for core in self.get_cores()])
+        return list(self.__threads)
 
     def get_empty_threads(self):
-        return utils.get_empty_threads(self.get_threads())
+        return utils.get_empty_threads(self.__threads)
 
     def __eq__(self, other):
         if isinstance(other, Package):
@@ -1,45 +1,62 @@
-import copy
-
 from titus_isolate import log
+from titus_isolate.model.processor.occupancy import Occupancy
 
 
 class Thread:
-    def __init__(self, processor_id):
-        self.__workload_ids = []
+    """
+    A view of a single slot of an Occupancy table.  A standalone Thread owns a single slot table of its own until it
+    is bound into a Cpu.
+    """
+
+    __slots__ = ('__processor_id', '__occupancy', '__slot')
+
+    def __init__(self, processor_id, occupancy: Occupancy = None, slot: int = 0):
         self.__processor_id = int(processor_id)
 
         if self.__processor_id < 0:
             raise ValueError("Thread processor ids must be non-negative.")
 
+        if occupancy is None:
+            occupancy = Occupancy(1)
+        self.__occupancy = occupancy
+        self.__slot = slot
+
     def get_id(self):
         return self.__processor_id
 
     def claim(self, workload_id):
-        workload_ids = list(self.__workload_ids)
-        workload_ids.append(workload_id)
-        self.__workload_ids = list(set(workload_ids))
+        self.__occupancy.claim(self.__slot, workload_id)
 
     def free(self, workload_id):
         log.debug("Removing workload: '{}' from thread '{}'".format(workload_id, self.get_id()))
-        if workload_id in self.__workload_ids:
-            self.__workload_ids.remove(workload_id)
+        self.__occupancy.free(self.__slot, workload_id)
 
     def clear(self):
-        log.debug("Removing all workloads: '{}' from thread '{}'".format(self.__workload_ids, self.get_id()))
-        self.__workload_ids = []
+        log.debug("Removing all workloads: '{}' from thread '{}'".format(self.get_workload_ids(), self.get_id()))
+        self.__occupancy.clear_slot(self.__slot)
 
     def get_workload_ids(self):
-        return copy.deepcopy(self.__workload_ids)
+        """
+        Returns an immutable tuple of the workloads which have claimed this thread.  It is shared with the underlying
+        Occupancy table rather than copied, so callers must not rely on it reflecting later claims.
+        """
+        return self.__occupancy.get_workload_ids(self.__slot)
 
     def is_claimed(self):
-        return len(self.get_workload_ids()) > 0
+        return self.__occupancy.is_claimed(self.__slot)
+
+    def _bind(self, occupancy: Occupancy, slot: int):
+        for w_id in self.get_workload_ids():
+            occupancy.claim(slot, w_id)
+
+        self.__occupancy = occupancy
+        self.__slot = slot
 
     def __eq__(self, other):
         if isinstance(other, Thread):
             return self.get_id() == other.get_id() and \
-                   set(self.get_workload_ids()) == set(other.get_workload_ids())
+                   self.__occupancy.has_same_workloads(self.__slot, other.__occupancy, other.__slot)
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple([self.get_id(), frozenset(self.get_workload_ids())]))
-
+        return hash(self.get_id()) ^ self.__occupancy.get_workloads_hash(self.__slot)
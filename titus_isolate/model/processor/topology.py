@@ -0,0 +1,124 @@
+from typing import Dict, List, Tuple
+
+
+class Topology:
+    """
+    An immutable, array-backed description of a CPU's layout.
+
+    Threads are addressed by "slot": their position in natural order (package, then core, then thread).  Cores are
+    addressed by their position across all packages.  All arrays are tuples and are never modified after construction,
+    so a single Topology is shared by every snapshot of a CPU.
+    """
+
+    __slots__ = (
+        '__package_ids',
+        '__core_ids',
+        '__thread_ids',
+        '__slot_packages',
+        '__slot_cores',
+        '__core_packages',
+        '__package_cores',
+        '__package_slots',
+        '__core_slots',
+        '__thread_id_to_slot',
+        '__signature')
+
+    def __init__(self, layout: List[Tuple[int, List[Tuple[int, List[int]]]]]):
+        """
+        :param layout: [(<package_id>, [(<core_id>, [<thread_id>, ...]), ...]), ...]
+        """
+        package_ids = []
+        core_ids = []
+        thread_ids = []
+        slot_packages = []
+        slot_cores = []
+        core_packages = []
+        package_cores = []
+        package_slots = []
+        core_slots = []
+
+        for p_i, (package_id, cores) in enumerate(layout):
+            package_ids.append(package_id)
+            p_cores = []
+            p_slots = []
+            for core_id, c_thread_ids in cores:
+                c_i = len(core_ids)
+                core_ids.append(core_id)
+                core_packages.append(p_i)
+                p_cores.append(c_i)
+                c_slots = []
+                for thread_id in c_thread_ids:
+                    slot = len(thread_ids)
+                    thread_ids.append(int(thread_id))
+                    slot_packages.append(p_i)
+                    slot_cores.append(c_i)
+                    c_slots.append(slot)
+                    p_slots.append(slot)
+                core_slots.append(tuple(c_slots))
+            package_cores.append(tuple(p_cores))
+            package_slots.append(tuple(p_slots))
+
+        self.__package_ids = tuple(package_ids)
+        self.__core_ids = tuple(core_ids)
+        self.__thread_ids = tuple(thread_ids)
+        self.__slot_packages = tuple(slot_packages)
+        self.__slot_cores = tuple(slot_cores)
+        self.__core_packages = tuple(core_packages)
+        self.__package_cores = tuple(package_cores)
+        self.__package_slots = tuple(package_slots)
+        self.__core_slots = tuple(core_slots)
+        self.__thread_id_to_slot = {t_id: slot for slot, t_id in enumerate(self.__thread_ids)}
+        self.__signature = (self.__package_ids, self.__core_ids, self.__core_slots, self.__thread_ids)
+
+    def get_package_count(self) -> int:
+        return len(self.__package_ids)
+
+    def get_core_count(self) -> int:
+        return len(self.__core_ids)
+
+    def get_slot_count(self) -> int:
+        return len(self.__thread_ids)
+
+    def get_package_ids(self) -> Tuple[int, ...]:
+        return self.__package_ids
+
+    def get_core_ids(self) -> Tuple[int, ...]:
+        return self.__core_ids
+
+    def get_thread_ids(self) -> Tuple[int, ...]:
+        return self.__thread_ids
+
+    def get_thread_id(self, slot: int) -> int:
+        return self.__thread_ids[slot]
+
+    def get_slot(self, thread_id: int) -> int:
+        return self.__thread_id_to_slot[thread_id]
+
+    def get_slot_package(self, slot: int) -> int:
+        return self.__slot_packages[slot]
+
+    def get_slot_core(self, slot: int) -> int:
+        return self.__slot_cores[slot]
+
+    def get_core_package(self, core: int) -> int:
+        return self.__core_packages[core]
+
+    def get_package_cores(self, package: int) -> Tuple[int, ...]:
+        return self.__package_cores[package]
+
+    def get_package_slots(self, package: int) -> Tuple[int, ...]:
+        return self.__package_slots[package]
+
+    def get_core_slots(self, core: int) -> Tuple[int, ...]:
+        return self.__core_slots[core]
+
+    def get_thread_id_to_slot(self) -> Dict[int, int]:
+        return self.__thread_id_to_slot
+
+    def __eq__(self, other):
+        if isinstance(other, Topology):
+            return self is other or self.__signature == other.__signature
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.__signature)
@@ -1,5 +1,3 @@
-from functools import reduce
-
 from titus_isolate.model.processor.thread import Thread
 
 DEFAULT_PACKAGE_COUNT = 2
@@ -30,8 +28,7 @@ def get_emptiest_core(package):
 
 
 def is_cpu_full(cpu):
-    empty_threads = reduce(list.__add__, [p.get_empty_threads() for p in cpu.get_packages()])
-    return len(empty_threads) == 0
+    return len(cpu.get_empty_threads()) == 0
 
 
 # Workloads
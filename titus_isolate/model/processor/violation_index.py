@@ -0,0 +1,123 @@
+from typing import Dict, List
+
+from titus_isolate.model.processor.topology import Topology
+
+
+class ViolationIndex:
+    """
+    Tracks isolation violations (see isolate/detect.py) as an Occupancy is modified.
+
+    For every workload it keeps a count of the claimed slots on each package, and for every core a count of the
+    claimed slots per workload.  Each claim or free touches a single entry of each, and the sets of violating
+    workloads and cores are kept up to date alongside them, so violation counts are read in constant time.  Like
+    Occupancy, snapshots are copy-on-write.
+    """
+
+    __slots__ = (
+        '__topology',
+        '__workload_packages',
+        '__core_owners',
+        '__cross_package',
+        '__shared_cores',
+        '__shared')
+
+    def __init__(self, topology: Topology):
+        self.__topology = topology
+        self.__workload_packages = {}
+        self.__core_owners = [{} for _ in range(topology.get_core_count())]
+        self.__cross_package = set()
+        self.__shared_cores = set()
+        self.__shared = False
+
+    def snapshot(self) -> 'ViolationIndex':
+        snapshot = ViolationIndex.__new__(ViolationIndex)
+        snapshot.__topology = self.__topology
+        snapshot.__workload_packages = self.__workload_packages
+        snapshot.__core_owners = self.__core_owners
+        snapshot.__cross_package = self.__cross_package
+        snapshot.__shared_cores = self.__shared_cores
+
+        self.__shared = True
+        snapshot.__shared = True
+        return snapshot
+
+    def add(self, slot: int, workload_id: str):
+        self.__own()
+        topology = self.__topology
+
+        packages = self.__workload_packages.get(workload_id, None)
+        if packages is None:
+            packages = self.__workload_packages[workload_id] = {}
+        package = topology.get_slot_package(slot)
+        packages[package] = packages.get(package, 0) + 1
+        if len(packages) > 1:
+            self.__cross_package.add(workload_id)
+
+        core = topology.get_slot_core(slot)
+        owners = self.__core_owners[core]
+        owners[workload_id] = owners.get(workload_id, 0) + 1
+        if len(owners) > 1:
+            self.__shared_cores.add(core)
+
+    def remove(self, slot: int, workload_id: str):
+        self.__own()
+        topology = self.__topology
+
+        packages = self.__workload_packages[workload_id]
+        package = topology.get_slot_package(slot)
+        if packages[package] == 1:
+            del packages[package]
+            if len(packages) == 0:
+                del self.__workload_packages[workload_id]
+            if len(packages) < 2:
+                self.__cross_package.discard(workload_id)
+        else:
+            packages[package] -= 1
+
+        core = topology.get_slot_core(slot)
+        owners = self.__core_owners[core]
+        if owners[workload_id] == 1:
+            del owners[workload_id]
+            if len(owners) < 2:
+                self.__shared_cores.discard(core)
+        else:
+            owners[workload_id] -= 1
+
+    def clear(self):
+        self.__shared = False
+        self.__workload_packages = {}
+        self.__core_owners = [{} for _ in range(self.__topology.get_core_count())]
+        self.__cross_package = set()
+        self.__shared_cores = set()
+
+    def get_cross_package_violation_count(self) -> int:
+        return len(self.__cross_package)
+
+    def get_shared_core_violation_count(self) -> int:
+        return len(self.__shared_cores)
+
+    def get_cross_package_violations(self) -> Dict[str, List[int]]:
+        package_ids = self.__topology.get_package_ids()
+        return {w_id: [package_ids[p] for p in sorted(self.__workload_packages[w_id])]
+                for w_id in self.__cross_package}
+
+    def get_shared_core_violations(self) -> Dict[str, List[str]]:
+        topology = self.__topology
+        package_ids = topology.get_package_ids()
+        core_ids = topology.get_core_ids()
+
+        violations = {}
+        for core in sorted(self.__shared_cores):
+            violation_key = ':'.join([str(package_ids[topology.get_core_package(core)]), str(core_ids[core])])
+            violations[violation_key] = list(self.__core_owners[core])
+        return violations
+
+    def __own(self):
+        if not self.__shared:
+            return
+
+        self.__shared = False
+        self.__workload_packages = {w_id: dict(packages) for w_id, packages in self.__workload_packages.items()}
+        self.__core_owners = [dict(owners) for owners in self.__core_owners]
+        self.__cross_package = set(self.__cross_package)
+        self.__shared_cores = set(self.__shared_cores)
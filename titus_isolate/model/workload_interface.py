@@ -2,6 +2,15 @@ from abc import abstractmethod
 
 
 class Workload:
+    """
+    Workloads are immutable once constructed, so copies of a Workload (or of maps of them) share the original.
+    """
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     @abstractmethod
     def get_task_id(self) -> str:
@@ -0,0 +1,154 @@
+import time
+from collections import deque
+from threading import Lock
+from typing import List, Optional, Callable
+
+import schedule
+
+from titus_isolate import log
+from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE
+from titus_isolate.cgroup.utils import is_unified_hierarchy, get_cpuacct_usage_ns, get_memory_usage_bytes, \
+    get_unified_cpu_usage_ns, get_unified_memory_usage_bytes
+from titus_isolate.metrics.constants import CGROUP_USAGE_SAMPLE_FAILURE_COUNT
+from titus_isolate.metrics.metrics_reporter import MetricsReporter
+from titus_isolate.monitor.resource_usage import ResourceUsage
+from titus_isolate.monitor.resource_usage_provider import ResourceUsageProvider
+from titus_isolate.utils import get_workload_manager
+
+DEFAULT_SAMPLE_INTERVAL_SEC = 60
+NANOSECONDS_PER_SECOND = 1000000000
+
+# One more sample than the usage length, as cpu usage is the rate between consecutive samples
+DEFAULT_SAMPLE_CAPACITY = 61
+
+
+def get_isolated_workload_ids() -> List[str]:
+    workload_manager = get_workload_manager()
+    if workload_manager is None:
+        return []
+    return list(workload_manager.get_isolated_workload_ids())
+
+
+class CgroupResourceUsageProvider(ResourceUsageProvider, MetricsReporter):
+    """
+    Samples cpu and memory usage of the isolated workloads from the local cgroup filesystem at a fixed interval.
+
+    Each workload's samples are kept in a ring buffer, and cpu usage is computed locally as the rate of the cpuacct
+    counter between consecutive samples.  Network and disk usage are not available from cgroups and are not reported.
+    """
+
+    def __init__(self,
+                 sample_interval: int = DEFAULT_SAMPLE_INTERVAL_SEC,
+                 sample_capacity: int = DEFAULT_SAMPLE_CAPACITY,
+                 get_workload_ids: Callable[[], List[str]] = get_isolated_workload_ids,
+                 unified: bool = None,
+                 start: bool = True):
+        self.__sample_interval = sample_interval
+        self.__sample_capacity = sample_capacity
+        self.__get_workload_ids = get_workload_ids
+
+        if unified is None:
+            unified = is_unified_hierarchy()
+        if unified:
+            self.__get_cpu_usage_ns = get_unified_cpu_usage_ns
+            self.__get_memory_usage_bytes = get_unified_memory_usage_bytes
+        else:
+            self.__get_cpu_usage_ns = get_cpuacct_usage_ns
+            self.__get_memory_usage_bytes = get_memory_usage_bytes
+
+        self.__lock = Lock()
+
+        # workload_id -> deque of (timestamp, cpu usage ns, memory usage bytes)
+        self.__samples = {}
+
+        self.__reg = None
+        self.__sample_failure_count = 0
+
+        if start:
+            log.info("Sampling cgroup resource usage every {} seconds".format(sample_interval))
+            schedule.every(sample_interval).seconds.do(self.sample)
+
+    def sample(self, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        workload_ids = self.__get_workload_ids()
+        samples = {}
+        for w_id in workload_ids:
+            try:
+                samples[w_id] = (timestamp, self.__get_cpu_usage_ns(w_id), self.__get_memory_usage_bytes(w_id))
+            except Exception:
+                log.warning("Failed to sample cgroup resource usage of workload: {}".format(w_id))
+                self.__sample_failure_count += 1
+
+        with self.__lock:
+            # Workloads which are no longer isolated are dropped
+            self.__samples = {w_id: self.__samples.get(w_id, deque(maxlen=self.__sample_capacity))
+                              for w_id in workload_ids}
+            for w_id, sample in samples.items():
+                self.__samples[w_id].append(sample)
+
+    def get_resource_usages(self, workload_ids: List[str], since_epoch_sec: Optional[float] = None) \
+            -> List[ResourceUsage]:
+        with self.__lock:
+            w_samples = {w_id: list(self.__samples[w_id]) for w_id in workload_ids if w_id in self.__samples}
+
+        usages = []
+        for w_id, samples in w_samples.items():
+            if since_epoch_sec is not None:
+                # Keep the last sample before the range, it is needed to compute the first rate
+                first = 0
+                while first + 1 < len(samples) and samples[first + 1][0] <= since_epoch_sec:
+                    first += 1
+                samples = samples[first:]
+
+            if len(samples) == 0:
+                continue
+
+            mem_samples = [s for s in samples if since_epoch_sec is None or s[0] > since_epoch_sec]
+            if len(mem_samples) > 0:
+                usages.append(ResourceUsage(
+                    w_id, MEM_USAGE, mem_samples[0][0], self.__sample_interval,
+                    self.__fill_gaps([s[0] for s in mem_samples], [float(s[2]) for s in mem_samples])))
+
+            if len(samples) > 1:
+                usages.append(ResourceUsage(
+                    w_id, CPU_USAGE, samples[1][0], self.__sample_interval,
+                    self.__fill_gaps([s[0] for s in samples[1:]], self.__get_cpu_rates(samples))))
+
+        return usages
+
+    def get_interval_sec(self) -> int:
+        return self.__sample_interval
+
+    def __fill_gaps(self, timestamps: List[float], values: List[float]) -> List[float]:
+        """
+        Inserts NaN for the intervals missed between samples, e.g. by failed or late samples, so that every value stays
+        at its own sample's time.
+        """
+        filled = values[:1]
+        for prev_ts, ts, value in zip(timestamps, timestamps[1:], values[1:]):
+            steps = max(round((ts - prev_ts) / self.__sample_interval), 1)
+            filled += [float('nan')] * (steps - 1)
+            filled.append(value)
+        return filled
+
+    @staticmethod
+    def __get_cpu_rates(samples) -> List[float]:
+        rates = []
+        for (prev_ts, prev_cpu, _), (ts, cpu, _) in zip(samples, samples[1:]):
+            if cpu < prev_cpu or ts <= prev_ts:
+                # The counter was reset, e.g. by the container's cgroup being recreated
+                rates.append(float('nan'))
+            else:
+                rates.append((cpu - prev_cpu) / NANOSECONDS_PER_SECOND / (ts - prev_ts))
+        return rates
+
+    def get_sample_failure_count(self):
+        return self.__sample_failure_count
+
+    def set_registry(self, registry, tags):
+        self.__reg = registry
+
+    def report_metrics(self, tags):
+        self.__reg.gauge(CGROUP_USAGE_SAMPLE_FAILURE_COUNT, tags).set(self.get_sample_failure_count())
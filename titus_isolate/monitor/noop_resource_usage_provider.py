@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from titus_isolate import log
 from titus_isolate.monitor.resource_usage import ResourceUsage
@@ -7,6 +7,7 @@ from titus_isolate.monitor.resource_usage_provider import ResourceUsageProvider
 
 class NoopResourceUsageProvider(ResourceUsageProvider):
 
-    def get_resource_usages(self, workload_ids: List[str]) -> List[ResourceUsage]:
+    def get_resource_usages(self, workload_ids: List[str], since_epoch_sec: Optional[float] = None) \
+            -> List[ResourceUsage]:
         log.info("noop resource usage provider returning empty result")
         return []
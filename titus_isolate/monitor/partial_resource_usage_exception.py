@@ -0,0 +1,14 @@
+from typing import List
+
+from titus_isolate.monitor.resource_usage import ResourceUsage
+
+
+class PartialResourceUsageException(Exception):
+    """
+    Raised by a resource usage provider when only some resources' usages could be fetched, along with those which were.
+    """
+
+    def __init__(self, usages: List[ResourceUsage], failed_resources: List[str]):
+        super().__init__("Failed to get resource usage for resources: {}".format(failed_resources))
+        self.usages = usages
+        self.failed_resources = failed_resources
@@ -1,14 +1,21 @@
 import json
-from datetime import datetime, timedelta
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
 from cachetools import cached, TTLCache
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from titus_isolate import log
 from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE, NET_RECV_USAGE, NET_TRANS_USAGE, DISK_USAGE
 from titus_isolate.config.constants import PROMETHEUS_HOST_OVERRIDE, PROMETHEUS_SHARDING_ENABLED, \
     DEFAULT_PROMETHEUS_SHARDING_ENABLED
+from titus_isolate.metrics.constants import PROMETHEUS_QUERY_LATENCY, PROMETHEUS_QUERY_FAILURE_COUNT
+from titus_isolate.metrics.metrics_reporter import MetricsReporter
+from titus_isolate.monitor.partial_resource_usage_exception import PartialResourceUsageException
+from titus_isolate.monitor.prom_response_parser import parse_prom_matrix
 from titus_isolate.monitor.resource_usage import ResourceUsage
 from titus_isolate.monitor.resource_usage_provider import ResourceUsageProvider
 from titus_isolate.utils import get_config_manager
@@ -22,6 +29,17 @@ query_format = {
     DISK_USAGE: 'titus_disk_bytes_used{{instance="{}",v3_job_titus_netflix_com_task_id=~"{}"}}',
 }
 
+query_scale = {
+    CPU_USAGE: 0.000000001,  # scale nanoseconds to seconds
+}
+
+QUERY_TIMEOUT_SEC = 1
+QUERY_STEP_SEC = 60
+QUERY_WINDOW_SEC = 62 * 60
+
+# Samples of the last steps may still be missing or computed over partially ingested data
+SYNC_OVERLAP_SEC = 2 * QUERY_STEP_SEC
+
 
 def dt2str(dt: datetime) -> str:
     return dt.isoformat("T") + "Z"
@@ -86,48 +104,115 @@ def get_prom_url() -> str:
         return get_unsharded_prom_url()
 
 
-class PrometheusResourceUsageProvider(ResourceUsageProvider):
+class PrometheusResourceUsageProvider(ResourceUsageProvider, MetricsReporter):
+    """
+    Queries the resources' usages concurrently over a single pooled session, so a call takes as long as the slowest
+    query rather than the sum of all of them.  A failed query only drops its own resource from the result, which is
+    raised with a PartialResourceUsageException.
+    """
 
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
         self.__instance_id = get_config_manager().get_instance()
+        self.__executor = ThreadPoolExecutor(max_workers=len(query_format))
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(query_format))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.__session = session
+
+        self.__reg = None
+        self.__tags = None
+        self.__failure_count = 0
+
+    def get_resource_usages(self, workload_ids: List[str], since_epoch_sec: Optional[float] = None) \
+            -> List[ResourceUsage]:
+        # Align the range to the step so that samples fall on the same timestamps across calls
+        end_ts = time.time() // QUERY_STEP_SEC * QUERY_STEP_SEC
+        start_ts = end_ts - QUERY_WINDOW_SEC
+        if since_epoch_sec is not None:
+            start_ts = max(start_ts, (since_epoch_sec // QUERY_STEP_SEC + 1) * QUERY_STEP_SEC)
+        if start_ts > end_ts:
+            return []
 
-    def get_resource_usages(self, workload_ids: List[str]) -> List[ResourceUsage]:
-        now = datetime.utcnow()
-        end = dt2str(now)
-        start = dt2str(now - timedelta(hours=1, minutes=2))
+        end = dt2str(datetime.utcfromtimestamp(end_ts))
+        start = dt2str(datetime.utcfromtimestamp(start_ts))
 
-        usages = self.__get_resource(CPU_USAGE, workload_ids, start, end, 0.000000001)  # scale nanoseconds to seconds
-        usages += self.__get_resource(MEM_USAGE, workload_ids, start, end)
-        usages += self.__get_resource(NET_RECV_USAGE, workload_ids, start, end)
-        usages += self.__get_resource(NET_TRANS_USAGE, workload_ids, start, end)
-        usages += self.__get_resource(DISK_USAGE, workload_ids, start, end)
+        log.info('Getting Prometheus URL...')
+        prom_url = get_prom_url()
+        log.info(f'Prometheus URL: {prom_url}')
+
+        futures = {}
+        for resource in query_format.keys():
+            futures[resource] = self.__executor.submit(
+                self.__get_resource, prom_url, resource, workload_ids, start, end, query_scale.get(resource, 1.0))
+
+        usages = []
+        failed_resources = []
+        for resource, future in futures.items():
+            try:
+                usages += future.result()
+            except Exception:
+                log.exception("Failed to get resource usage for resource: %s", resource)
+                self.__failure_count += 1
+                failed_resources.append(resource)
+
+        if len(failed_resources) > 0:
+            raise PartialResourceUsageException(usages, failed_resources)
         return usages
 
-    def __get_resource(self, resource: str, workload_ids: List[str], start: str, end: str, scale: float = 1.0) -> List[ResourceUsage]:
+    def get_interval_sec(self) -> int:
+        return QUERY_STEP_SEC
+
+    def get_sync_overlap_sec(self) -> int:
+        return SYNC_OVERLAP_SEC
+
+    def get_failure_count(self):
+        return self.__failure_count
+
+    def set_registry(self, registry, tags):
+        self.__reg = registry
+        self.__tags = tags
+
+    def report_metrics(self, tags):
+        self.__reg.gauge(PROMETHEUS_QUERY_FAILURE_COUNT, tags).set(self.get_failure_count())
+
+    def __get_resource(self, prom_url: str, resource: str, workload_ids: List[str], start: str, end: str, scale: float = 1.0) -> List[ResourceUsage]:
         ids = '|'.join(workload_ids)
         query = query_format[resource].format(self.__instance_id, ids)
-        return self.__get_usages(query, resource, start, end, scale)
 
-    def __get_usages(self, query: str, resource: str, start: str, end: str, scale: float = 1.0) -> List[ResourceUsage]:
-        log.info('Getting Prometheus URL...')
-        prom_url = get_prom_url()
-        log.info(f'Prometheus URL: {prom_url}')
+        start_time = time.time()
+        try:
+            return self.__get_usages(prom_url, query, resource, start, end, scale)
+        finally:
+            if self.__reg is not None:
+                tags = dict(self.__tags, resource=resource)
+                self.__reg.distribution_summary(PROMETHEUS_QUERY_LATENCY, tags).record(time.time() - start_time)
 
-        resp = requests.get(
+    def __get_usages(self, prom_url: str, query: str, resource: str, start: str, end: str, scale: float = 1.0) -> List[ResourceUsage]:
+        resp = self.__session.get(
             prom_url,
-            timeout=1,
+            timeout=QUERY_TIMEOUT_SEC,
             params={
                 'query': query,
                 'start': start,
                 'end': end,
-                'step': "1m"
+                'step': "{}s".format(QUERY_STEP_SEC)
             })
 
         if resp.status_code != 200:
             log.error("Failed to query prometheus. query: %s, status: %s, text: %s", query, resp.status_code, resp.text)
-            return []
+            # Raised so the resource is counted as failed, rather than returning no usage for it
+            resp.raise_for_status()
+            raise requests.HTTPError("Unexpected prometheus response status: {}".format(resp.status_code))
 
-        return self._parse_prom_response(resource, resp.json(), scale)
+        return self._parse_prom_response_text(resource, resp.content.decode('utf-8'), scale)
+
+    @staticmethod
+    def _parse_prom_response_text(resource: str, text: str, scale: float = 1.0) -> List[ResourceUsage]:
+        return [ResourceUsage(task_id, resource, start_ts, QUERY_STEP_SEC, values)
+                for task_id, start_ts, values in parse_prom_matrix(text, scale)]
 
     @staticmethod
     def __validate_prom_response(resp) -> bool:
@@ -170,6 +255,7 @@ class PrometheusResourceUsageProvider(ResourceUsageProvider):
         return True
 
     def _parse_prom_response(self, resource: str, resp: dict, scale: float = 1.0) -> List[ResourceUsage]:
+        # Parses an already decoded response, responses are parsed from text by _parse_prom_response_text.
         # {
         # 	"status": "success",
         # 	"data": {
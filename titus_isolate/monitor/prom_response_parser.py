@@ -0,0 +1,114 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from titus_isolate import log
+
+TASK_ID_LABEL = "v3_job_titus_netflix_com_task_id"
+
+RESULT_START = re.compile(r'"result"\s*:\s*\[')
+WHITESPACE = re.compile(r'\s*')
+SAMPLE = re.compile(r'\[\s*([^,\s\[\]]+)\s*,\s*"([^"]*)"\s*\]')
+SAMPLE_VALUE = re.compile(r'"([^"]*)"')
+VALUES_END = re.compile(r'\]\s*\]|\[\s*\]')
+
+__decoder = json.JSONDecoder()
+
+
+def parse_prom_matrix(text: str, scale: float = 1.0) -> List[Tuple[str, float, np.ndarray]]:
+    """
+    Parses the series of a Prometheus range query response without decoding it into a tree of Python objects.
+
+    Each result's "values" array is scanned directly into a float64 array, only its small "metric" object is decoded.
+    Malformed results are skipped.
+
+    :return: a (task id, first sample timestamp, values) tuple per series
+    """
+    match = RESULT_START.search(text)
+    if match is None:
+        log.error("Unexpected Prometheus response.  No 'result' field in data")
+        return []
+
+    series = []
+    i = match.end()
+    while True:
+        i = __skip_whitespace(text, i)
+        if text[i] == ']':
+            break
+        if text[i] == ',':
+            i += 1
+            continue
+
+        parsed, i = __parse_result(text, i)
+        if parsed is not None:
+            task_id, start_ts, values = parsed
+            if scale != 1.0:
+                values *= scale
+            series.append(parsed)
+
+    if len(series) == 0:
+        log.warning("Empty result returned by Prometheus")
+    return series
+
+
+def __parse_result(text: str, i: int) -> Tuple[Optional[Tuple[str, float, np.ndarray]], int]:
+    if text[i] != '{':
+        raise ValueError("Expected a result object at position {}".format(i))
+    i += 1
+
+    task_id = None
+    start_ts = None
+    values = None
+    while True:
+        i = __skip_whitespace(text, i)
+        if text[i] == '}':
+            i += 1
+            break
+        if text[i] == ',':
+            i += 1
+            continue
+
+        key, i = scanstring(text, i + 1)
+        i = __skip_whitespace(text, i)
+        if text[i] != ':':
+            raise ValueError("Expected ':' at position {}".format(i))
+        i = __skip_whitespace(text, i + 1)
+
+        if key == "values":
+            start_ts, values, i = __parse_values(text, i)
+        else:
+            obj, i = __decoder.raw_decode(text, i)
+            if key == "metric":
+                task_id = obj.get(TASK_ID_LABEL, None)
+
+    if task_id is None:
+        log.error("task id not present in Prometheus metric")
+        return None, i
+
+    if values is None or len(values) == 0:
+        log.error("no values reported for Prometheus metric")
+        return None, i
+
+    return (task_id, start_ts, values), i
+
+
+def __parse_values(text: str, i: int) -> Tuple[Optional[float], np.ndarray, int]:
+    end_match = VALUES_END.search(text, i)
+    if end_match is None:
+        raise ValueError("Unterminated values array at position {}".format(i))
+    end = end_match.end()
+
+    # Every sample is a [<timestamp>, "<value>"] pair, only the first timestamp is needed
+    first = SAMPLE.search(text, i, end)
+    if first is None:
+        return None, np.empty(0, dtype=np.float64), end
+
+    values = np.array(SAMPLE_VALUE.findall(text, i, end), dtype=np.float64)
+    return float(first.group(1)), values, end
+
+
+def __skip_whitespace(text: str, i: int) -> int:
+    return WHITESPACE.match(text, i).end()
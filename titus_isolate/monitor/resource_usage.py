@@ -1,5 +1,6 @@
-from collections import deque
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
 
 from titus_isolate.allocate.constants import CPU_USAGE, MEM_USAGE, NET_RECV_USAGE, NET_TRANS_USAGE, DISK_USAGE, \
     RESOURCE_USAGE_NAMES
@@ -20,7 +21,7 @@ class ResourceUsage:
 
 
 class GlobalResourceUsage:
-    def __init__(self, resource_usages: Dict[str, Dict[str, List[float]]], usage_length: int = 60):
+    def __init__(self, resource_usages: Dict[str, Dict[str, Sequence[float]]], usage_length: int = 60):
         """
         {
             <resource_name>: {
@@ -29,46 +30,78 @@ class GlobalResourceUsage:
             },
             ...
         }
+
+        Each resource's usage is stored as a single float64 matrix with one row per workload, padded on the left with
+        NaN to usage_length samples.  Per workload usages are returned as views of the matrix rows.
         """
-        self.__map = self.pad_usage(resource_usages, usage_length)
+        self.__usage_length = usage_length
+
+        # resource_name -> (workload_id -> row index, matrix)
+        self.__matrices = {}
+        for resource_name, workload_usage in resource_usages.items():
+            self.__matrices[resource_name] = self.pad_usage(workload_usage, usage_length)
+
+        self.__views = {}
+        self.__serialized = None
 
-    def __get_resource_usage(self, resource_name: str) -> Optional[Dict[str, List[float]]]:
-        return self.__map.get(resource_name, None)
+    def __get_resource_usage(self, resource_name: str) -> Optional[Dict[str, np.ndarray]]:
+        if resource_name not in self.__matrices:
+            return None
+
+        views = self.__views.get(resource_name, None)
+        if views is None:
+            index, matrix = self.__matrices[resource_name]
+            views = {w_id: matrix[row] for w_id, row in index.items()}
+            self.__views[resource_name] = views
+        return views
+
+    def __get_resource_usage_for_workload(self, resource_name: str, workload_id: str) -> Optional[np.ndarray]:
+        if resource_name not in self.__matrices:
+            return None
 
-    def __get_resource_usage_for_workload(self, resource_name: str, workload_id: str) -> Optional[List[float]]:
-        usage = self.__get_resource_usage(resource_name)
-        if usage is None:
+        index, matrix = self.__matrices[resource_name]
+        row = index.get(workload_id, None)
+        if row is None:
             return None
-        return usage.get(workload_id, None)
+        return matrix[row]
 
     @staticmethod
-    def pad_usage(usage: Dict[str, Dict[str, List[float]]], usage_length):
-        padded_usage = {}
-        for resource_name, workload_usage in usage.items():
-            padded_usage[resource_name] = {}
-            for w_id, _ in workload_usage.items():
-                padded_usage[resource_name][w_id] = []
-
-        for resource_name, workload_usage in usage.items():
-            for w_id, usage in workload_usage.items():
-                pad_size = usage_length - len(usage)
-                pad = [float('nan') for _ in range(pad_size)]
-                d = deque(usage, maxlen=usage_length)
-                d.extendleft(pad)
-                padded_usage[resource_name][w_id] = list(d)
-
-        return padded_usage
+    def pad_usage(workload_usage: Dict[str, Sequence[float]], usage_length) -> Tuple[Dict[str, int], np.ndarray]:
+        """
+        :return: the workloads' row indices and a matrix holding the last usage_length values of each workload's usage,
+        right aligned and padded with NaN
+        """
+        index = {}
+        matrix = np.full((len(workload_usage), usage_length), np.nan, dtype=np.float64)
+        for row, (w_id, usage) in enumerate(workload_usage.items()):
+            index[w_id] = row
+            values = np.asarray(usage, dtype=np.float64)[-usage_length:] if usage_length > 0 else []
+            if len(values) > 0:
+                matrix[row, usage_length - len(values):] = values
+
+        return index, matrix
+
+    def get_usage_length(self) -> int:
+        return self.__usage_length
+
+    def get_matrix(self, resource_name: str) -> Optional[Tuple[Dict[str, int], np.ndarray]]:
+        """
+        :return: the resource's workload row indices and usage matrix
+        """
+        return self.__matrices.get(resource_name, None)
 
     def serialize(self) -> Dict[str, Dict[str, List[str]]]:
-        s_map = {}
-        for r_type, workload_usages in self.__map.items():
-            s_map[r_type] = {}
-            for w_id, values in workload_usages.items():
-                s_map[r_type][w_id] = [str(v) for v in values]
+        # Usage is immutable, so it is only serialized once
+        if self.__serialized is None:
+            s_map = {}
+            for r_type, (index, matrix) in self.__matrices.items():
+                rows = matrix.tolist()
+                s_map[r_type] = {w_id: list(map(str, rows[row])) for w_id, row in index.items()}
+            self.__serialized = s_map
 
-        return s_map
+        return self.__serialized
 
-    def get_all_usage_for_workload(self, workload_id) -> Dict[str, List[float]]:
+    def get_all_usage_for_workload(self, workload_id) -> Dict[str, np.ndarray]:
         usages = {}
         for resource_name in RESOURCE_USAGE_NAMES:
             usage = self.__get_resource_usage_for_workload(resource_name, workload_id)
@@ -78,32 +111,29 @@ class GlobalResourceUsage:
         return usages
 
     # CPU
-    def get_cpu_usage(self) -> Optional[Dict[str, List[float]]]:
+    def get_cpu_usage(self) -> Optional[Dict[str, np.ndarray]]:
         return self.__get_resource_usage(CPU_USAGE)
 
     # MEM
-    def get_mem_usage(self) -> Optional[Dict[str, List[float]]]:
+    def get_mem_usage(self) -> Optional[Dict[str, np.ndarray]]:
         return self.__get_resource_usage(MEM_USAGE)
 
     # NET
-    def get_net_recv_usage(self) -> Optional[Dict[str, List[float]]]:
+    def get_net_recv_usage(self) -> Optional[Dict[str, np.ndarray]]:
         return self.__get_resource_usage(NET_RECV_USAGE)
 
-    def get_net_trans_usage(self) -> Optional[Dict[str, List[float]]]:
+    def get_net_trans_usage(self) -> Optional[Dict[str, np.ndarray]]:
         return self.__get_resource_usage(NET_TRANS_USAGE)
 
     # DISK
-    def get_disk_usage(self) -> Optional[Dict[str, List[float]]]:
+    def get_disk_usage(self) -> Optional[Dict[str, np.ndarray]]:
         return self.__get_resource_usage(DISK_USAGE)
 
 
 def deserialize_global_resource_usage(s_map: Dict[str, Dict[str, List[str]]]) -> GlobalResourceUsage:
-    d_map = {}
     usage_length = 60
-    for r_type, workload_usages in s_map.items():
-        d_map[r_type] = {}
-        for w_id, values in workload_usages.items():
+    for workload_usages in s_map.values():
+        for values in workload_usages.values():
             usage_length = len(values)
-            d_map[r_type][w_id] = [float(v) for v in values]
 
-    return GlobalResourceUsage(d_map, usage_length)
+    return GlobalResourceUsage(s_map, usage_length)
@@ -0,0 +1,118 @@
+import math
+from collections import deque
+from threading import Lock
+from typing import List, Optional
+
+from titus_isolate.monitor.resource_usage import ResourceUsage
+
+DEFAULT_INTERVAL_SEC = 60
+DEFAULT_CAPACITY = 60
+
+
+class ResourceUsageCache:
+    """
+    Holds the most recent usage samples of each (workload, resource) series in a fixed size ring buffer.
+
+    New samples are appended by timestamp, so overlapping results may be added safely: samples newer than a series'
+    last one are appended, and samples still held in the buffer are replaced, e.g. by samples which were ingested
+    late.  Missing steps between samples are filled with NaN to keep series aligned.
+    """
+
+    def __init__(self, interval_sec: int = DEFAULT_INTERVAL_SEC, capacity: int = DEFAULT_CAPACITY):
+        self.__interval_sec = interval_sec
+        self.__capacity = capacity
+        self.__lock = Lock()
+
+        # workload_id -> resource_name -> (values, timestamp of the last value)
+        self.__series = {}
+
+        # workload_id -> end timestamp of the most recent fetch which included the workload
+        self.__synced_until = {}
+
+    def get_synced_until(self, workload_ids: List[str]) -> Optional[float]:
+        """
+        :return: the timestamp up to which all of the workloads' series are known, or None if any of the workloads has
+        never been fetched
+        """
+        with self.__lock:
+            synced_until = None
+            for w_id in workload_ids:
+                w_synced_until = self.__get_synced_until(w_id)
+                if w_synced_until is None:
+                    return None
+
+                if synced_until is None or w_synced_until < synced_until:
+                    synced_until = w_synced_until
+
+            return synced_until
+
+    def __get_synced_until(self, workload_id: str) -> Optional[float]:
+        if workload_id not in self.__synced_until:
+            return None
+
+        synced_until = self.__synced_until[workload_id]
+        for _, last_ts in self.__series.get(workload_id, {}).values():
+            synced_until = min(synced_until, last_ts)
+        return synced_until
+
+    def add(self, workload_ids: List[str], usages: List[ResourceUsage], synced_until: Optional[float]):
+        """
+        :param synced_until: the time up to which the workloads' usages are complete, or None if some of them could
+        not be fetched, in which case the samples are added but the workloads stay synced only as far as before
+        """
+        with self.__lock:
+            if synced_until is None:
+                previous = {w_id: self.__get_synced_until(w_id) for w_id in workload_ids}
+
+            for u in usages:
+                self.__add_usage(u)
+
+            for w_id in workload_ids:
+                if synced_until is not None:
+                    self.__synced_until[w_id] = max(synced_until, self.__synced_until.get(w_id, synced_until))
+                elif previous[w_id] is None:
+                    self.__synced_until.pop(w_id, None)
+                else:
+                    self.__synced_until[w_id] = previous[w_id]
+
+    def __add_usage(self, usage: ResourceUsage):
+        w_series = self.__series.setdefault(usage.workload_id, {})
+        values, last_ts = w_series.get(usage.resource_name, (deque(maxlen=self.__capacity), None))
+
+        for i, value in enumerate(usage.values):
+            ts = usage.start_time_epoch_sec + i * usage.interval_sec
+            if last_ts is not None:
+                steps = round((ts - last_ts) / self.__interval_sec)
+                if steps < 1:
+                    if -steps < len(values) and not math.isnan(value):
+                        values[steps - 1] = value
+                    continue
+                values.extend([float('nan')] * min(steps - 1, self.__capacity))
+            values.append(value)
+            last_ts = ts
+
+        if last_ts is not None:
+            w_series[usage.resource_name] = (values, last_ts)
+
+    def evict(self, workload_ids: List[str]):
+        with self.__lock:
+            for w_id in workload_ids:
+                self.__synced_until.pop(w_id, None)
+                self.__series.pop(w_id, None)
+
+    def get_resource_usages(self, workload_ids: List[str]) -> List[ResourceUsage]:
+        with self.__lock:
+            usages = []
+            for w_id in workload_ids:
+                for resource_name, (values, last_ts) in self.__series.get(w_id, {}).items():
+                    start_ts = last_ts - (len(values) - 1) * self.__interval_sec
+                    usages.append(ResourceUsage(w_id, resource_name, start_ts, self.__interval_sec, list(values)))
+            return usages
+
+    def get_series_count(self) -> int:
+        with self.__lock:
+            return sum(len(w_series) for w_series in self.__series.values())
+
+    def get_workload_ids(self) -> List[str]:
+        with self.__lock:
+            return list(self.__synced_until.keys())
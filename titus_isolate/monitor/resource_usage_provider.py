@@ -1,14 +1,34 @@
 from abc import abstractmethod
-from typing import List
+from typing import List, Optional
 
 from titus_isolate.monitor.resource_usage import ResourceUsage
 
+DEFAULT_INTERVAL_SEC = 60
+
 
 class ResourceUsageProvider:
 
     @abstractmethod
-    def get_resource_usages(self, workload_ids: List[str]) -> List[ResourceUsage]:
+    def get_resource_usages(self, workload_ids: List[str], since_epoch_sec: Optional[float] = None) \
+            -> List[ResourceUsage]:
+        """
+        :param since_epoch_sec: if set, only samples newer than this time are needed
+        :raises PartialResourceUsageException: if only some resources' usages could be fetched
+        """
         pass
 
+    def get_interval_sec(self) -> int:
+        """
+        :return: the time between consecutive samples of a usage series
+        """
+        return DEFAULT_INTERVAL_SEC
+
+    def get_sync_overlap_sec(self) -> int:
+        """
+        :return: how long before the last fetch samples may still change, e.g. because they were ingested late, and so
+        should be fetched again
+        """
+        return 0
+
     def get_name(self) -> str:
         return self.__class__.__name__
@@ -41,6 +41,6 @@ def resource_usages_to_dict(usages: List[ResourceUsage]) -> dict:
     for u in usages:
         if u.resource_name not in d:
             d[u.resource_name] = {}
-        d[u.resource_name][u.workload_id] = [str(v) for v in u.values]
+        d[u.resource_name][u.workload_id] = u.values
 
     return d
@@ -1,27 +1,58 @@
 import json
+import time
 from threading import Lock
 from typing import List
 
 from titus_isolate import log
+from titus_isolate.metrics.constants import RESOURCE_USAGE_FETCH_DURATION, RESOURCE_USAGE_FETCH_FAILURE_COUNT, \
+    RESOURCE_USAGE_CACHED_SERIES_COUNT
+from titus_isolate.metrics.metrics_reporter import MetricsReporter
+from titus_isolate.monitor.partial_resource_usage_exception import PartialResourceUsageException
 from titus_isolate.monitor.resource_usage import GlobalResourceUsage
+from titus_isolate.monitor.resource_usage_cache import ResourceUsageCache
 from titus_isolate.monitor.resource_usage_provider import ResourceUsageProvider
 from titus_isolate.monitor.utils import resource_usages_to_dict
 
 
-class WorkloadMonitorManager:
+class WorkloadMonitorManager(MetricsReporter):
+    """
+    Serves workloads' resource usage from a local cache, so that the provider is only asked for samples newer than
+    those already cached, plus the provider's overlap window.  The cache only advances when every resource was fetched,
+    so a resource which failed is fetched again from the last complete fetch.
+    """
 
     def __init__(self, resource_usage_provider: ResourceUsageProvider):
         self.__resource_usage_provider = resource_usage_provider
+        self.__cache = ResourceUsageCache(interval_sec=resource_usage_provider.get_interval_sec())
         self.__registry = None
+        self.__tags = None
         self.__metric_lock = Lock()
         self.__get_resource_usage_failure_count = 0
 
     def __get_usage_dict(self, workload_ids: List[str]) -> dict:
-        log.info("Getting resource usage from resource usage provider: %s", self.__resource_usage_provider.get_name())
-        usages_dict = resource_usages_to_dict(self.__resource_usage_provider.get_resource_usages(workload_ids))
-        return usages_dict
+        provider = self.__resource_usage_provider
+        fetch_time = time.time()
+        since = self.__cache.get_synced_until(workload_ids)
+        if since is not None:
+            since -= provider.get_sync_overlap_sec()
+
+        log.info("Getting resource usage since: %s from resource usage provider: %s", since, provider.get_name())
+        try:
+            usages = provider.get_resource_usages(workload_ids, since)
+            synced_until = fetch_time
+        except PartialResourceUsageException as e:
+            log.warning("Keeping the resource usage fetched, but not advancing the cache: %s", e)
+            usages = e.usages
+            synced_until = None
+
+        self.__cache.add(workload_ids, usages, synced_until)
+        return resource_usages_to_dict(self.__cache.get_resource_usages(workload_ids))
+
+    def remove_workloads(self, workload_ids: List[str]):
+        self.__cache.evict(workload_ids)
 
     def get_resource_usage(self, workload_ids: List[str]) -> GlobalResourceUsage:
+        start_time = time.time()
         try:
             global_usage = GlobalResourceUsage(self.__get_usage_dict(workload_ids))
             log.debug("Got resource usage: %s", json.dumps(global_usage.serialize(), sort_keys=True, separators=(',', ':')))
@@ -31,6 +62,23 @@ class WorkloadMonitorManager:
             with self.__metric_lock:
                 self.__get_resource_usage_failure_count += 1
             return GlobalResourceUsage({})
+        finally:
+            if self.__registry is not None:
+                self.__registry.distribution_summary(RESOURCE_USAGE_FETCH_DURATION, self.__tags).record(
+                    time.time() - start_time)
+
+    def get_resource_usage_failure_count(self):
+        with self.__metric_lock:
+            return self.__get_resource_usage_failure_count
 
     def set_registry(self, registry, tags):
         self.__registry = registry
+        self.__tags = tags
+        if isinstance(self.__resource_usage_provider, MetricsReporter):
+            self.__resource_usage_provider.set_registry(registry, tags)
+
+    def report_metrics(self, tags):
+        self.__registry.gauge(RESOURCE_USAGE_FETCH_FAILURE_COUNT, tags).set(self.get_resource_usage_failure_count())
+        self.__registry.gauge(RESOURCE_USAGE_CACHED_SERIES_COUNT, tags).set(self.__cache.get_series_count())
+        if isinstance(self.__resource_usage_provider, MetricsReporter):
+            self.__resource_usage_provider.report_metrics(tags)
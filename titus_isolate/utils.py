@@ -2,18 +2,19 @@ import os
 import time
 from threading import Thread, Lock
 
-import grpc
 import requests
 import schedule
 
 from titus_isolate import log
 from titus_isolate.allocate.constants import TITUS_ISOLATE_CELL_HEADER, UNKNOWN_CELL
+from titus_isolate.allocate.remote.channel import get_channel
 from titus_isolate.allocate.remote.isolate_pb2 import CurrentCellRequest
 from titus_isolate.allocate.remote.isolate_pb2_grpc import IsolationServiceStub
 from titus_isolate.config.agent_property_provider import AgentPropertyProvider
 from titus_isolate.config.config_manager import ConfigManager
 from titus_isolate.config.constants import CPU_ALLOCATOR, REMOTE_ALLOCATOR_URL, GRPC_REMOTE_ALLOC_ENDPOINT, \
-    MAX_SOLVER_RUNTIME, DEFAULT_MAX_SOLVER_RUNTIME
+    MAX_SOLVER_RUNTIME, DEFAULT_MAX_SOLVER_RUNTIME, GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS, \
+    DEFAULT_GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS
 from titus_isolate.constants import SCHEDULE_ONCE_FAILURE_EXIT_CODE, SCHEDULING_LOOP_FAILURE_EXIT_CODE
 from titus_isolate.exit_handler import ExitHandler
 
@@ -210,7 +211,9 @@ def get_grpc_cell_name(config_manager):
     if endpoint is None:
         log.warning("Could not get grpc remote allocator endpoint address.")
         return UNKNOWN_CELL
-    stub = IsolationServiceStub(grpc.insecure_channel(endpoint))
+    keepalive_time_ms = config_manager.get_cached_int(
+        GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS, DEFAULT_GRPC_REMOTE_ALLOC_KEEPALIVE_TIME_MS)
+    stub = IsolationServiceStub(get_channel(endpoint, keepalive_time_ms))
     res = stub.GetCurrentCell(CurrentCellRequest(), timeout=5.0)
     if res.cell_id == "":
         log.warning("Service returned empty grpc cell header")